@@ -1,35 +1,108 @@
 import json
 import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
 import datetime as dt
 import xxhash
 import logging
 
+from .charge_matcher import ChargeMatcher
+from .clean_manifest import CleanManifest
+from .motion_matcher import MotionMatcher
+from .redaction import Redactor
+
+# The output formats are shared with the parser, whether the packages are imported from
+# src or as top-level packages.
+try:
+    from ..parser.case_output import (
+        NDJSON_FORMATS,
+        append_ndjson,
+        check_output_format,
+        dumps_case_json,
+        get_ndjson_path,
+        is_ndjson_file,
+        read_ndjson,
+    )
+except ImportError:
+    from parser.case_output import (
+        NDJSON_FORMATS,
+        append_ndjson,
+        check_output_format,
+        dumps_case_json,
+        get_ndjson_path,
+        is_ndjson_file,
+        read_ndjson,
+    )
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-# List of motions identified as evidentiary.
-# TODO: These should be moved to a separate JSON in resources
-GOOD_MOTIONS = [
-    "Motion To Suppress",
-    "Motion to Reduce Bond",
-    "Motion to Reduce Bond Hearing",
-    "Motion for Production",
-    "Motion For Speedy Trial",
-    "Motion for Discovery",
-    "Motion In Limine",
-]
+# List of motions identified as evidentiary, kept in resources/good_motions.json.
+GOOD_MOTIONS_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "resources", "good_motions.json"
+)
+with open(GOOD_MOTIONS_PATH, "r") as f:
+    GOOD_MOTIONS = json.load(f)
 
+# Version of the cleaned JSON. Bump it whenever a change to the cleaner changes its
+# output, so that incremental cleaning cleans every case again. Changes to the motion
+# list, charge mapping and redaction rules don't need a bump, see get_cleaner_version.
+CLEANER_VERSION = "2"
 
-class Cleaner:
-    def __init__(self):
-        pass
+CHARGE_MAPPING_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "resources", "umich-uccs-database.json"
+)
+# Charge mappings by the path of their UMich file, built the first time a Cleaner needs one
+# and shared by every Cleaner in the process, whatever county it cleans.
+_charge_mappings = {}
+# Charge matchers over the names of each charge mapping, built and shared the same way.
+_charge_matchers = {}
+_charge_mappings_lock = threading.Lock()
+# Compiled matchers by motion list.
+_motion_matchers = {}
+
+# Fields of the cleaned cases to drop, hash or generalize, see Redactor.
+REDACTION_RULES_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "resources", "redaction_rules.json"
+)
+# Redactors compiled from each rules file, by its path.
+_redactors = {}
 
-    def redact_cause_number(self, input_dict: dict) -> str:
-        # This will hash and redact the cause number and then add it to the output file.
-        cause_number_hash = xxhash.xxh64(str(input_dict["Case Metadata"]["code"])).hexdigest()
-        return cause_number_hash
+
+class Cleaner:
+    def __init__(
+        self,
+        output_format: str = "pretty",
+        charge_mapping_pickle_path: str | None = None,
+        workers: int = 1,
+        batch_size: int = 64,
+        incremental: bool = False,
+    ):
+        check_output_format(output_format)
+        self.output_format = output_format
+        # Optional pickle of the charge mapping, which loads several times faster than the JSON.
+        self.charge_mapping_pickle_path = charge_mapping_pickle_path
+        # Files are cleaned in batches of batch_size, in a pool of workers processes if more than one.
+        self.workers = workers
+        self.batch_size = batch_size
+        # With incremental cleaning, cases already cleaned from the same html_hash by the
+        # same cleaner version, with the same rule files, are skipped.
+        self.incremental = incremental
+
+    def get_cleaner_version(self) -> str:
+        """
+        Returns the version the clean manifest records cleaned cases with: CLEANER_VERSION
+        and a hash of the motion list, charge mapping and redaction rules files, so that
+        incremental cleaning cleans every case again when any of them is edited.
+        """
+        files_hash = xxhash.xxh64()
+        for file_path in (GOOD_MOTIONS_PATH, CHARGE_MAPPING_PATH, REDACTION_RULES_PATH):
+            with open(file_path, "rb") as f:
+                files_hash.update(f.read())
+        return f"{CLEANER_VERSION}:{files_hash.hexdigest()}"
 
     def get_or_create_folder_path(self, county: str, folder_type: str) -> str:
         """Returns and ensures the existence of the folder path."""
@@ -55,20 +128,6 @@ class Cleaner:
             logging.error(f"Error loading file at {file_path}: {e}")
             return {}
 
-    def remove_judicial_officer(self, data):
-        # Check if data is a dictionary
-        if isinstance(data, dict):
-            # Remove 'judicial officer' if it exists in this dictionary
-            if "judicial officer" in data:
-                del data["judicial officer"]
-            # Recursively check each value in the dictionary
-            for key, value in data.items():
-                self.remove_judicial_officer(value)
-        # Check if data is a list
-        elif isinstance(data, list):
-            for item in data:
-                self.remove_judicial_officer(item)
-
     def load_and_map_charge_names(self, file_path: str) -> dict:
         """Loads a JSON file and maps charge names to their corresponding UMich data."""
         charge_data = self.load_json_file(file_path)
@@ -83,8 +142,67 @@ class Cleaner:
             logging.error(f"Error in mapping charge names: {e}")
             raise ValueError(f"Invalid data structure: {file_path}")
 
+    def load_pickled_charge_mapping(self, file_path: str, pickle_path: str) -> dict | None:
+        """
+        Returns the charge mapping pickled at pickle_path if it was built from the current
+        version of file_path, otherwise None.
+        """
+        try:
+            with open(pickle_path, "rb") as f:
+                pickled = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            logging.info(f"No usable charge mapping pickle at {pickle_path}: {e}")
+            return None
+        stat = os.stat(file_path)
+        if (pickled.get("mtime_ns"), pickled.get("size")) != (stat.st_mtime_ns, stat.st_size):
+            logging.info(f"Charge mapping pickle {pickle_path} is out of date")
+            return None
+        return pickled["charge_mapping"]
+
+    def dump_pickled_charge_mapping(self, file_path: str, pickle_path: str, charge_mapping: dict) -> None:
+        stat = os.stat(file_path)
+        temp_path = f"{pickle_path}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                pickle.dump(
+                    {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "charge_mapping": charge_mapping},
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(temp_path, pickle_path)
+        except OSError as e:
+            logging.warning(f"Failed to write charge mapping pickle {pickle_path}: {e}")
+
+    def get_charge_mapping(self, file_path: str = CHARGE_MAPPING_PATH) -> dict:
+        """
+        Returns the mapping of charge names to UMich data, loading it only the first time
+        it is needed in the process. With a pickle path, it is loaded from the pickle when
+        the pickle is up to date, and the pickle is rewritten when it isn't.
+        """
+        key = os.path.abspath(file_path)
+        with _charge_mappings_lock:
+            if key not in _charge_mappings:
+                charge_mapping = None
+                if self.charge_mapping_pickle_path is not None:
+                    charge_mapping = self.load_pickled_charge_mapping(file_path, self.charge_mapping_pickle_path)
+                if charge_mapping is None:
+                    charge_mapping = self.load_and_map_charge_names(file_path)
+                    if self.charge_mapping_pickle_path is not None:
+                        self.dump_pickled_charge_mapping(file_path, self.charge_mapping_pickle_path, charge_mapping)
+                _charge_mappings[key] = charge_mapping
+            return _charge_mappings[key]
+
+    def get_charge_matcher(self, file_path: str = CHARGE_MAPPING_PATH) -> ChargeMatcher:
+        """Returns the matcher of charge names to the UMich charge names, built once per process."""
+        charge_mapping = self.get_charge_mapping(file_path)
+        key = os.path.abspath(file_path)
+        with _charge_mappings_lock:
+            if key not in _charge_matchers:
+                _charge_matchers[key] = ChargeMatcher(list(charge_mapping))
+            return _charge_matchers[key]
+
     def process_charges(
-        self, charges: list[dict], charge_mapping: dict
+        self, charges: list[dict], charge_mapping: dict, charge_matcher: ChargeMatcher | None = None
     ) -> tuple[list[dict], str]:
         """
         Processes a list of charges by formatting charge details,
@@ -93,6 +211,8 @@ class Cleaner:
         Args:
             charges: A list of charges where each charge is a dictionary containing charge details.
             charge_mapping: A dictionary mapping charge names to corresponding UMich data.
+            charge_matcher: Optional matcher for charge names that aren't exactly in charge_mapping,
+                e.g. that differ in case, punctuation or abbreviations.
 
         Returns:
             tuple: A list of processed charges and the earliest charge date.
@@ -120,12 +240,17 @@ class Cleaner:
                 logging.error(f"Error parsing date for charge: {charge}")
                 continue
 
-            # Try to map the charge to UMich data
-            try:
-                charge_dict.update(charge_mapping[charge["charges"]])
-            except KeyError:
+            # Try to map the charge to UMich data, by its exact name and then by the closest name
+            charge_match = None
+            if charge["charges"] in charge_mapping:
+                charge_match = (charge["charges"], 1.0)
+            elif charge_matcher is not None:
+                charge_match = charge_matcher.match(charge["charges"])
+            if charge_match is None:
                 logging.warning(f"Couldn't find this charge: {charge['charges']}")
                 continue
+            charge_dict.update(charge_mapping[charge_match[0]])
+            charge_dict["charge_match_score"] = charge_match[1]
 
             processed_charges.append(charge_dict)
 
@@ -138,40 +263,58 @@ class Cleaner:
 
         return processed_charges, earliest_charge_date
 
-    def contains_good_motion(self, motion: str, event: list | str) -> bool:
-        """Recursively check if a motion exists in an event list or sublist."""
-        if isinstance(event, list):
-            return any(self.contains_good_motion(motion, item) for item in event)
-        return motion.lower() in event.lower()
-
     def find_good_motions(
         self, events: list | str, good_motions: list[str]
     ) -> list[str]:
-        """Finds motions in events based on list of good motions."""
-        return [
-            motion
-            for motion in good_motions
-            if self.contains_good_motion(motion, events)
-        ]
-
-    def hash_defense_attorney(self, input_dict: dict) -> str:
-        """Hashes the defense attorney info to anonymize it."""
-        try:
-            def_atty_unique_str = f'{input_dict["Defendent Information"]["defense attorney"]}:{input_dict["Defendent Information"]["defense attorney phone number"]}'
-            return xxhash.xxh64(def_atty_unique_str).hexdigest()
-        except KeyError as e:
-            logging.error(f"Missing defense attorney data: {e}")
-            return ""
+        """Finds motions in events based on list of good motions, in one pass over the events."""
+        key = tuple(good_motions)
+        if key not in _motion_matchers:
+            _motion_matchers[key] = MotionMatcher(good_motions)
+        return _motion_matchers[key].find(events)
+
+    def get_redactor(self, file_path: str = REDACTION_RULES_PATH) -> Redactor:
+        """Returns the redactor compiled from the rules file, built once per process."""
+        key = os.path.abspath(file_path)
+        if key not in _redactors:
+            _redactors[key] = Redactor.from_file(file_path)
+        return _redactors[key]
 
     def write_json_output(self, file_path: str, data: dict) -> None:
-        """Writes the given data to a JSON file at the specified file path."""
+        """Writes the given data to a JSON file at the specified file path, pretty or compact."""
         try:
-            with open(file_path, "w") as f:
-                json.dump(data, f, indent=4)
+            with open(file_path, "wb") as f:
+                f.write(dumps_case_json(data, self.output_format))
             logging.info(f"Successfully wrote cleaned data to {file_path}")
         except OSError as e:
             logging.error(f"Failed to write JSON output to {file_path}: {e}")
 
+    def get_ndjson_path(self, folder_path: str) -> str:
+        """Returns the NDJSON file of the day in folder_path, e.g. 2024-01-31.ndjson.gz."""
+        return get_ndjson_path(folder_path, self.output_format)
+
+    def write_ndjson_output(self, file_path: str, cases: list[dict]) -> None:
+        """Appends cases to an NDJSON file, one per line, with a single write."""
+        try:
+            append_ndjson(file_path, (dumps_case_json(case, self.output_format) for case in cases))
+            logging.info(f"Successfully wrote {len(cases)} cleaned cases to {file_path}")
+        except OSError as e:
+            logging.error(f"Failed to write NDJSON output to {file_path}: {e}")
+
+    def load_ndjson_file(self, file_path: str) -> list[dict]:
+        """Loads the cases of an NDJSON file, gzipped or not."""
+        try:
+            return list(read_ndjson(file_path))
+        except (OSError, json.JSONDecodeError) as e:
+            logging.error(f"Error loading file at {file_path}: {e}")
+            return []
+
+    def write_cleaned_case(self, cleaned_folder_path: str, case_json_filename: str, data: dict) -> None:
+        """Writes a cleaned case to its own file, or to the NDJSON file of the day."""
+        if self.output_format in NDJSON_FORMATS:
+            self.write_ndjson_output(self.get_ndjson_path(cleaned_folder_path), [data])
+        else:
+            self.write_json_output(os.path.join(cleaned_folder_path, case_json_filename), data)
+
     def process_single_case(
         self,
         case_json_folder_path: str,
@@ -186,6 +329,81 @@ class Cleaner:
             logging.error(f"Failed to load case data from {input_json_path}")
             return
 
+        output_json_data = self.clean_case(input_dict)
+        self.write_cleaned_case(cleaned_folder_path, case_json_filename, output_json_data)
+
+    def process_ndjson_file(
+        self,
+        case_json_folder_path: str,
+        case_json_filename: str,
+        cleaned_folder_path: str,
+    ) -> None:
+        """Process every case of an NDJSON file written by the parser."""
+        cleaned_cases, errors = self.clean_batch(case_json_folder_path, [case_json_filename])
+        for _, error in errors:
+            logging.error(f"Error processing a case of {case_json_filename}. Error: {error}")
+        self.write_cleaned_cases(cleaned_folder_path, cleaned_cases)
+
+    def clean_batch(
+        self,
+        case_json_folder_path: str,
+        case_json_filenames: list[str],
+        current_hashes: dict[str, str] | None = None,
+    ) -> tuple[list[tuple[str, dict]], list[tuple[str, str]]]:
+        """
+        Cleans a batch of parsed case files, per-case JSON or NDJSON, without writing them.
+
+        Args:
+            case_json_folder_path: The folder of the parsed case files.
+            case_json_filenames: The names of the files in the batch.
+            current_hashes: The html_hash of cases already cleaned, by the name of their
+                cleaned file. Cases parsed from the same html_hash are skipped.
+
+        Returns:
+            tuple: The (output file name, cleaned case) pairs, and the (file name, error)
+                pairs of the files and cases that failed.
+        """
+        cleaned_cases = []
+        errors = []
+        for case_json_filename in case_json_filenames:
+            input_json_path = os.path.join(case_json_folder_path, case_json_filename)
+            try:
+                if is_ndjson_file(case_json_filename):
+                    for input_dict in self.load_ndjson_file(input_json_path):
+                        try:
+                            # The case number is the odyssey id, which the parser names its JSON files by.
+                            output_filename = f'{input_dict["Case Metadata"]["odyssey id"]}.json'
+                            if current_hashes and current_hashes.get(output_filename) == input_dict.get("html_hash"):
+                                continue
+                            cleaned_cases.append((output_filename, self.clean_case(input_dict)))
+                        except Exception as e:
+                            errors.append((case_json_filename, repr(e)))
+                else:
+                    input_dict = self.load_json_file(input_json_path)
+                    if not input_dict:
+                        errors.append((case_json_filename, "failed to load case data"))
+                        continue
+                    if current_hashes and current_hashes.get(case_json_filename) == input_dict.get("html_hash"):
+                        continue
+                    cleaned_cases.append((case_json_filename, self.clean_case(input_dict)))
+            except Exception as e:
+                errors.append((case_json_filename, repr(e)))
+        return cleaned_cases, errors
+
+    def write_cleaned_cases(self, cleaned_folder_path: str, cleaned_cases: list[tuple[str, dict]]) -> None:
+        """Writes cleaned cases to their own files, or with one write to the NDJSON file of the day."""
+        if self.output_format in NDJSON_FORMATS:
+            if cleaned_cases:
+                self.write_ndjson_output(
+                    self.get_ndjson_path(cleaned_folder_path),
+                    [output_json_data for _, output_json_data in cleaned_cases],
+                )
+            return
+        for output_filename, output_json_data in cleaned_cases:
+            self.write_json_output(os.path.join(cleaned_folder_path, output_filename), output_json_data)
+
+    def clean_case(self, input_dict: dict) -> dict:
+        """Returns the cleaned data of a parsed case."""
         # Initialize cleaned output data
         output_json_data = {
             "parsing_date": dt.datetime.today().strftime("%Y-%m-%d"),
@@ -195,7 +413,8 @@ class Cleaner:
             },            
             "Defendant Information": {
                 "appointed_or_retained": input_dict["Defendent Information"]["appointed or retained"],
-                "defense_attorney": self.hash_defense_attorney(input_dict),
+                # Set to the hash of the attorney by the redaction rules
+                "defense_attorney": "",
             },
             "Charge Information": [],
             "Case Details": {
@@ -205,22 +424,16 @@ class Cleaner:
             "Disposition_Information": input_dict["Disposition Information"]
         }
 
-        # Removing judicial office name from data
-        self.remove_judicial_officer(output_json_data["Disposition_Information"])
+        # The charge mapping is loaded once and reused for every case
+        charges_mapped = self.get_charge_mapping()
 
-        # Load charge mappings
-        charge_name_to_umich_file = os.path.join(
-            os.path.dirname(__file__),
-            "..",
-            "..",
-            "resources",
-            "umich-uccs-database.json",
-        )
-        charges_mapped = self.load_and_map_charge_names(charge_name_to_umich_file)
+        # The updater also looks for the hash cases were stored with before fingerprints
+        if "legacy_html_hash" in input_dict:
+            output_json_data["legacy_html_hash"] = input_dict["legacy_html_hash"]
 
         # Process charges and motions
         output_json_data["Charge Information"], output_json_data['Case Details']["earliest_charge_date"] = (
-            self.process_charges(input_dict["Charge Information"], charges_mapped)
+            self.process_charges(input_dict["Charge Information"], charges_mapped, self.get_charge_matcher())
         )
         output_json_data['Good Motions'] = self.find_good_motions(
             input_dict["Other Events and Hearings"], GOOD_MOTIONS
@@ -229,14 +442,16 @@ class Cleaner:
             len(output_json_data["Good Motions"]) > 0
         )
 
-        output_json_data["cause_number_redacted"] = self.redact_cause_number(input_dict)
-
-        # Write output to file
-        output_filepath = os.path.join(cleaned_folder_path, case_json_filename)
-        self.write_json_output(output_filepath, output_json_data)
+        # Hashing the attorney and cause number, and removing the judicial officer names
+        return self.get_redactor().redact(input_dict, output_json_data)
 
     def process_json_files(self, county: str, case_json_folder_path: str) -> None:
-        """Processes all JSON files in the specified folder."""
+        """
+        Processes all JSON files in the specified folder, in batches of `batch_size` files.
+
+        With more than one worker, the batches are cleaned in a pool of processes which
+        share the charge mapping loaded here. Failures are logged once per batch.
+        """
         try:
             list_case_json_files = os.listdir(case_json_folder_path)
         except (FileNotFoundError, Exception) as e:
@@ -248,13 +463,89 @@ class Cleaner:
             county, "case_json_cleaned"
         )
 
-        for case_json_filename in list_case_json_files:
-            try:
-                self.process_single_case(
-                    case_json_folder_path, case_json_filename, cleaned_folder_path
+        # NDJSON files are named by day, so sorting them lets later versions of a case win.
+        list_case_json_files = sorted(list_case_json_files)
+        clean_manifest = None
+        current_hashes = {}
+        if self.incremental:
+            clean_manifest = CleanManifest(
+                os.path.join(os.path.dirname(cleaned_folder_path), "clean_manifest.json"),
+                self.get_cleaner_version(),
+            )
+            list_case_json_files = [
+                case_json_filename
+                for case_json_filename in list_case_json_files
+                if not clean_manifest.is_file_current(
+                    case_json_filename, os.path.join(case_json_folder_path, case_json_filename)
+                )
+            ]
+            current_hashes = clean_manifest.current_hashes()
+            logging.info(f"Incremental cleaning: {len(list_case_json_files)} files changed since they were last cleaned")
+
+        tasks = []
+        for i in range(0, len(list_case_json_files), self.batch_size):
+            batch = list_case_json_files[i : i + self.batch_size]
+            # The cases of an NDJSON file aren't known before it is read, so its batch gets every hash.
+            if any(is_ndjson_file(case_json_filename) for case_json_filename in batch):
+                batch_hashes = current_hashes
+            else:
+                batch_hashes = {
+                    case_json_filename: current_hashes[case_json_filename]
+                    for case_json_filename in batch
+                    if case_json_filename in current_hashes
+                }
+            tasks.append((case_json_folder_path, batch, cleaned_folder_path, batch_hashes))
+        executor = None
+        if self.workers > 1 and len(tasks) > 1:
+            # Load the charge mapping before the pool starts, so forked workers inherit it.
+            self.get_charge_matcher()
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_cleaner_worker,
+                initargs=(self.output_format, self.charge_mapping_pickle_path),
+            )
+            results = executor.map(_clean_batch, tasks)
+        else:
+            results = (_clean_batch(task, self) for task in tasks)
+        try:
+            for batch_number, (ndjson_cases, cleaned_hashes, errors) in enumerate(results):
+                # Cleaned NDJSON cases come back here, so the file of the day has one writer.
+                self.write_cleaned_cases(cleaned_folder_path, ndjson_cases)
+                logging.info(f"Batch {batch_number}: cleaned {len(cleaned_hashes)} cases")
+                if errors:
+                    logging.error(
+                        f"Batch {batch_number}: {len(errors)} errors. "
+                        + "; ".join(f"{case_json_filename}: {error}" for case_json_filename, error in errors)
+                    )
+                if clean_manifest is not None:
+                    self.record_batch(clean_manifest, tasks[batch_number], cleaned_hashes, errors)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if clean_manifest is not None:
+                clean_manifest.save()
+
+    def record_batch(
+        self,
+        clean_manifest: CleanManifest,
+        task: tuple,
+        cleaned_hashes: list[tuple[str, str]],
+        errors: list[tuple[str, str]],
+    ) -> None:
+        """Records the cases cleaned in a batch, and its files that had no errors, in the clean manifest."""
+        case_json_folder_path, case_json_filenames, cleaned_folder_path, _ = task
+        for output_filename, html_hash in cleaned_hashes:
+            if self.output_format in NDJSON_FORMATS:
+                output_path = self.get_ndjson_path(cleaned_folder_path)
+            else:
+                output_path = os.path.join(cleaned_folder_path, output_filename)
+            clean_manifest.record_case(output_filename, html_hash, output_path)
+        failed_filenames = {case_json_filename for case_json_filename, _ in errors}
+        for case_json_filename in case_json_filenames:
+            if case_json_filename not in failed_filenames:
+                clean_manifest.record_file(
+                    case_json_filename, os.path.join(case_json_folder_path, case_json_filename)
                 )
-            except Exception as e:
-                logging.error(f"Error processing file {case_json_filename}. Error: {e}")
 
     def clean(self, county: str) -> None:
         """
@@ -276,3 +567,40 @@ class Cleaner:
             logging.error(
                 f"Error during cleaning process for county: {county}. Error: {e}"
             )
+
+
+# The Cleaner of each pool worker process, created by _init_cleaner_worker.
+_worker_cleaner = None
+
+
+def _init_cleaner_worker(output_format: str, charge_mapping_pickle_path: str | None) -> None:
+    global _worker_cleaner
+    _worker_cleaner = Cleaner(output_format, charge_mapping_pickle_path)
+    # Already there if the worker was forked from a process that loaded it.
+    _worker_cleaner.get_charge_matcher()
+
+
+def _clean_batch(
+    task: tuple, cleaner_instance: Cleaner | None = None
+) -> tuple[list[tuple[str, dict]], list[tuple[str, str]], list[tuple[str, str]]]:
+    """
+    Cleans a batch of files for `Cleaner.process_json_files`, in this process or in a pool
+    worker. Cases written to their own files are written here, while NDJSON cases are sent
+    back to be written by the caller.
+
+    Returns:
+        tuple: The NDJSON cases to write, the (cleaned file name, html_hash) of each case
+            cleaned, and the errors.
+    """
+    case_json_folder_path, case_json_filenames, cleaned_folder_path, current_hashes = task
+    cleaner_instance = cleaner_instance or _worker_cleaner
+    cleaned_cases, errors = cleaner_instance.clean_batch(
+        case_json_folder_path, case_json_filenames, current_hashes
+    )
+    cleaned_hashes = [
+        (output_filename, output_json_data["html_hash"]) for output_filename, output_json_data in cleaned_cases
+    ]
+    if cleaner_instance.output_format in NDJSON_FORMATS:
+        return cleaned_cases, cleaned_hashes, errors
+    cleaner_instance.write_cleaned_cases(cleaned_folder_path, cleaned_cases)
+    return [], cleaned_hashes, errors
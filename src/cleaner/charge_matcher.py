@@ -0,0 +1,160 @@
+import re
+from collections import defaultdict
+
+# Abbreviations used in Odyssey charge names, and the words they stand for. Both the
+# UMich charge names and the charges looked up are expanded, so either form matches.
+ABBREVIATIONS = {
+    "AGG": "AGGRAVATED",
+    "ASLT": "ASSAULT",
+    "BI": "BODILY INJURY",
+    "BURG": "BURGLARY",
+    "CONT": "CONTROLLED",
+    "CRIM": "CRIMINAL",
+    "CS": "CONTROLLED SUBSTANCE",
+    "DWI": "DRIVING WHILE INTOXICATED",
+    "ENDANG": "ENDANGERING",
+    "EVAD": "EVADING",
+    "FEL": "FELONY",
+    "FIN": "FINANCIAL",
+    "FORG": "FORGERY",
+    "FV": "FAMILY VIOLENCE",
+    "HAB": "HABITATION",
+    "ID": "IDENTIFICATION",
+    "INFO": "INFORMATION",
+    "INST": "INSTRUMENT",
+    "INTOX": "INTOXICATED",
+    "LIC": "LICENSE",
+    "MARIJ": "MARIHUANA",
+    "MARIJUANA": "MARIHUANA",
+    "MISD": "MISDEMEANOR",
+    "MV": "MOTOR VEHICLE",
+    "OFF": "OFFENSE",
+    "ORG": "ORGANIZED",
+    "PG": "PENALTY GROUP",
+    "POSS": "POSSESSION",
+    "PREV": "PREVIOUS",
+    "PROP": "PROPERTY",
+    "SUBST": "SUBSTANCE",
+    "UNAUTH": "UNAUTHORIZED",
+    "UNL": "UNLAWFUL",
+    "VEH": "VEHICLE",
+    "W": "WITH",
+}
+STOP_WORDS = {"A", "AN", "OF", "THE"}
+# Tokens that make a charge an enhanced offense, e.g. in a drug free zone (DFZ) or as a
+# subsequent one, so names fuzzily match only if they have the same ones.
+# SUB isn't expanded, since Odyssey uses it for both SUBSTANCE and SUBSEQUENT.
+ENHANCEMENT_TOKENS = {"DFZ", "ENH", "ENHANCED", "HABITUAL", "PREVIOUS", "REPEAT", "SUB", "SUBSEQUENT"}
+# Periods and apostrophes are dropped rather than split on, so that I.D. reads as ID.
+ELIDED = re.compile(r"[.']")
+NON_ALPHANUMERIC = re.compile(r"[^A-Z0-9<>$]+")
+
+
+def normalize_charge_name(charge_name: str) -> str:
+    """
+    Returns the charge name in upper case, with punctuation turned into spaces, abbreviations
+    expanded and stop words dropped, e.g. "Poss CS PG 1 <1G" -> "POSSESSION CONTROLLED
+    SUBSTANCE PENALTY GROUP 1 <1G".
+    """
+    tokens = NON_ALPHANUMERIC.sub(" ", ELIDED.sub("", charge_name.upper())).split()
+    return " ".join(
+        ABBREVIATIONS.get(token, token) for token in tokens if token not in STOP_WORDS
+    )
+
+
+def has_extra_tokens(query_tokens: set[str], name_tokens: set[str]) -> bool:
+    """
+    Returns whether a charge name and a UMich charge name differ by more than misspellings:
+    either of them has an enhancement token the other lacks, or the charge name has more
+    tokens the UMich name lacks than the UMich name has tokens the charge name lacks.
+    """
+    extra_tokens = query_tokens - name_tokens
+    missing_tokens = name_tokens - query_tokens
+    return bool((extra_tokens | missing_tokens) & ENHANCEMENT_TOKENS) or len(extra_tokens) > len(missing_tokens)
+
+
+def trigrams(normalized_name: str) -> set[str]:
+    padded = f"  {normalized_name} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class ChargeMatcher:
+    """
+    Finds the UMich charge name that a charge name from a case refers to.
+
+    A lookup tries the exact name, then the normalized name (see normalize_charge_name),
+    and then the closest normalized name by trigram similarity. That last step never adds
+    or drops an enhancement, or maps a charge to a less specific one: a name isn't matched
+    to a candidate with other enhancement tokens, like DFZ in "POSS CS PG 1 <1G DFZ" or ENH,
+    or that lacks some of its tokens (see has_extra_tokens). Candidates for the last
+    step come from an inverted index of trigrams, and trigrams shared by more than
+    `max_postings` names are left out of it, so a lookup only ever reads short posting
+    lists and scores at most `max_candidates` names, however many names there are.
+
+    Args:
+        charge_names: The UMich charge names.
+        min_score: The lowest Dice similarity of trigrams accepted as a match.
+        max_postings: Trigrams in more names than this aren't used to find candidates.
+        max_candidates: Number of candidates, by trigrams shared, that are scored.
+    """
+
+    def __init__(
+        self,
+        charge_names: list[str],
+        min_score: float = 0.9,
+        max_postings: int = 500,
+        max_candidates: int = 50,
+    ):
+        self.charge_names = set(charge_names)
+        self.min_score = min_score
+        self.max_postings = max_postings
+        self.max_candidates = max_candidates
+
+        # Normalized names, each with the first UMich charge name normalized to it.
+        self.names_by_normalized_name: dict[str, str] = {}
+        for charge_name in charge_names:
+            self.names_by_normalized_name.setdefault(normalize_charge_name(charge_name), charge_name)
+        self.normalized_names = list(self.names_by_normalized_name)
+        self.name_trigrams = [trigrams(name) for name in self.normalized_names]
+        self.name_tokens = [set(name.split()) for name in self.normalized_names]
+        postings = defaultdict(list)
+        for name_id, name_trigrams in enumerate(self.name_trigrams):
+            for trigram in name_trigrams:
+                postings[trigram].append(name_id)
+        self.postings = {
+            trigram: name_ids for trigram, name_ids in postings.items() if len(name_ids) <= max_postings
+        }
+
+    def match(self, charge_name: str) -> tuple[str, float] | None:
+        """
+        Returns the UMich charge name that best matches charge_name and a confidence score
+        between 0 and 1, where exact and normalized matches score 1, or None if no name
+        scores at least min_score.
+        """
+        if charge_name in self.charge_names:
+            return charge_name, 1.0
+        normalized_name = normalize_charge_name(charge_name)
+        if normalized_name in self.names_by_normalized_name:
+            return self.names_by_normalized_name[normalized_name], 1.0
+        if not normalized_name:
+            return None
+
+        query_trigrams = trigrams(normalized_name)
+        query_tokens = set(normalized_name.split())
+        shared_counts = defaultdict(int)
+        for trigram in query_trigrams:
+            for name_id in self.postings.get(trigram, ()):
+                shared_counts[name_id] += 1
+        candidates = sorted(shared_counts, key=shared_counts.get, reverse=True)[: self.max_candidates]
+
+        best_name_id, best_score = None, 0.0
+        for name_id in candidates:
+            if has_extra_tokens(query_tokens, self.name_tokens[name_id]):
+                continue
+            name_trigrams = self.name_trigrams[name_id]
+            score = 2 * len(query_trigrams & name_trigrams) / (len(query_trigrams) + len(name_trigrams))
+            if score > best_score:
+                best_name_id, best_score = name_id, score
+        if best_name_id is None or best_score < self.min_score:
+            return None
+        return self.names_by_normalized_name[self.normalized_names[best_name_id]], round(best_score, 3)
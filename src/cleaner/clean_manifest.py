@@ -0,0 +1,91 @@
+import json
+import logging
+import os
+
+
+class CleanManifest:
+    """
+    Record of the parsed cases already cleaned, kept as one JSON file next to case_json_cleaned.
+
+    For every cleaned case, keyed by the name of its cleaned file, it stores the html_hash
+    of the parsed case, the cleaner version and the file the cleaned case went to. A case
+    only needs cleaning again when its html_hash or the cleaner version is different, or
+    its cleaned file is missing.
+
+    For every parsed file it also stores its mtime and size, so that files which haven't
+    changed since they were cleaned are skipped without being read.
+    """
+
+    def __init__(self, path: str, cleaner_version: str):
+        self.path = path
+        self.cleaner_version = cleaner_version
+        self.files: dict[str, dict] = {}
+        self.cases: dict[str, dict] = {}
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                manifest = json.load(f)
+            self.files = manifest["files"]
+            self.cases = manifest["cases"]
+        except (json.JSONDecodeError, KeyError):
+            logging.info(f"Clean manifest {self.path} is unreadable, so every case will be cleaned")
+            self.files = {}
+            self.cases = {}
+
+    def is_case_current(self, case_key: str, html_hash: str | None = None) -> bool:
+        """Returns True if the case was cleaned by this cleaner version, from this html_hash if given."""
+        entry = self.cases.get(case_key)
+        if entry is None or entry["cleaner_version"] != self.cleaner_version:
+            return False
+        if html_hash is not None and entry["html_hash"] != html_hash:
+            return False
+        return os.path.exists(entry["output_path"])
+
+    def current_hashes(self) -> dict[str, str]:
+        """Returns the html_hash of every case whose cleaned output is current."""
+        return {
+            case_key: entry["html_hash"]
+            for case_key, entry in self.cases.items()
+            if self.is_case_current(case_key)
+        }
+
+    def is_file_current(self, case_json_filename: str, case_json_file_path: str) -> bool:
+        """
+        Returns True if the parsed file is unchanged since this cleaner version cleaned it,
+        and, for a per-case JSON file, its cleaned case is still there.
+        """
+        entry = self.files.get(case_json_filename)
+        if entry is None or entry["cleaner_version"] != self.cleaner_version:
+            return False
+        stat = os.stat(case_json_file_path)
+        if (entry["mtime_ns"], entry["size"]) != (stat.st_mtime_ns, stat.st_size):
+            return False
+        if case_json_filename.endswith(".json"):
+            return self.is_case_current(case_json_filename)
+        return True
+
+    def record_file(self, case_json_filename: str, case_json_file_path: str) -> None:
+        stat = os.stat(case_json_file_path)
+        self.files[case_json_filename] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "cleaner_version": self.cleaner_version,
+        }
+
+    def record_case(self, case_key: str, html_hash: str, output_path: str) -> None:
+        self.cases[case_key] = {
+            "html_hash": html_hash,
+            "cleaner_version": self.cleaner_version,
+            "output_path": output_path,
+        }
+
+    def save(self) -> None:
+        """Writes the manifest, replacing the old one only once the new one is complete."""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"files": self.files, "cases": self.cases}, f)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,55 @@
+import re
+
+# Joins the strings of the events. Motions don't contain it, so no match spans two strings.
+SEPARATOR = "\x00"
+
+
+def flatten_events(events: list | str) -> list[str]:
+    """Returns the strings of an event list and its sublists, in order."""
+    if isinstance(events, list):
+        return [string for event in events for string in flatten_events(event)]
+    return [events]
+
+
+class MotionMatcher:
+    """
+    Finds which of a list of motions appear, case-insensitively, in the events of a case.
+
+    The lowercased motions are compiled into one regular expression, which is tried once
+    at every position of the lowercased events' text, so finding them takes a single pass however many
+    motions there are. At each position, the alternation, longest motion first, matches
+    the longest motion starting there. A motion contained in a longer one (e.g. "Motion to
+    Reduce Bond" in "Motion to Reduce Bond Hearing") is found through the longer one, as
+    every motion is credited with the motions it contains. Lowercasing both sides with
+    str.lower, rather than matching with re.IGNORECASE, which folds some characters like
+    "İ" and "ſ" differently, keeps every match a key of motions_by_lowered.
+
+    Args:
+        motions: The motions to look for. Matches are returned in this order.
+    """
+
+    def __init__(self, motions: list[str]):
+        self.motions = list(motions)
+        lowered = {motion: motion.lower() for motion in self.motions}
+        # The motions each motion contains, itself included.
+        self.contained_motions = {
+            motion: {other for other in self.motions if lowered[other] in lowered[motion]}
+            for motion in self.motions
+        }
+        self.motions_by_lowered = {lowered[motion]: motion for motion in self.motions}
+        alternation = "|".join(
+            re.escape(motion) for motion in sorted(self.motions_by_lowered, key=len, reverse=True)
+        )
+        self.pattern = re.compile(f"(?=({alternation}))") if self.motions else None
+
+    def find(self, events: list | str) -> list[str]:
+        """Returns the motions that appear in the events, in the order of the motion list."""
+        if self.pattern is None:
+            return []
+        text = SEPARATOR.join(flatten_events(events)).lower()
+        found = set()
+        for match in self.pattern.finditer(text):
+            motion = self.motions_by_lowered[match.group(1)]
+            if motion not in found:
+                found |= self.contained_motions[motion]
+        return [motion for motion in self.motions if motion in found]
@@ -0,0 +1,158 @@
+import json
+import logging
+from datetime import datetime
+from typing import Callable
+
+import xxhash
+
+# Formats of the dates in parsed cases, tried in order when generalizing one.
+DATE_FORMATS = ("%m/%d/%Y", "%Y-%m-%d")
+# What a date can be generalized to, with the format of the result.
+GENERALIZATIONS = {"year": "%Y", "month": "%Y-%m"}
+RULE_ACTIONS = ("drop", "hash", "generalize")
+
+
+def parse_path(path: str) -> list[str | None]:
+    """
+    Splits a path like "Disposition_Information[*].judicial officer" into its steps, where
+    a key is a step into a dict and None, written [*], is a step into every item of a list.
+    """
+    steps = []
+    for part in path.split("."):
+        if part.endswith("[*]"):
+            steps.extend([part[: -len("[*]")], None])
+        else:
+            steps.append(part)
+    if any(step == "" for step in steps):
+        raise ValueError(f"Invalid redaction path '{path}'")
+    return steps
+
+
+def compile_path(path: str, leaf: Callable[[dict, str], None]) -> Callable[[dict | list], None]:
+    """
+    Returns a function that calls leaf(parent, key) for each dict of a case holding the
+    last key of path, going straight down the steps of the path to get there.
+    """
+    *parent_steps, last_key = parse_path(path)
+    if last_key is None:
+        raise ValueError(f"Redaction path '{path}' must end with a key")
+
+    def visit_leaf(data):
+        if isinstance(data, dict) and last_key in data:
+            leaf(data, last_key)
+
+    visit = visit_leaf
+    for step in reversed(parent_steps):
+        visit = visit_items(visit) if step is None else visit_key(step, visit)
+    return visit
+
+
+def visit_items(visit: Callable) -> Callable:
+    def visit_each(data):
+        if isinstance(data, list):
+            for item in data:
+                visit(item)
+
+    return visit_each
+
+
+def visit_key(key: str, visit: Callable) -> Callable:
+    def visit_child(data):
+        if isinstance(data, dict) and key in data:
+            visit(data[key])
+
+    return visit_child
+
+
+def get_path(data: dict, steps: list[str]):
+    """Returns the value at a path of keys, raising KeyError if one is missing."""
+    for step in steps:
+        data = data[step]
+    return data
+
+
+def generalize_date(value, to: str) -> str:
+    """Returns a date like '01/30/2021' as e.g. '2021' or '2021-01', or '' if it isn't a date."""
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).strftime(GENERALIZATIONS[to])
+        except (TypeError, ValueError):
+            continue
+    return ""
+
+
+class Redactor:
+    """
+    Removes or disguises the identifying fields of a cleaned case, following a rules file:
+
+    - drop: paths of keys deleted from the cleaned case.
+    - hash: keys of the cleaned case set to the xxh64 of values of the parsed case. Each
+      rule has the "path" it sets, the paths it hashes "from", joined with its "separator",
+      and whether they are "required". A missing required value raises KeyError, and any
+      other missing value sets the key to "".
+    - generalize: dates of the cleaned case, at "path", reduced "to" their year or month.
+
+    Paths are keys joined with dots, and [*] after a key stands for every item of its
+    list, e.g. "Disposition_Information[*].judicial officer". Each path is compiled once
+    into a function that goes straight to the keys it names, so redacting a case doesn't
+    walk any part of it the rules don't point to.
+    """
+
+    def __init__(self, rules: dict):
+        unknown_actions = set(rules) - set(RULE_ACTIONS)
+        if unknown_actions:
+            raise ValueError(f"Unknown redaction actions {sorted(unknown_actions)}, expected {RULE_ACTIONS}")
+        self.drops = [compile_path(path, self.drop_key) for path in rules.get("drop", [])]
+        self.hashes = []
+        for rule in rules.get("hash", []):
+            target_steps = parse_path(rule["path"])
+            source_paths = [parse_path(path) for path in rule["from"]]
+            if None in target_steps or any(None in steps for steps in source_paths):
+                raise ValueError(f"Hash rule for '{rule['path']}' can't use [*]")
+            self.hashes.append(
+                (target_steps, source_paths, rule.get("separator", ":"), rule.get("required", False))
+            )
+        self.generalizations = []
+        for rule in rules.get("generalize", []):
+            if rule["to"] not in GENERALIZATIONS:
+                raise ValueError(f"Unknown generalization '{rule['to']}', expected one of {list(GENERALIZATIONS)}")
+            self.generalizations.append(compile_path(rule["path"], self.generalize_key(rule["to"])))
+
+    @classmethod
+    def from_file(cls, rules_path: str) -> "Redactor":
+        with open(rules_path, "r") as file_handle:
+            return cls(json.load(file_handle))
+
+    @staticmethod
+    def drop_key(parent: dict, key: str) -> None:
+        del parent[key]
+
+    @staticmethod
+    def generalize_key(to: str) -> Callable[[dict, str], None]:
+        def generalize(parent: dict, key: str) -> None:
+            parent[key] = generalize_date(parent[key], to)
+
+        return generalize
+
+    def hash_value(self, input_dict: dict, source_paths: list, separator: str, required: bool) -> str:
+        try:
+            values = [str(get_path(input_dict, steps)) for steps in source_paths]
+        except (KeyError, TypeError) as e:
+            if required:
+                raise
+            logging.error(f"Missing data to hash: {e}")
+            return ""
+        return xxhash.xxh64(separator.join(values)).hexdigest()
+
+    def redact(self, input_dict: dict, output_dict: dict) -> dict:
+        """Applies the rules to output_dict, the cleaned case of input_dict, in place, and returns it."""
+        for target_steps, source_paths, separator, required in self.hashes:
+            parent = output_dict
+            for step in target_steps[:-1]:
+                parent = parent.setdefault(step, {})
+            parent[target_steps[-1]] = self.hash_value(input_dict, source_paths, separator, required)
+        for drop in self.drops:
+            drop(output_dict)
+        for generalization in self.generalizations:
+            generalization(output_dict)
+        return output_dict
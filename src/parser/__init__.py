@@ -1,19 +1,51 @@
 import logging
 import os
 import csv
+import gzip
 import json
 import traceback
-import xxhash
 from time import time
-import sys
 import importlib
-from bs4 import BeautifulSoup
-from typing import Tuple, List, Optional
+from bs4 import BeautifulSoup, Comment, ProcessingInstruction
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Tuple, List, Optional
+from .parse_manifest import ParseManifest
+from .fingerprint import HtmlFingerprint
+from .case_output import (
+    NDJSON_FORMATS,
+    append_ndjson,
+    check_output_format,
+    dumps_case_json,
+    get_ndjson_path,
+)
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 project_root = os.path.dirname(parent_dir)
 
+# Version of the parsed JSON. Bump it whenever a change to the parser changes its
+# output, so that incremental parses re-parse every case.
+PARSER_VERSION = "3"
+
+# BeautifulSoup tree builders the parser can run on. lxml is several times faster than
+# the pure-Python html.parser and gives the same case JSON, html_hash included.
+HTML_BACKENDS = ("html.parser", "lxml")
+
+# County parser classes by county name. A county can be registered explicitly, otherwise
+# its class is imported from the parser.<county> module the first time it is needed.
+COUNTY_PARSERS = {}
+# One instance of each county parser class, shared by every Parser in the process.
+_county_parser_instances = {}
+# Fingerprint of each county, built from resources/fingerprint_rules.json when first needed.
+_county_fingerprints = {}
+
+
+def register_county_parser(county: str, cls: type) -> None:
+    """Registers the parser class of a county, replacing the one imported from parser.<county>."""
+    county = county.lower()
+    COUNTY_PARSERS[county] = cls
+    _county_parser_instances.pop(county, None)
+
 
 class Parser:
     def __init__(self):
@@ -35,36 +67,43 @@ class Parser:
         if test:
             logger.info(f"Test mode is on")
         # Construct the module, class, and method names
+        county = county.lower()
         module_name = county  # ex: 'hays'
         class_name = f"Parser{county.capitalize()}"  # ex: 'ParserHays'
         method_name = f"parser_{county}"  # ex: 'parser_hays'
 
+        # The instance is created once per process and reused for every case.
+        instance = _county_parser_instances.get(county)
+        if instance is not None:
+            return instance, getattr(instance, method_name, None)
+
         logger.info(
             f"Module: {module_name}\nClass: {class_name}\nMethod: {method_name}\n"
         )
 
-        # Add the current directory to the system path
-        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
         try:
-            # Dynamically import the module
-            module = importlib.import_module(module_name)
+            cls = COUNTY_PARSERS.get(county)
+            if cls is None:
+                # Dynamically import the module from this package
+                module = importlib.import_module(f".{module_name}", __package__)
 
-            logger.info(f"Module '{module_name}' imported successfully.")
+                logger.info(f"Module '{module_name}' imported successfully.")
 
-            # Retrieve the class from the module
-            cls = getattr(module, class_name)
+                # Retrieve the class from the module
+                cls = getattr(module, class_name)
 
-            logger.info(f"Class '{class_name}' retrieved successfully.")
+                logger.info(f"Class '{class_name}' retrieved successfully.")
 
-            if cls is None:
-                logger.info(
-                    f"Class '{class_name}' not found in module '{module_name}'."
-                )
-                return None, None
+                if cls is None:
+                    logger.info(
+                        f"Class '{class_name}' not found in module '{module_name}'."
+                    )
+                    return None, None
+                COUNTY_PARSERS[county] = cls
 
             # Instantiate the class
             instance = cls()
+            _county_parser_instances[county] = instance
 
             # Retrieve the method with the specified name
             method = getattr(instance, method_name, None)
@@ -138,6 +177,63 @@ class Parser:
             logger.info(f"Error in get_list_of_html: {e}")
             raise
 
+    def get_list_of_stored_html(
+        self, case_store_path: str, case_number: str, logger
+    ) -> List[Tuple[str, str]]:
+        """
+        Lists the latest version of each case in the scraper's compressed case store.
+
+        The manifest holds one line per stored version, so the last line of a case wins.
+        Returns (case number, gzipped blob path) pairs.
+        """
+        latest_hashes = {}
+        with open(os.path.join(case_store_path, "manifest.jsonl"), "r") as file_handle:
+            for line in file_handle:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.info(f"Skipping unreadable case store manifest line: {line}")
+                    continue
+                latest_hashes[entry["case_id"]] = entry["content_hash"]
+        if case_number:
+            latest_hashes = {case_number: latest_hashes[case_number]} if case_number in latest_hashes else {}
+        return [
+            (
+                case_id,
+                os.path.join(case_store_path, "blobs", content_hash[:2], f"{content_hash}.html.gz"),
+            )
+            for case_id, content_hash in latest_hashes.items()
+        ]
+
+    def open_case_html(self, case_html_file_path: str):
+        """Opens a case page for reading, decompressing it on the fly if it is gzipped."""
+        if case_html_file_path.endswith(".gz"):
+            return gzip.open(case_html_file_path, "rt", encoding="utf-8", errors="ignore")
+        return open(case_html_file_path, "r", encoding="utf-8", errors="ignore")
+
+    def make_case_soup(self, file, html_backend: str = "html.parser") -> BeautifulSoup:
+        """
+        Builds the soup of a case page with the given HTML backend.
+
+        lxml turns the stray <?xml ...?> declaration in the body of Odyssey pages into a
+        comment, where html.parser keeps it as a processing instruction. It is turned back,
+        so that both backends serialize the body, and so hash it, the same way.
+        """
+        if html_backend not in HTML_BACKENDS:
+            raise ValueError(f"Unknown HTML backend '{html_backend}', expected one of {HTML_BACKENDS}")
+        case_soup = BeautifulSoup(file, html_backend)
+        if html_backend == "lxml":
+            for comment in case_soup.find_all(string=lambda text: isinstance(text, Comment)):
+                if comment.startswith("?") and comment.endswith("?"):
+                    comment.replace_with(ProcessingInstruction(comment[1:]))
+        return case_soup
+
+    def get_fingerprint(self, county: str) -> HtmlFingerprint:
+        county = county.lower()
+        if county not in _county_fingerprints:
+            _county_fingerprints[county] = HtmlFingerprint.for_county(county)
+        return _county_fingerprints[county]
+
     def get_html_path(
         self, case_html_path: str, case_html_file_name: str, case_number: str, logger
     ) -> str:
@@ -151,15 +247,31 @@ class Parser:
             raise
 
     def write_json_data(
-        self, case_json_path: str, case_number: str, case_data: str, logger
+        self, case_json_path: str, case_number: str, case_data: str, logger, output_format: str = "pretty"
     ) -> None:
+        """
+        Writes the JSON of a case in one of the OUTPUT_FORMATS: a pretty or compact
+        <case_number>.json, or a line appended to the NDJSON file of the day.
+        """
         try:
             indent_level = 4
             logger.info(f"Writing JSON to: {case_json_path}")
-            with open(
-                os.path.join(case_json_path, case_number + ".json"), "w"
-            ) as file_handle:
-                file_handle.write(json.dumps(case_data, indent=indent_level))
+            if output_format in NDJSON_FORMATS:
+                append_ndjson(
+                    get_ndjson_path(case_json_path, output_format),
+                    [dumps_case_json(case_data, output_format)],
+                )
+            elif output_format == "compact":
+                with open(
+                    os.path.join(case_json_path, case_number + ".json"), "wb"
+                ) as file_handle:
+                    file_handle.write(dumps_case_json(case_data, output_format))
+            else:
+                check_output_format(output_format)
+                with open(
+                    os.path.join(case_json_path, case_number + ".json"), "w"
+                ) as file_handle:
+                    file_handle.write(json.dumps(case_data, indent=indent_level))
         except Exception as e:
             logger.info(f"Error in write_json_data: {e}")
             raise
@@ -181,8 +293,214 @@ class Parser:
             print(f"Error in write_error_log: {e}")
             raise
 
+    def parse_case_file(
+        self,
+        county: str,
+        case_number: str,
+        case_html_file_path: str,
+        case_json_path: str,
+        logger,
+        test=False,
+        html_backend: str = "html.parser",
+        output_format: str = "pretty",
+    ) -> Optional[str]:
+        """
+        Parses one case page and writes its JSON to case_json_path.
+
+        Returns the html_hash of the case, or None if there is no parser for the county.
+        Errors while parsing are raised.
+        """
+        case_data = self.parse_case_data(
+            county, case_number, case_html_file_path, logger, test, html_backend
+        )
+        if case_data is None:
+            return None
+        self.write_json_data(case_json_path, case_number, case_data, logger, output_format)
+        return case_data["html_hash"]
+
+    def parse_case_data(
+        self,
+        county: str,
+        case_number: str,
+        case_html_file_path: str,
+        logger,
+        test=False,
+        html_backend: str = "html.parser",
+    ) -> Optional[dict]:
+        """Returns the parsed data of a case page, or None if there is no parser for the county."""
+        parser_instance, parser_function = self.get_class_and_method(
+            county=county, logger=logger, test=test
+        )
+        logger.info(f"{case_number} - parsing")
+
+        with self.open_case_html(case_html_file_path) as file:
+            case_soup = self.make_case_soup(file, html_backend)
+
+        if parser_instance is not None and parser_function is not None:
+            case_data = parser_function(county, case_number, logger, case_soup)
+        else:
+            logger.info("Error: Could not obtain parser instance or function.")
+            return None
+
+        # Regions of the page that change without the case changing, like the balance due,
+        # are left out of the hash, so that they don't make a new version of the case.
+        fingerprint = self.get_fingerprint(county)
+        case_data["html_hash"] = fingerprint.fingerprint(case_soup)
+        # Only with the legacy_html_hash rule, to let the updater recognize cases stored
+        # with the html_hash from before fingerprints.
+        legacy_html_hash = fingerprint.legacy_hash(case_soup)
+        if legacy_html_hash is not None:
+            case_data["legacy_html_hash"] = legacy_html_hash
+        return case_data
+
+    def skip_unchanged_cases(
+        self,
+        case_html_list: List[Tuple[str, str]],
+        case_json_file_paths: Dict[str, str],
+        parse_manifest: ParseManifest,
+        logger,
+    ) -> List[Tuple[str, str]]:
+        """Returns the (case number, HTML file path) pairs the parse manifest doesn't have as current."""
+        unchanged_case_numbers = {
+            case_number
+            for case_number, case_html_file_path in case_html_list
+            if parse_manifest.is_current(
+                case_number,
+                case_html_file_path,
+                case_json_file_paths[case_number],
+            )
+        }
+        logger.info(f"Skipping {len(unchanged_case_numbers)} cases already parsed and unchanged")
+        return [
+            (case_number, case_html_file_path)
+            for case_number, case_html_file_path in case_html_list
+            if case_number not in unchanged_case_numbers
+        ]
+
+    def record_parsed_cases(
+        self,
+        parse_manifest: Optional[ParseManifest],
+        cases: List[Tuple[str, str]],
+        case_html_file_paths: Dict[str, str],
+        case_json_file_paths: Dict[str, str],
+    ) -> None:
+        """Records the (case number, html_hash) of cases whose JSON is written in the parse manifest, if any."""
+        if parse_manifest is None:
+            return
+        for case_number, html_hash in cases:
+            parse_manifest.record(
+                case_number,
+                case_html_file_paths[case_number],
+                html_hash,
+                case_json_file_paths[case_number],
+            )
+
+    def parse_case_files(
+        self,
+        county: str,
+        case_html_list: List[Tuple[str, str]],
+        case_json_path: str,
+        logger,
+        workers: int = 1,
+        chunksize: int = 16,
+        test=False,
+        parse_manifest: Optional[ParseManifest] = None,
+        html_backend: str = "html.parser",
+        output_format: str = "pretty",
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Parses (case number, html path) pairs, in this process or fanned out to a pool of
+        `workers` processes in chunks of `chunksize` cases. Workers write the JSON themselves
+        and only send back the html_hash of each case. Failed cases go to the error log.
+
+        With an NDJSON output format, workers send back the serialized cases instead, and
+        they are appended to the NDJSON file of the day `chunksize` cases at a time, so the
+        file only ever has one writer.
+
+        With a parse manifest, cases it shows as already parsed are skipped, and the manifest
+        is updated with the cases parsed.
+
+        Returns the case numbers that were parsed and those that failed.
+        """
+        check_output_format(output_format)
+        if output_format in NDJSON_FORMATS:
+            ndjson_path = get_ndjson_path(case_json_path, output_format)
+            case_json_file_paths = {
+                case_number: ndjson_path for case_number, _ in case_html_list
+            }
+        else:
+            case_json_file_paths = {
+                case_number: os.path.join(case_json_path, case_number + ".json")
+                for case_number, _ in case_html_list
+            }
+        if parse_manifest is not None:
+            case_html_list = self.skip_unchanged_cases(case_html_list, case_json_file_paths, parse_manifest, logger)
+        case_html_file_paths = dict(case_html_list)
+        tasks = [
+            (county, case_number, case_html_file_path, case_json_path, test, html_backend, output_format)
+            for case_number, case_html_file_path in case_html_list
+        ]
+
+        parsed_case_numbers = []
+        failed_case_numbers = []
+        # NDJSON lines not written yet, with the (case number, html_hash) of their cases,
+        # which are only recorded in the manifest once their lines are written.
+        ndjson_lines = []
+        unwritten_cases = []
+
+        def record_cases(cases: list) -> None:
+            self.record_parsed_cases(parse_manifest, cases, case_html_file_paths, case_json_file_paths)
+
+        def write_ndjson_lines() -> None:
+            append_ndjson(ndjson_path, ndjson_lines)
+            record_cases(unwritten_cases)
+            ndjson_lines.clear()
+            unwritten_cases.clear()
+
+        executor = None
+        if workers > 1:
+            logger.info(f"Parsing with {workers} processes in chunks of {chunksize}")
+            executor = ProcessPoolExecutor(max_workers=workers)
+            results = executor.map(_parse_case_file, tasks, chunksize=chunksize)
+        else:
+            results = (_parse_case_file(task, self, logger) for task in tasks)
+        try:
+            for case_number, html_hash, error, ndjson_line in results:
+                if error is not None:
+                    print(error)
+                    self.write_error_log(county, case_number)
+                    failed_case_numbers.append(case_number)
+                elif html_hash is not None:
+                    parsed_case_numbers.append(case_number)
+                    if ndjson_line is None:
+                        record_cases([(case_number, html_hash)])
+                        continue
+                    ndjson_lines.append(ndjson_line)
+                    unwritten_cases.append((case_number, html_hash))
+                    if len(ndjson_lines) >= chunksize:
+                        write_ndjson_lines()
+            if ndjson_lines:
+                write_ndjson_lines()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            # Save the cases parsed so far even if parsing stopped partway, so that
+            # the next incremental parse doesn't parse them again.
+            if parse_manifest is not None:
+                parse_manifest.save()
+        return parsed_case_numbers, failed_case_numbers
+
     def parse(
-        self, county: str, case_number: str, parse_single_file: bool = False, test=False
+        self,
+        county: str,
+        case_number: str,
+        parse_single_file: bool = False,
+        test=False,
+        workers: int = 1,
+        chunksize: int = 16,
+        incremental: bool = False,
+        html_backend: str = "html.parser",
+        output_format: str = "pretty",
     ) -> None:
         logger = self.configure_logger()
 
@@ -203,61 +521,38 @@ class Parser:
             # start
             START_TIME_PARSER = time()
             logger.info(f"Time started: {START_TIME_PARSER}")
-            # creating a list of json files already parsed
-            cached_case_json_list = [
-                file_name.split(".")[0] for file_name in os.listdir(case_json_path)
-            ]
-
-            # Get a list of the HTML files that it needs to parse.
-            case_html_list = self.get_list_of_html(
-                case_html_path, case_number, county, logger, parse_single_file
-            )
-            logger.info(f"Starting for loop to parse {len(case_html_list)} cases")
-            for case_html_file_path in case_html_list:
-                try:
-                    case_number = os.path.basename(case_html_file_path).split(".")[0]
-
-                    logger.info(f"{case_number} - parsing")
-
-                    with open(
-                        case_html_file_path, "r", encoding="utf-8", errors="ignore"
-                    ) as file:
-                        case_soup = BeautifulSoup(file, "html.parser")
+            # With incremental parsing, cases parsed before from the same page by the
+            # same parser version are skipped.
+            parse_manifest = None
+            if incremental and not parse_single_file:
+                parse_manifest = ParseManifest(
+                    os.path.join(os.path.dirname(case_json_path), "parse_manifest.json"),
+                    PARSER_VERSION,
+                    logger,
+                )
 
-                    parser_instance, parser_function = self.get_class_and_method(
-                        county=county, logger=logger, test=test
+            # Get a list of the HTML files that it needs to parse. If the scraper kept
+            # the pages in its compressed case store, parse them from there instead.
+            case_store_path = os.path.join(os.path.dirname(case_html_path), "case_store")
+            if not parse_single_file and os.path.exists(os.path.join(case_store_path, "manifest.jsonl")):
+                case_html_list = self.get_list_of_stored_html(
+                    case_store_path, case_number, logger
+                )
+            else:
+                case_html_list = [
+                    (os.path.basename(case_html_file_path).split(".")[0], case_html_file_path)
+                    for case_html_file_path in self.get_list_of_html(
+                        case_html_path, case_number, county, logger, parse_single_file
                     )
-
-                    if parser_instance is not None and parser_function is not None:
-                        case_data = parser_function(
-                            county, case_number, logger, case_soup
-                        )
-                    else:
-                        logger.info(
-                            "Error: Could not obtain parser instance or function."
-                        )
-                        continue
-
-                    body = case_soup.find("body")
-                    tables = body.find_all("table")
-                    if tables:
-                        """
-                        Why balance table is dropped before hashing:
-                        The balance table is excluded from the hashing because
-                        balance is updated as any costs are paid off. Otherwise,
-                        the hash would change frequently and multiple versions 
-                        of the case would be captured that we don't want.
-                        """
-                        balance_table = tables[-1]
-                        if "Balance Due" in balance_table.text:
-                            balance_table.decompose()
-                    case_data["html_hash"] = xxhash.xxh64(str(body)).hexdigest()
-
-                    self.write_json_data(case_json_path, case_number, case_data, logger)
-
-                except Exception:
-                    print(traceback.format_exc())
-                    self.write_error_log(county, case_number)
+                ]
+            logger.info(f"Starting for loop to parse {len(case_html_list)} cases")
+            parsed_case_numbers, failed_case_numbers = self.parse_case_files(
+                county, case_html_list, case_json_path, logger, workers, chunksize, test,
+                parse_manifest, html_backend, output_format
+            )
+            logger.info(
+                f"Parsed {len(parsed_case_numbers)} cases, {len(failed_case_numbers)} failed"
+            )
 
             RUN_TIME_PARSER = time() - START_TIME_PARSER
             logger.info(f"Parsing took {RUN_TIME_PARSER} seconds")
@@ -265,6 +560,31 @@ class Parser:
             logger.info(f"Error in parse: {e}")
             raise
         
+def _parse_case_file(task: tuple, parser_instance: Optional[Parser] = None, logger=None):
+    """
+    Parses one case for `Parser.parse_case_files`, in this process or in a pool worker.
+
+    Returns the case number, its html_hash if it was parsed, the traceback if it failed,
+    and with an NDJSON output format, the serialized case for the caller to write.
+    """
+    county, case_number, case_html_file_path, case_json_path, test, html_backend, output_format = task
+    parser_instance = parser_instance or Parser()
+    logger = logger or logging.getLogger(name="pid: " + str(os.getpid()))
+    try:
+        if output_format in NDJSON_FORMATS:
+            case_data = parser_instance.parse_case_data(
+                county, case_number, case_html_file_path, logger, test, html_backend
+            )
+            if case_data is None:
+                return case_number, None, None, None
+            return case_number, case_data["html_hash"], None, dumps_case_json(case_data, output_format)
+        html_hash = parser_instance.parse_case_file(
+            county, case_number, case_html_file_path, case_json_path, logger, test, html_backend, output_format
+        )
+    except Exception:
+        return case_number, None, traceback.format_exc(), None
+    return case_number, html_hash, None, None
+
 if __name__ == "__main__":
     parser = Parser()
     parser.parse(county="hays", case_number=None, parse_single_file=True)
@@ -0,0 +1,82 @@
+import gzip
+import json
+import os
+from datetime import date
+from typing import Iterable, Iterator, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Formats the case JSON can be written in:
+# - pretty: one indented JSON file per case, as the parser always wrote.
+# - compact: one JSON file per case, without whitespace.
+# - ndjson: one compact case per line, in one file per county and day.
+# - ndjson.gz: the same, gzipped.
+OUTPUT_FORMATS = ("pretty", "compact", "ndjson", "ndjson.gz")
+NDJSON_FORMATS = ("ndjson", "ndjson.gz")
+
+
+def check_output_format(output_format: str) -> None:
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+
+
+def dumps_case_json(case_data: dict, output_format: str) -> bytes:
+    """Serializes a case for the output format, with orjson when it is installed."""
+    check_output_format(output_format)
+    if output_format == "pretty":
+        return json.dumps(case_data, indent=4).encode("utf-8")
+    if orjson is not None:
+        return orjson.dumps(case_data)
+    return json.dumps(case_data, separators=(",", ":")).encode("utf-8")
+
+
+def get_ndjson_path(folder_path: str, output_format: str, day: Optional[date] = None) -> str:
+    """Returns the NDJSON file of a day in folder_path, e.g. 2024-01-31.ndjson.gz."""
+    day = day or date.today()
+    return os.path.join(folder_path, f"{day.isoformat()}.{output_format}")
+
+
+def is_ndjson_file(file_name: str) -> bool:
+    return file_name.endswith(".ndjson") or file_name.endswith(".ndjson.gz")
+
+
+def append_ndjson(ndjson_path: str, lines: Iterable[bytes]) -> None:
+    """
+    Appends serialized cases to an NDJSON file with a single write. Every call to a
+    gzipped file adds a gzip member, and readers decompress the members one after another.
+    """
+    data = b"".join(line + b"\n" for line in lines)
+    if not data:
+        return
+    if ndjson_path.endswith(".gz"):
+        data = gzip.compress(data)
+    with open(ndjson_path, "ab") as file_handle:
+        file_handle.write(data)
+
+
+def read_ndjson(ndjson_path: str) -> Iterator[dict]:
+    """Yields the cases of an NDJSON file, gzipped or not, in the order they were written."""
+    opener = gzip.open if ndjson_path.endswith(".gz") else open
+    with opener(ndjson_path, "rb") as file_handle:
+        for line in file_handle:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_case_files(folder_path: str) -> Iterator[Tuple[str, dict]]:
+    """
+    Yields (file name, case) for every case in a folder of case JSON in any of the
+    OUTPUT_FORMATS: the case of each .json file, and every case of each NDJSON file. Files
+    are read in the order of their names, so cases of a later day come after earlier ones.
+    """
+    for file_name in sorted(os.listdir(folder_path)):
+        file_path = os.path.join(folder_path, file_name)
+        if is_ndjson_file(file_name):
+            for case_data in read_ndjson(file_path):
+                yield file_name, case_data
+        elif file_name.endswith(".json"):
+            with open(file_path, "r") as file_handle:
+                yield file_name, json.load(file_handle)
@@ -0,0 +1,133 @@
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+import xxhash
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+FINGERPRINT_RULES_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "resources", "fingerprint_rules.json"
+)
+
+
+def load_fingerprint_rules(county: str, rules_path: str = FINGERPRINT_RULES_PATH) -> dict:
+    """Returns the fingerprint rules of a county, with the default rules filling in what it doesn't set."""
+    with open(rules_path, "r") as file_handle:
+        all_rules = json.load(file_handle)
+    rules = dict(all_rules.get("default", {}))
+    rules.update(all_rules.get(county.lower(), {}))
+    return rules
+
+
+class HtmlFingerprint:
+    """
+    Hash of a case page that stays the same as long as the case itself doesn't change.
+
+    Odyssey pages carry regions that change on their own, like the balance due, which goes
+    down as costs are paid, or session tokens and timestamps, and hashing them would store
+    a new version of a case on every scrape. The fingerprint walks the body of the soup
+    once, feeding the name and attributes of each tag and each string to an xxh64 as it
+    goes, and leaves out the regions matched by the rules:
+
+    - skip_last_table_containing: the last table of the body, if its text contains one of these strings.
+    - skip_elements: tags, with their contents, matching a tag name and attribute values.
+    - skip_attributes: attributes whose values are left out of every tag.
+    - volatile_text_patterns: regular expressions removed from every string.
+
+    The soup isn't modified, and isn't serialized back to HTML, which makes this several
+    times cheaper than hashing str(body).
+
+    Cases stored before fingerprints were introduced carry the old html_hash, see
+    legacy_hash. It costs the full serialization fingerprints avoid, so it is only computed
+    when the legacy_html_hash rule is set to true, for a one-off parse, without incremental
+    parsing, that lets the updater recognize the cases of a database stored with it.
+    """
+
+    def __init__(self, rules: dict):
+        self.skip_last_table_containing: List[str] = rules.get("skip_last_table_containing", [])
+        self.skip_elements: Dict[str, List[dict]] = {}
+        for element in rules.get("skip_elements", []):
+            self.skip_elements.setdefault(element["tag"], []).append(element.get("attrs", {}))
+        self.skip_attributes = set(rules.get("skip_attributes", []))
+        self.volatile_text_patterns = [re.compile(pattern) for pattern in rules.get("volatile_text_patterns", [])]
+        self.legacy_html_hash: bool = rules.get("legacy_html_hash", False)
+
+    @classmethod
+    def for_county(cls, county: str, rules_path: str = FINGERPRINT_RULES_PATH) -> "HtmlFingerprint":
+        return cls(load_fingerprint_rules(county, rules_path))
+
+    def is_skipped(self, tag: Tag) -> bool:
+        for attrs in self.skip_elements.get(tag.name, ()):
+            if all(self.attribute_value(tag.get(name)) == value for name, value in attrs.items()):
+                return True
+        return False
+
+    @staticmethod
+    def attribute_value(value) -> Optional[str]:
+        # Multi-valued attributes like class come back from BeautifulSoup as lists.
+        if isinstance(value, list):
+            return " ".join(value)
+        return value
+
+    def find_skipped_table(self, body: Tag) -> Optional[Tag]:
+        if not self.skip_last_table_containing:
+            return None
+        tables = body.find_all("table")
+        if not tables:
+            return None
+        last_table = tables[-1]
+        last_table_text = last_table.get_text()
+        if any(text in last_table_text for text in self.skip_last_table_containing):
+            return last_table
+        return None
+
+    def legacy_hash(self, case_soup: BeautifulSoup) -> Optional[str]:
+        """
+        Returns the html_hash the parser wrote before fingerprints, or None if the
+        legacy_html_hash rule is off: the hex xxh64 of the serialized body, without its
+        last table if that has the balance due.
+        """
+        if not self.legacy_html_hash:
+            return None
+        body = case_soup.find("body")
+        body_html = str(body)
+        tables = body.find_all("table")
+        if tables and "Balance Due" in tables[-1].text:
+            # The same as decomposing the table before serializing, without changing the soup.
+            table_html = str(tables[-1])
+            start = body_html.rfind(table_html)
+            body_html = body_html[:start] + body_html[start + len(table_html):]
+        return xxhash.xxh64(body_html).hexdigest()
+
+    def fingerprint(self, case_soup: BeautifulSoup) -> str:
+        """Returns the hex xxh64 fingerprint of the body of a case page."""
+        body = case_soup.find("body") or case_soup
+        skipped_table = self.find_skipped_table(body)
+        hasher = xxhash.xxh64()
+        update = hasher.update
+        # Each level of the stack is an iterator over the children of an open tag.
+        stack = [iter(body.contents)]
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+                update(b"\x01")
+                continue
+            if isinstance(node, NavigableString):
+                text = str(node)
+                for pattern in self.volatile_text_patterns:
+                    text = pattern.sub("", text)
+                # The type is hashed too, so that a comment doesn't hash like the same text.
+                update(f"\x02{type(node).__name__}\x03{text}".encode("utf-8", "surrogatepass"))
+            elif isinstance(node, Tag):
+                if node is skipped_table or (node.name in self.skip_elements and self.is_skipped(node)):
+                    continue
+                attrs = "".join(
+                    f"\x03{name}={self.attribute_value(value)}"
+                    for name, value in node.attrs.items()
+                    if name not in self.skip_attributes
+                )
+                update(f"\x00{node.name}{attrs}".encode("utf-8", "surrogatepass"))
+                stack.append(iter(node.contents))
+        return hasher.hexdigest()
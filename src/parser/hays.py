@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 from bs4 import BeautifulSoup
 
 CHARGE_SEVERITY = {
@@ -10,6 +10,16 @@ CHARGE_SEVERITY = {
     "Misdemeanor B": 6,
 }
 
+# Sections of a Hays case page, in the order a root table is checked against them.
+# A table belongs to the first section whose markers all appear in its text.
+SECTION_MARKERS = [
+    ("case details", ["Case Type:", "Date Filed:"]),
+    ("related cases", ["Related Case Information"]),
+    ("party information", ["Party Information"]),
+    ("charge information", ["Charge Information"]),
+    ("events and orders", ["Events & Orders of the Court"]),
+]
+
 class ParserHays:
 
     def __init__(self):
@@ -23,7 +33,7 @@ class ParserHays:
                     for tag in tr.find_all(text=True)
                     if tag.strip()
                 ]
-                for tr in table.select("tr")
+                for tr in table.find_all("tr")
             ]
             return [row for row in rows if row]
         except Exception as e:
@@ -84,11 +94,21 @@ class ParserHays:
                 "charge level": "Unknown"
             }
 
+    def get_case_number_span(self, case_soup: BeautifulSoup):
+        # Same as case_soup.select('div[class="ssCaseDetailCaseNbr"] > span')[0], without
+        # matching a CSS selector against every tag of the page.
+        for div in case_soup.find_all("div", class_="ssCaseDetailCaseNbr"):
+            if div.get("class") == ["ssCaseDetailCaseNbr"]:
+                span = div.find("span", recursive=False)
+                if span is not None:
+                    return span
+        raise ValueError("No case number found in div.ssCaseDetailCaseNbr")
+
     def get_case_metadata(self, county: str, case_number: str, case_soup: BeautifulSoup, logger) -> Dict[str, str]:
         try:
             logger.info(f"Getting case metadata for {county} case {case_number}")
             return {
-                "code": case_soup.select('div[class="ssCaseDetailCaseNbr"] > span')[0].text,
+                "code": self.get_case_number_span(case_soup).text,
                 "odyssey id": case_number,
                 "county": county
             }  
@@ -199,8 +219,8 @@ class ParserHays:
                     for tag in tr.find_all(text=True)
                     if tag.strip()
                 ]
-                for tr in table.select("tr")
-                if tr.select("th")
+                for tr in table.find_all("tr")
+                if tr.find("th")
             ]
             table_rows = [
                 [" ".join(word.strip() for word in text.split()) for text in sublist]
@@ -271,6 +291,40 @@ class ParserHays:
             logger.info(f"Error getting disposition information: {e}")
             return dispositions
         
+    def classify_table(self, table_text: str) -> Optional[str]:
+        for section, markers in SECTION_MARKERS:
+            if all(marker in table_text for marker in markers):
+                return section
+        return None
+
+    def parse_case_details_section(self, table, case_data, county, case_soup, logger) -> None:
+        case_data["Case Details"] = self.get_case_details(table, logger)
+
+    def parse_related_cases_section(self, table, case_data, county, case_soup, logger) -> None:
+        case_data["Related Cases"] = [
+            case.text.strip().replace("\xa0", " ") for case in table.select("td")]
+
+    def parse_party_information_section(self, table, case_data, county, case_soup, logger) -> None:
+        party_rows = self.extract_rows(table, logger)
+        case_data["Defendent Information"] = self.parse_defendant_rows(party_rows, logger)
+        case_data["State Information"] = self.parse_state_rows(party_rows, logger)
+
+    def parse_charge_information_section(self, table, case_data, county, case_soup, logger) -> None:
+        case_data["Charge Information"] = self.get_charge_information(table, logger)
+
+    def parse_events_and_orders_section(self, table, case_data, county, case_soup, logger) -> None:
+        disposition_rows, other_event_rows = self.format_events_and_orders_of_the_court(table, case_soup, logger)
+
+        dispositions = []
+        logger.info(f"For Loop started\nGetting disposition information")
+        for row in disposition_rows:
+            case_data["Disposition Information"] = self.get_disposition_information(row, dispositions, case_data, table, county, case_soup, logger)
+        logger.info(f"For Loop ended\n")
+        if case_data["Disposition Information"]:
+            case_data["Top Charge"] = self.get_top_charge(dispositions, case_data.get("Charge Information", []), logger)
+            case_data["Dismissed Charges Count"] = self.count_dismissed_charges(case_data["Disposition Information"], logger)
+        case_data['Other Events and Hearings'] = other_event_rows
+
     def parser_hays(self, county: str, case_number: str, logger, case_soup: BeautifulSoup) -> Dict[str, Dict]:
         try:
             root_tables = case_soup.select("body>table")
@@ -279,35 +333,20 @@ class ParserHays:
                 "Case Metadata": self.get_case_metadata(county, case_number, case_soup, logger)
             }
 
+            section_parsers = {
+                "case details": self.parse_case_details_section,
+                "related cases": self.parse_related_cases_section,
+                "party information": self.parse_party_information_section,
+                "charge information": self.parse_charge_information_section,
+                "events and orders": self.parse_events_and_orders_section,
+            }
+
             for table in root_tables:
+                # table.text walks the whole table each time, so it is only built once per table.
+                section = self.classify_table(table.text)
+                if section is not None:
+                    section_parsers[section](table, case_data, county, case_soup, logger)
 
-                if "Case Type:" in table.text and "Date Filed:" in table.text:
-                    case_data["Case Details"] = self.get_case_details(table, logger)
-
-                elif "Related Case Information" in table.text:
-                    case_data["Related Cases"] = [
-                        case.text.strip().replace("\xa0", " ") for case in table.select("td")]
-
-                elif "Party Information" in table.text:
-                    case_data["Defendent Information"] = self.parse_defendant_rows(self.extract_rows(table, logger), logger)
-                    case_data["State Information"] = self.parse_state_rows(self.extract_rows(table, logger), logger)
-
-                elif "Charge Information" in table.text:
-                    case_data["Charge Information"] = self.get_charge_information(table, logger)
-
-                elif "Events & Orders of the Court" in table.text:
-                    disposition_rows, other_event_rows = self.format_events_and_orders_of_the_court(table, case_soup, logger)
-
-                    dispositions = []
-                    logger.info(f"For Loop started\nGetting disposition information")
-                    for row in disposition_rows:
-                        case_data["Disposition Information"] = self.get_disposition_information(row, dispositions, case_data, table, county, case_soup, logger)
-                    logger.info(f"For Loop ended\n")
-                    if case_data["Disposition Information"]:
-                        case_data["Top Charge"] = self.get_top_charge(dispositions, case_data.get("Charge Information", []), logger)
-                        case_data["Dismissed Charges Count"] = self.count_dismissed_charges(case_data["Disposition Information"], logger)
-                    case_data['Other Events and Hearings'] = other_event_rows
-                    
             return case_data
         except Exception as e:
             logger.info(f"Error parsing Hays case: {e}")
@@ -0,0 +1,71 @@
+import json
+import os
+from typing import Dict, Optional
+
+from .case_output import is_ndjson_file
+
+
+class ParseManifest:
+    """
+    Record of the case pages already parsed, kept as one JSON file next to case_json.
+
+    For every case it stores the mtime and size of the page that was parsed, the html_hash
+    written to its JSON, the file its JSON went to and the parser version. A case only needs
+    parsing again when its page changed on disk, its JSON is missing, or the parser version
+    is different. Cases written to an NDJSON file of an earlier day count as parsed as long
+    as the output format is still NDJSON.
+    """
+
+    def __init__(self, path: str, parser_version: str, logger):
+        self.path = path
+        self.parser_version = parser_version
+        self.logger = logger
+        self.cases: Dict[str, dict] = {}
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as file_handle:
+                self.cases = json.load(file_handle)
+        except json.JSONDecodeError:
+            self.logger.info(f"Parse manifest {self.path} is unreadable, so every case will be parsed")
+            self.cases = {}
+
+    def is_current(self, case_number: str, case_html_file_path: str, case_json_file_path: str) -> bool:
+        """Returns True if the case was parsed from this exact page by this parser version."""
+        entry = self.cases.get(case_number)
+        if entry is None or entry["parser_version"] != self.parser_version:
+            return False
+        parsed_json_file_path = entry.get("json_path", case_json_file_path)
+        if is_ndjson_file(parsed_json_file_path) != is_ndjson_file(case_json_file_path):
+            return False
+        if not os.path.exists(parsed_json_file_path):
+            return False
+        stat = os.stat(case_html_file_path)
+        return entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size
+
+    def record(
+        self,
+        case_number: str,
+        case_html_file_path: str,
+        html_hash: Optional[str],
+        case_json_file_path: Optional[str] = None,
+    ) -> None:
+        stat = os.stat(case_html_file_path)
+        self.cases[case_number] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "html_hash": html_hash,
+            "parser_version": self.parser_version,
+        }
+        if case_json_file_path is not None:
+            self.cases[case_number]["json_path"] = case_json_file_path
+
+    def save(self) -> None:
+        """Writes the manifest, replacing the old one only once the new one is complete."""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as file_handle:
+            json.dump(self.cases, file_handle)
+        os.replace(temp_path, self.path)
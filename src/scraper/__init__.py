@@ -1,22 +1,73 @@
+import asyncio
 import logging
 import os
 import csv
 import urllib.parse
-import sys
 from datetime import datetime, timedelta
 from time import time
+import aiohttp
 import requests
 from bs4 import BeautifulSoup
-from .helpers import *
+from .helpers import (
+    DEFAULT_BURST,
+    CircuitBreaker,
+    HTTPMethod,
+    RateLimiter,
+    RequestFailedError,
+    RetryPolicy,
+    create_async_session,
+    create_search_form_data,
+    create_single_case_search_form_data,
+    get_rate_limiter,
+    request_page_with_retry,
+    request_page_with_retry_async,
+    write_case_html,
+    write_debug_and_quit,
+)
+from .checkpoint import ScrapeCheckpoint
+from .case_index import CaseIndex
+from .case_store import CaseStore
 import importlib
-from typing import Optional, Tuple, Callable, Type, List
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Optional, Tuple, Callable, Type, List
 import importlib.util
 import re
+import threading
+
+# County scraper classes by county name. A county can be registered explicitly, otherwise
+# its class is imported from the scraper.<county> module the first time it is needed.
+COUNTY_SCRAPERS: dict[str, type] = {}
+# One instance of each county scraper class, shared by every Scraper in the process.
+_county_scraper_instances: dict[str, object] = {}
+_county_scraper_lock = threading.Lock()
+
+def register_county_scraper(county: str, cls: type) -> None:
+    """
+    Registers the scraper class of a county, replacing the one imported from scraper.<county>.
+
+    :param county: The name of the county, e.g. 'hays'.
+    :param cls: A class with a `scraper_<county>` method.
+    """
+    county = county.lower()
+    with _county_scraper_lock:
+        COUNTY_SCRAPERS[county] = cls
+        _county_scraper_instances.pop(county, None)
 
 class Scraper:
     """Scrape Odyssey html files into an output folder"""
-    def __init__(self):
-        pass
+    def __init__(
+        self,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+    ):
+        # Every request goes through one rate limiter. Unless one is given, it is the
+        # process-wide limiter, so scrapers of different counties share per-host budgets.
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_rate_limiter()
+        # Without a retry policy, each request retries with a backoff based on its ms_wait.
+        self.retry_policy = retry_policy
+        # Without a circuit breaker, the retry policy's is used, by default the process-wide one.
+        self.circuit_breaker = circuit_breaker
 
     def set_defaults(
         self, 
@@ -184,7 +235,10 @@ class Scraper:
     ) -> Tuple[Type[object], Callable]:
         
         """
-        Dynamically imports a module, retrieves a class, and gets a method from it based on the county name.
+        Gets the scraper class of a county and the method that scrapes its cases.
+
+        The class is looked up in the registry, or imported from the scraper.<county> module
+        and registered. It is instantiated once per process, so repeated calls are cheap.
 
         :param county: The name of the county, used to construct module, class, and method names.
         :param logger: Logger instance for logging errors.
@@ -193,34 +247,39 @@ class Scraper:
         :raises AttributeError: If the class or method cannot be found.
         """
 
+        county = county.lower()
         module_name = county
         class_name = f"Scraper{county.capitalize()}"
         method_name = f"scraper_{county}"
 
-        # Add the current directory to the system path
-        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-        
         try:
-            # Dynamically import the module
-            module = importlib.import_module(module_name)
-            
-            # Retrieve the class from the module
-            cls = getattr(module, class_name, None)
-            if cls is None:
-                raise AttributeError(f"Class '{class_name}' not found in module '{module_name}'")
+            with _county_scraper_lock:
+                instance = _county_scraper_instances.get(county)
+                if instance is None:
+                    cls = COUNTY_SCRAPERS.get(county)
+                    if cls is None:
+                        # Dynamically import the module from this package
+                        module = importlib.import_module(f".{module_name}", __package__)
+
+                        # Retrieve the class from the module
+                        cls = getattr(module, class_name, None)
+                        if cls is None:
+                            raise AttributeError(f"Class '{class_name}' not found in module '{module_name}'")
+                        COUNTY_SCRAPERS[county] = cls
+
+                    # Instantiate the class
+                    instance = cls()
+                    _county_scraper_instances[county] = instance
 
-            # Instantiate the class
-            instance = cls()
-            
             # Retrieve the method with the specified name
             method = getattr(instance, method_name, None)
             if method is None:
-                raise AttributeError(f"Method '{method_name}' not found in class '{class_name}'")
+                raise AttributeError(f"Method '{method_name}' not found in class '{type(instance).__name__}'")
 
             return instance, method
 
         except (FileNotFoundError, ImportError, AttributeError) as e:
-            logger.exception(e, "Error dynamically loading module or retrieving class/method.")
+            logger.exception(f"Error dynamically loading module or retrieving class/method: {e}")
             raise
 
     def scrape_main_page(self, 
@@ -268,6 +327,9 @@ class Scraper:
                     logger=logger,
                     http_method=HTTPMethod.GET,
                     ms_wait=ms_wait,
+                    rate_limiter=self.rate_limiter,
+                    retry_policy=self.retry_policy,
+                    circuit_breaker=self.circuit_breaker,
                     data=data,
                 )
 
@@ -278,6 +340,9 @@ class Scraper:
                 logger=logger,
                 http_method=HTTPMethod.GET,
                 ms_wait=ms_wait,
+                rate_limiter=self.rate_limiter,
+                retry_policy=self.retry_policy,
+                circuit_breaker=self.circuit_breaker,
             )
             main_soup = BeautifulSoup(main_page_html, "html.parser")
         except Exception as e:
@@ -349,6 +414,9 @@ class Scraper:
             http_method=HTTPMethod.GET,
             logger=logger,
             ms_wait=ms_wait,
+            rate_limiter=self.rate_limiter,
+            retry_policy=self.retry_policy,
+            circuit_breaker=self.circuit_breaker,
         )
         search_soup = BeautifulSoup(search_page_html, "html.parser")
 
@@ -419,6 +487,9 @@ class Scraper:
             logger=logger,
             data=create_single_case_search_form_data(hidden_values, case_number),
             ms_wait=ms_wait,
+            rate_limiter=self.rate_limiter,
+            retry_policy=self.retry_policy,
+            circuit_breaker=self.circuit_breaker,
         )
         return BeautifulSoup(results_page_html, "html.parser")
 
@@ -431,7 +502,9 @@ class Scraper:
         case_html_path: str,
         session: requests.sessions.Session,
         logger: logging.Logger,
-        ms_wait: int
+        ms_wait: int,
+        case_index: Optional[CaseIndex] = None,
+        case_store: Optional[CaseStore] = None
     ) -> None:
 
         results_soup = self.get_search_results(session, search_url, logger, ms_wait, hidden_values, case_number)
@@ -444,6 +517,9 @@ class Scraper:
         
         if case_urls:
             case_id = case_urls[0].split("=")[1]
+            if case_index and case_index.is_fresh(case_id):
+                logger.info(f"{case_id} - fetched recently, skipping")
+                return
             logger.info(f"{case_id} - scraping case")
             
             case_html = request_page_with_retry(
@@ -452,14 +528,19 @@ class Scraper:
                 verification_text="Date Filed",
                 logger=logger,
                 ms_wait=ms_wait,
+                rate_limiter=self.rate_limiter,
+                retry_policy=self.retry_policy,
+                circuit_breaker=self.circuit_breaker,
             )
             
             logger.info(f"{len(case_html)} response string length")
 
-            with open(
-                os.path.join(case_html_path, f"{case_id}.html"), "w"
-            ) as file_handle:
-                file_handle.write(case_html)
+            if case_store:
+                case_store.put(case_id, case_html)
+            else:
+                write_case_html(case_html_path, case_id, case_html)
+            if case_index:
+                case_index.record(case_id, case_html)
         else:
             logger.warning("No case URLs found.")
 
@@ -543,12 +624,78 @@ class Scraper:
             logger=logger,
             data=create_search_form_data(date_string, jo_id, hidden_values, odyssey_version),
             ms_wait=ms_wait,
+            rate_limiter=self.rate_limiter,
+            retry_policy=self.retry_policy,
+            circuit_breaker=self.circuit_breaker,
         )
         
         results_soup = BeautifulSoup(results_page_html, "html.parser")
         
         return results_page_html, results_soup
 
+    def get_checkpoint(
+        self,
+        case_html_path: str,
+        logger: logging.Logger,
+        resume: bool
+    ) -> ScrapeCheckpoint:
+        """
+        Opens the scrape checkpoint journal, which sits next to the case_html folder (data/<county>/).
+
+        :param resume: If True, keep the progress already in the journal. Otherwise start a new journal.
+        :returns: The checkpoint for this scrape.
+        """
+        checkpoint = ScrapeCheckpoint(
+            os.path.join(os.path.dirname(os.path.abspath(case_html_path)), "scrape_checkpoint.jsonl"), logger
+        )
+        if not resume:
+            checkpoint.reset()
+        return checkpoint
+
+    def get_case_index(
+        self,
+        case_html_path: str,
+        logger: logging.Logger,
+        refetch_after_days: Optional[float],
+        case_store: Optional[CaseStore] = None
+    ) -> Optional[CaseIndex]:
+        """
+        Opens the index of downloaded cases, which sits next to the case_html folder (data/<county>/).
+
+        :param refetch_after_days: Cases fetched longer ago than this are requested again. None disables
+            the index, so every case is requested.
+        :returns: The case index, or None if it is disabled.
+        """
+        if refetch_after_days is None:
+            return None
+        return CaseIndex(
+            os.path.join(os.path.dirname(os.path.abspath(case_html_path)), "case_index.jsonl"),
+            case_html_path,
+            logger,
+            refetch_after_days,
+            case_store,
+        )
+
+    def get_case_store(
+        self,
+        case_html_path: str,
+        logger: logging.Logger,
+        storage: str
+    ) -> Optional[CaseStore]:
+        """
+        Opens the compressed case store, which sits next to the case_html folder (data/<county>/case_store/).
+
+        :param storage: 'html' to write one plain .html file per case to case_html, or 'store' to keep
+            gzipped, content-addressed versions of each case in the case store.
+        :returns: The case store, or None if case pages are written as plain html.
+        :raises ValueError: If the storage type is unknown.
+        """
+        if storage == "html":
+            return None
+        if storage == "store":
+            return CaseStore(os.path.join(os.path.dirname(os.path.abspath(case_html_path)), "case_store"), logger)
+        raise ValueError(f"Unknown case storage '{storage}', expected 'html' or 'store'")
+
     def scrape_multiple_cases(
         self,
         county: str,
@@ -563,10 +710,18 @@ class Scraper:
         session: requests.Session,
         ms_wait: int,
         start_date: str,
-        end_date: str
+        end_date: str,
+        max_workers: int = 1,
+        resume: bool = False,
+        case_index: Optional[CaseIndex] = None,
+        case_store: Optional[CaseStore] = None
     ) -> None:
         start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+
+        scraper_instance, scraper_function = self.get_class_and_method(county, logger)
+        # A search unit (one date for one judicial officer) is journaled once all of its cases are fetched.
+        checkpoint = self.get_checkpoint(case_html_path, logger, resume)
         
         for date in (start_date + timedelta(n) for n in range((end_date - start_date).days + 1)):
             date_string = date.strftime("%m/%d/%Y")
@@ -575,17 +730,267 @@ class Scraper:
                 if JO_name not in judicial_officer_to_ID:
                     logger.error(f"Judicial officer {JO_name} not found on search page. Continuing.")
                     continue
+
+                if checkpoint.is_unit_complete(date_string, JO_name):
+                    logger.info(f"Already scraped cases on {date_string} for {JO_name}. Skipping.")
+                    continue
                 
                 jo_id = judicial_officer_to_ID[JO_name]
                 logger.info(f"Searching cases on {date_string} for {JO_name}")
                 
-                results_page_html, results_soup = self.scrape_results_page(
-                    odyssey_version, base_url, search_url, hidden_values, jo_id, date_string, session, logger, ms_wait
+                try:
+                    results_page_html, results_soup = self.scrape_results_page(
+                        odyssey_version, base_url, search_url, hidden_values, jo_id, date_string, session, logger, ms_wait
+                    )
+                except RequestFailedError as e:
+                    logger.error(
+                        f"Searching cases on {date_string} for {JO_name} failed, so it will be searched again on resume: {e!r}"
+                    )
+                    checkpoint.record_failure(date_string, JO_name, repr(e))
+                    continue
+
+                fetched_case_ids, failed_case_ids = scraper_function(
+                    base_url, results_soup, case_html_path, logger, session, ms_wait,
+                    max_workers=max_workers, rate_limiter=self.rate_limiter, retry_policy=self.retry_policy,
+                    circuit_breaker=self.circuit_breaker, case_index=case_index, case_store=case_store
                 )
-                
-                scraper_instance, scraper_function = self.get_class_and_method(county, logger)
-                print(scraper_function)
-                scraper_function(base_url, results_soup, case_html_path, logger, session, ms_wait)
+                checkpoint.record_cases(fetched_case_ids)
+                if failed_case_ids:
+                    logger.warning(
+                        f"{len(failed_case_ids)} cases failed on {date_string} for {JO_name}, so it will be searched again on resume."
+                    )
+                    checkpoint.record_failure(date_string, JO_name, "cases failed", failed_case_ids)
+                else:
+                    checkpoint.record_unit(date_string, JO_name)
+
+    def scrape_multiple_cases_sharded(
+        self,
+        county: str,
+        odyssey_version: int,
+        base_url: str,
+        notes: str,
+        court_calendar_link_text: str,
+        judicial_officers: List[str],
+        judicial_officer_to_ID: Dict[str, str],
+        case_html_path: str,
+        logger: logging.Logger,
+        ssl: bool,
+        ms_wait: int,
+        start_date: str,
+        end_date: str,
+        processes: int,
+        max_workers: int = 1,
+        resume: bool = False,
+        refetch_after_days: Optional[float] = 1,
+        storage: str = "html"
+    ) -> None:
+        """
+        Scrapes a date range with a pool of processes, for backfills too large for one session.
+
+        Every date is searched for every judicial officer, and each of these search units is sent to
+        the pool. Each worker process opens its own session, logs in through `scrape_main_page` and
+        loads the search page once, then scrapes the units it is given into the shared case_html
+        folder. Case files are written atomically, so shards that find the same case don't collide.
+        Only this process writes the checkpoint journal, from the results the workers send back.
+
+        The rate configured for the portal is split evenly between the processes, so the pool
+        makes requests no faster than a single process would.
+
+        :param notes: The county notes from texas_county_data.csv, which may hold a public login.
+        :param processes: Number of worker processes.
+        :param max_workers: Number of threads fetching case details within each process.
+        :param resume: If True, skip the search units already completed in the scrape checkpoint journal.
+        :param refetch_after_days: Passed to each worker's case index, see `get_case_index`.
+        :param storage: How workers keep case pages, see `get_case_store`.
+        """
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+
+        checkpoint = self.get_checkpoint(case_html_path, logger, resume)
+        units = []
+        for date in (start_date + timedelta(n) for n in range((end_date - start_date).days + 1)):
+            date_string = date.strftime("%m/%d/%Y")
+            for JO_name in judicial_officers:
+                if JO_name not in judicial_officer_to_ID:
+                    logger.error(f"Judicial officer {JO_name} not found on search page. Continuing.")
+                    continue
+                if checkpoint.is_unit_complete(date_string, JO_name):
+                    logger.info(f"Already scraped cases on {date_string} for {JO_name}. Skipping.")
+                    continue
+                units.append((date_string, JO_name, judicial_officer_to_ID[JO_name]))
+
+        bucket = self.rate_limiter.bucket(base_url)
+        shard_config = {
+            "county": county,
+            "odyssey_version": odyssey_version,
+            "base_url": base_url,
+            "notes": notes,
+            "court_calendar_link_text": court_calendar_link_text,
+            "case_html_path": case_html_path,
+            "ssl": ssl,
+            "ms_wait": ms_wait,
+            "max_workers": max_workers,
+            "refetch_after_days": refetch_after_days,
+            "storage": storage,
+            "requests_per_second": bucket.requests_per_second / processes,
+            "burst": bucket.burst,
+        }
+        logger.info(f"Scraping {len(units)} search units with {processes} processes")
+
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = {
+                executor.submit(_scrape_shard_unit, shard_config, date_string, jo_id): (date_string, JO_name)
+                for date_string, JO_name, jo_id in units
+            }
+            for future in as_completed(futures):
+                date_string, JO_name = futures[future]
+                try:
+                    fetched_case_ids, failed_case_ids = future.result()
+                except Exception as e:
+                    logger.error(f"Searching cases on {date_string} for {JO_name} failed, so it will be searched again on resume: {e}")
+                    checkpoint.record_failure(date_string, JO_name, repr(e))
+                    continue
+                checkpoint.record_cases(fetched_case_ids)
+                if failed_case_ids:
+                    logger.warning(
+                        f"{len(failed_case_ids)} cases failed on {date_string} for {JO_name}, so it will be searched again on resume."
+                    )
+                    checkpoint.record_failure(date_string, JO_name, "cases failed", failed_case_ids)
+                else:
+                    checkpoint.record_unit(date_string, JO_name)
+
+    async def scrape_results_page_async(
+        self,
+        odyssey_version: int,
+        base_url: str,
+        search_url: str,
+        hidden_values: dict[str, str],
+        jo_id: str,
+        date_string: str,
+        session: aiohttp.ClientSession,
+        logger: logging.Logger,
+        ms_wait: int
+    ) -> Tuple[str, BeautifulSoup]:
+        """
+        Asyncio counterpart of `scrape_results_page` that requests the results page through an `aiohttp` session.
+
+        :returns: A tuple containing the HTML of the results page and the parsed BeautifulSoup object.
+        """
+
+        search_url = (
+            search_url
+            if odyssey_version < 2017
+            else urllib.parse.urljoin(base_url, "Hearing/SearchHearings/HearingSearch")
+        )
+
+        verification_text = (
+            "Record Count"
+            if odyssey_version < 2017
+            else "Search Results"
+        )
+
+        results_page_html = await request_page_with_retry_async(
+            session=session,
+            url=search_url,
+            verification_text=verification_text,
+            logger=logger,
+            data=create_search_form_data(date_string, jo_id, hidden_values, odyssey_version),
+            ms_wait=ms_wait,
+            rate_limiter=self.rate_limiter,
+            retry_policy=self.retry_policy,
+            circuit_breaker=self.circuit_breaker,
+        )
+
+        results_soup = BeautifulSoup(results_page_html, "html.parser")
+
+        return results_page_html, results_soup
+
+    async def scrape_multiple_cases_async(
+        self,
+        county: str,
+        odyssey_version: int,
+        base_url: str,
+        search_url: str,
+        hidden_values: Dict[str, str],
+        judicial_officers: List[str],
+        judicial_officer_to_ID: Dict[str, str],
+        case_html_path: Optional[str],
+        logger: logging.Logger,
+        session: requests.Session,
+        ms_wait: int,
+        start_date: str,
+        end_date: str,
+        max_connections: int = 10,
+        resume: bool = False,
+        case_index: Optional[CaseIndex] = None,
+        case_store: Optional[CaseStore] = None
+    ) -> None:
+        """
+        Scrapes every date and judicial officer search, and the cases they return, concurrently on one event loop.
+
+        The cookies of the `requests` session used for the main and search pages (including any
+        public login) are carried over to a pooled `aiohttp` session, which then serves all of the
+        search and case detail requests. `max_connections` bounds how many are in flight at once.
+
+        :param session: The `requests` session that loaded the main and search pages.
+        :param max_connections: Maximum number of concurrent connections to the portal.
+        :param resume: If True, skip the search units already completed in the scrape checkpoint journal.
+        :param case_index: Index of downloaded cases used to skip cases fetched recently.
+        :param case_store: Compressed store to keep case pages in, instead of case_html.
+        """
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+
+        scraper_instance, scraper_function = self.get_class_and_method(county, logger)
+        scraper_function_async = getattr(scraper_instance, f"scraper_{county}_async")
+        checkpoint = self.get_checkpoint(case_html_path, logger, resume)
+
+        async def scrape_search_unit(async_session, date_string, JO_name, jo_id):
+            logger.info(f"Searching cases on {date_string} for {JO_name}")
+            results_page_html, results_soup = await self.scrape_results_page_async(
+                odyssey_version, base_url, search_url, hidden_values, jo_id, date_string, async_session, logger, ms_wait
+            )
+            fetched_case_ids, failed_case_ids = await scraper_function_async(
+                base_url, results_soup, case_html_path, logger, async_session, ms_wait,
+                rate_limiter=self.rate_limiter, retry_policy=self.retry_policy, circuit_breaker=self.circuit_breaker,
+                case_index=case_index,
+                case_store=case_store
+            )
+            checkpoint.record_cases(fetched_case_ids)
+            if failed_case_ids:
+                logger.warning(
+                    f"{len(failed_case_ids)} cases failed on {date_string} for {JO_name}, so it will be searched again on resume."
+                )
+                checkpoint.record_failure(date_string, JO_name, "cases failed", failed_case_ids)
+            else:
+                checkpoint.record_unit(date_string, JO_name)
+
+        async with create_async_session(session.verify, max_connections, session.cookies.get_dict()) as async_session:
+            search_units = []
+            for date in (start_date + timedelta(n) for n in range((end_date - start_date).days + 1)):
+                date_string = date.strftime("%m/%d/%Y")
+                for JO_name in judicial_officers:
+                    if JO_name not in judicial_officer_to_ID:
+                        logger.error(f"Judicial officer {JO_name} not found on search page. Continuing.")
+                        continue
+                    if checkpoint.is_unit_complete(date_string, JO_name):
+                        logger.info(f"Already scraped cases on {date_string} for {JO_name}. Skipping.")
+                        continue
+                    search_units.append((date_string, JO_name))
+            # A failed search unit mustn't cancel the others, whose cases are recorded as they finish.
+            results = await asyncio.gather(
+                *(
+                    scrape_search_unit(async_session, date_string, JO_name, judicial_officer_to_ID[JO_name])
+                    for date_string, JO_name in search_units
+                ),
+                return_exceptions=True,
+            )
+            for (date_string, JO_name), result in zip(search_units, results):
+                if isinstance(result, BaseException):
+                    logger.error(
+                        f"Searching cases on {date_string} for {JO_name} failed, so it will be searched again on resume: {result!r}"
+                    )
+                    checkpoint.record_failure(date_string, JO_name, repr(result))
 
     def scrape(
         self,
@@ -596,38 +1001,126 @@ class Scraper:
         end_date: str,
         court_calendar_link_text: Optional[str],
         case_number: Optional[str],
-        case_html_path: Optional[str]
+        case_html_path: Optional[str],
+        max_workers: int = 1,
+        use_async: bool = False,
+        max_connections: int = 10,
+        requests_per_second: Optional[float] = None,
+        burst: int = DEFAULT_BURST,
+        resume: bool = False,
+        refetch_after_days: Optional[float] = 1,
+        processes: int = 1,
+        storage: str = "html",
+        ssl: Optional[bool] = None
     ) -> None:
         ms_wait, start_date, end_date, court_calendar_link_text, case_number, ssl, county, case_html_path = self.set_defaults(
             ms_wait, start_date, end_date, court_calendar_link_text, case_number, ssl, county, case_html_path
         )
         
         logger = self.configure_logger()
-        county = self.format_county(county, logger)
-        session = self.create_session(logger)
+        county = self.format_county(county)
+        session = self.create_session(logger, ssl)
         
-        if case_html_path is None:
-            self.make_directories(county, logger)
+        case_html_path = self.make_directories(county, logger, case_html_path)
         
         base_url, odyssey_version, notes = self.get_ody_link(county, logger)
+        # ms_wait sets the pace for this portal unless an explicit rate is given
+        self.rate_limiter.configure_host(
+            base_url,
+            requests_per_second if requests_per_second is not None else (1000 / ms_wait if ms_wait else 0),
+            burst,
+        )
         main_page_html, main_soup = self.scrape_main_page(base_url, odyssey_version, session, notes, logger, ms_wait)
         search_url, search_page_html, search_soup = self.scrape_search_page(
             base_url, odyssey_version, main_page_html, main_soup, session, logger, ms_wait, court_calendar_link_text
         )
         
         hidden_values = self.get_hidden_values(odyssey_version, main_soup, search_soup, logger)
+        case_store = self.get_case_store(case_html_path, logger, storage)
+        case_index = self.get_case_index(case_html_path, logger, refetch_after_days, case_store)
         
         if case_number:
             self.scrape_individual_case(
-                base_url, search_url, hidden_values, case_number, case_html_path, session, logger, ms_wait
+                base_url, search_url, hidden_values, case_number, case_html_path, session, logger, ms_wait, case_index,
+                case_store
             )
         else:
             judicial_officers, judicial_officer_to_ID = self.scrape_jo_list(
                 odyssey_version, search_soup, judicial_officers, logger
             )
             scraper_start_time = time()
-            self.scrape_multiple_cases(
-                county, odyssey_version, base_url, search_url, hidden_values, judicial_officers, judicial_officer_to_ID,
-                case_html_path, logger, session, ms_wait, start_date, end_date
-            )
+            if processes > 1:
+                self.scrape_multiple_cases_sharded(
+                    county, odyssey_version, base_url, notes, court_calendar_link_text, judicial_officers,
+                    judicial_officer_to_ID, case_html_path, logger, ssl, ms_wait, start_date, end_date, processes,
+                    max_workers, resume, refetch_after_days, storage
+                )
+            elif use_async:
+                asyncio.run(self.scrape_multiple_cases_async(
+                    county, odyssey_version, base_url, search_url, hidden_values, judicial_officers, judicial_officer_to_ID,
+                    case_html_path, logger, session, ms_wait, start_date, end_date, max_connections, resume, case_index,
+                    case_store
+                ))
+            else:
+                self.scrape_multiple_cases(
+                    county, odyssey_version, base_url, search_url, hidden_values, judicial_officers, judicial_officer_to_ID,
+                    case_html_path, logger, session, ms_wait, start_date, end_date, max_workers, resume, case_index,
+                    case_store
+                )
             logger.info(f"\nTime to run script: {round(time() - scraper_start_time, 2)} seconds")
+
+# Session, search page and county scraper of a shard worker process, set up by its first search unit.
+_shard_worker = {}
+
+def _scrape_shard_unit(shard_config: dict, date_string: str, jo_id: str) -> Tuple[List[str], List[str]]:
+    """
+    Scrapes one search unit in a worker process of `Scraper.scrape_multiple_cases_sharded`.
+
+    :returns: The IDs of the cases fetched and of those that failed.
+    """
+    if not _shard_worker:
+        base_url = shard_config["base_url"]
+        odyssey_version = shard_config["odyssey_version"]
+        ms_wait = shard_config["ms_wait"]
+        scraper_instance = Scraper(
+            rate_limiter=RateLimiter(shard_config["requests_per_second"], shard_config["burst"])
+        )
+        scraper_instance.rate_limiter.configure_host(base_url, shard_config["requests_per_second"], shard_config["burst"])
+        logger = scraper_instance.configure_logger()
+        session = scraper_instance.create_session(logger, shard_config["ssl"])
+        main_page_html, main_soup = scraper_instance.scrape_main_page(
+            base_url, odyssey_version, session, shard_config["notes"], logger, ms_wait
+        )
+        search_url, search_page_html, search_soup = scraper_instance.scrape_search_page(
+            base_url, odyssey_version, main_page_html, main_soup, session, logger, ms_wait,
+            shard_config["court_calendar_link_text"]
+        )
+        county_scraper_instance, scraper_function = scraper_instance.get_class_and_method(shard_config["county"], logger)
+        case_store = scraper_instance.get_case_store(shard_config["case_html_path"], logger, shard_config["storage"])
+        _shard_worker.update(
+            scraper=scraper_instance,
+            logger=logger,
+            session=session,
+            search_url=search_url,
+            hidden_values=scraper_instance.get_hidden_values(odyssey_version, main_soup, search_soup, logger),
+            scraper_function=scraper_function,
+            case_index=scraper_instance.get_case_index(
+                shard_config["case_html_path"], logger, shard_config["refetch_after_days"], case_store
+            ),
+            case_store=case_store,
+        )
+
+    scraper_instance = _shard_worker["scraper"]
+    logger = _shard_worker["logger"]
+    logger.info(f"Searching cases on {date_string} for judicial officer {jo_id}")
+    results_page_html, results_soup = scraper_instance.scrape_results_page(
+        shard_config["odyssey_version"], shard_config["base_url"], _shard_worker["search_url"],
+        _shard_worker["hidden_values"], jo_id, date_string, _shard_worker["session"], logger, shard_config["ms_wait"]
+    )
+    return _shard_worker["scraper_function"](
+        shard_config["base_url"], results_soup, shard_config["case_html_path"], logger, _shard_worker["session"],
+        shard_config["ms_wait"], max_workers=shard_config["max_workers"], rate_limiter=scraper_instance.rate_limiter,
+        retry_policy=scraper_instance.retry_policy, circuit_breaker=scraper_instance.circuit_breaker,
+        case_index=_shard_worker["case_index"],
+        case_store=_shard_worker["case_store"]
+    )
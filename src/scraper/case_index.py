@@ -0,0 +1,73 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from logging import Logger
+from typing import Dict, Optional
+
+import xxhash
+
+
+class CaseIndex:
+    """
+    On-disk index of the case pages already downloaded, stored as append-only JSON lines.
+
+    For every case it keeps the time of the last fetch and an xxhash of the page. The same
+    case shows up on many hearing dates and under several judicial officers, so the
+    scraper asks the index before each case detail request and skips cases that were
+    fetched less than `refetch_after_days` days ago and are still on disk.
+    """
+
+    def __init__(
+        self, path: str, case_html_path: str, logger: Logger, refetch_after_days: float = 1, case_store=None
+    ):
+        self.path = path
+        self.case_html_path = case_html_path
+        # When pages are kept in a CaseStore, a case is on disk if the store has a version of it.
+        self.case_store = case_store
+        self.logger = logger
+        self.refetch_after = timedelta(days=refetch_after_days)
+        self.cases: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """Reads the index into memory. Later lines for a case replace earlier ones."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as file_handle:
+            for line in file_handle:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    self.logger.warning(f"Skipping unreadable case index line in {self.path}")
+                    continue
+                self.cases[entry["case_id"]] = entry
+        self.logger.info(f"Loaded case index {self.path}: {len(self.cases)} cases")
+
+    def is_fresh(self, case_id: str, now: Optional[datetime] = None) -> bool:
+        """Returns True if the case was fetched recently enough that it doesn't need to be requested again."""
+        entry = self.cases.get(case_id)
+        if entry is None:
+            return False
+        now = now or datetime.now()
+        if now - datetime.fromisoformat(entry["fetched_at"]) >= self.refetch_after:
+            return False
+        if self.case_store is not None:
+            return self.case_store.latest(case_id) is not None
+        return os.path.exists(os.path.join(self.case_html_path, f"{case_id}.html"))
+
+    def record(self, case_id: str, case_html: str) -> None:
+        """Records that a case was just fetched, along with the hash of its page."""
+        entry = {
+            "case_id": case_id,
+            "fetched_at": datetime.now().isoformat(timespec="seconds"),
+            "content_hash": xxhash.xxh64(case_html).hexdigest(),
+        }
+        with self._lock:
+            previous = self.cases.get(case_id)
+            if previous and previous["content_hash"] == entry["content_hash"]:
+                self.logger.info(f"{case_id} - unchanged since {previous['fetched_at']}")
+            self.cases[case_id] = entry
+            with open(self.path, "a") as file_handle:
+                file_handle.write(json.dumps(entry) + "\n")
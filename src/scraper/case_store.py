@@ -0,0 +1,102 @@
+import gzip
+import json
+import os
+import threading
+from datetime import datetime
+from logging import Logger
+from typing import Dict, List, Optional
+
+import xxhash
+
+
+class CaseStore:
+    """
+    Compressed, content-addressed storage for case pages.
+
+    Each distinct page is gzipped once into blobs/<hash[:2]>/<hash>.html.gz, where the hash
+    is the xxh64 of the page. manifest.jsonl maps case IDs to the hashes of their versions,
+    oldest first, one JSON line per new version. Scraping a case whose page hasn't changed
+    writes nothing, and the parser reads the latest version of each case straight from its blob.
+    """
+
+    MANIFEST_FILE_NAME = "manifest.jsonl"
+
+    def __init__(self, path: str, logger: Logger, compresslevel: int = 6):
+        self.path = path
+        self.logger = logger
+        self.compresslevel = compresslevel
+        self.manifest_path = os.path.join(path, self.MANIFEST_FILE_NAME)
+        self.cases: Dict[str, List[dict]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(path, "blobs"), exist_ok=True)
+        self.load()
+
+    def load(self) -> None:
+        """Reads the manifest into memory."""
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path, "r") as file_handle:
+            for line in file_handle:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    self.logger.warning(f"Skipping unreadable case store manifest line in {self.manifest_path}")
+                    continue
+                self.cases.setdefault(entry["case_id"], []).append(entry)
+        self.logger.info(f"Loaded case store {self.path}: {len(self.cases)} cases")
+
+    def blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.path, "blobs", content_hash[:2], f"{content_hash}.html.gz")
+
+    def put(self, case_id: str, case_html: str) -> str:
+        """
+        Stores a version of a case page, unless it is the same as the case's latest version.
+
+        :returns: The content hash of the page.
+        """
+        content_hash = xxhash.xxh64(case_html).hexdigest()
+        blob_path = self.blob_path(content_hash)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            # Write then rename, so a blob is either complete or missing.
+            temp_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(temp_path, "wt", encoding="utf-8", compresslevel=self.compresslevel) as file_handle:
+                file_handle.write(case_html)
+            os.replace(temp_path, blob_path)
+
+        with self._lock:
+            latest = self.latest(case_id)
+            if latest and latest["content_hash"] == content_hash:
+                self.logger.info(f"{case_id} - unchanged, not stored again")
+                return content_hash
+            entry = {
+                "case_id": case_id,
+                "content_hash": content_hash,
+                "stored_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            self.cases.setdefault(case_id, []).append(entry)
+            with open(self.manifest_path, "a") as file_handle:
+                file_handle.write(json.dumps(entry) + "\n")
+        return content_hash
+
+    def versions(self, case_id: str) -> List[dict]:
+        """Returns the manifest entries of a case, oldest first."""
+        return self.cases.get(case_id, [])
+
+    def latest(self, case_id: str) -> Optional[dict]:
+        versions = self.versions(case_id)
+        return versions[-1] if versions else None
+
+    def read(self, case_id: str, content_hash: Optional[str] = None) -> str:
+        """
+        Returns a version of a case page, the latest one unless a content hash is given.
+
+        :raises KeyError: If the case has no stored versions.
+        """
+        if content_hash is None:
+            latest = self.latest(case_id)
+            if latest is None:
+                raise KeyError(case_id)
+            content_hash = latest["content_hash"]
+        with gzip.open(self.blob_path(content_hash), "rt", encoding="utf-8") as file_handle:
+            return file_handle.read()
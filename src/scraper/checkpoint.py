@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+from logging import Logger
+from typing import Dict, Iterable, Set, Tuple
+
+
+class ScrapeCheckpoint:
+    """
+    Append-only journal of scrape progress, stored as JSON lines.
+
+    Each line records a fetched case ID, a completed search unit, which is one date
+    searched for one judicial officer, or a failed search unit with its error. A crashed
+    or interrupted scrape can be resumed from the journal, skipping every unit that
+    already finished, while failed units are searched again.
+    """
+
+    def __init__(self, path: str, logger: Logger):
+        self.path = path
+        self.logger = logger
+        self.completed_units: Set[Tuple[str, str]] = set()
+        self.fetched_case_ids: Set[str] = set()
+        # The last error of each search unit that failed, by (date, judicial officer).
+        self.failed_units: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """Reads the journal into memory. A line cut off by a crash is ignored."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as file_handle:
+            for line in file_handle:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    self.logger.warning(f"Skipping unreadable checkpoint line in {self.path}")
+                    continue
+                if entry.get("type") == "unit":
+                    self.completed_units.add((entry["date"], entry["judicial_officer"]))
+                elif entry.get("type") == "case":
+                    self.fetched_case_ids.add(entry["case_id"])
+                elif entry.get("type") == "failure":
+                    self.failed_units[(entry["date"], entry["judicial_officer"])] = entry["error"]
+        self.logger.info(
+            f"Loaded checkpoint {self.path}: {len(self.completed_units)} search units "
+            f"and {len(self.fetched_case_ids)} cases already done"
+        )
+
+    def reset(self) -> None:
+        """Starts a new, empty journal."""
+        with self._lock:
+            self.completed_units.clear()
+            self.fetched_case_ids.clear()
+            self.failed_units.clear()
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            open(self.path, "w").close()
+
+    def is_unit_complete(self, date_string: str, judicial_officer: str) -> bool:
+        return (date_string, judicial_officer) in self.completed_units
+
+    def record_cases(self, case_ids: Iterable[str]) -> None:
+        entries = [{"type": "case", "case_id": case_id} for case_id in case_ids]
+        with self._lock:
+            self.fetched_case_ids.update(entry["case_id"] for entry in entries)
+            self._append(entries)
+
+    def record_unit(self, date_string: str, judicial_officer: str) -> None:
+        with self._lock:
+            self.completed_units.add((date_string, judicial_officer))
+            self._append([{"type": "unit", "date": date_string, "judicial_officer": judicial_officer}])
+
+    def record_failure(
+        self, date_string: str, judicial_officer: str, error: str, case_ids: Iterable[str] = ()
+    ) -> None:
+        """Records that a search unit failed, or that `case_ids` of its cases did, and why."""
+        entry = {
+            "type": "failure",
+            "date": date_string,
+            "judicial_officer": judicial_officer,
+            "error": error,
+            "case_ids": list(case_ids),
+        }
+        with self._lock:
+            self.failed_units[(date_string, judicial_officer)] = error
+            self._append([entry])
+
+    def _append(self, entries: list) -> None:
+        if not entries:
+            return
+        with open(self.path, "a") as file_handle:
+            file_handle.write("".join(json.dumps(entry) + "\n" for entry in entries))
+            file_handle.flush()
+            os.fsync(file_handle.fileno())
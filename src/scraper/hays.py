@@ -1,35 +1,113 @@
+import asyncio
 import logging
-from helpers import *
+from concurrent.futures import ThreadPoolExecutor
+from .helpers import request_page_with_retry, request_page_with_retry_async, write_case_html
 
 class ScraperHays():
 
     def __init__(self):
         pass
 
-    def scraper_hays(self, base_url, results_soup, case_html_path, logger, session, ms_wait):
+    def get_case_urls(self, base_url, results_soup, logger):
         case_urls = [
             base_url + anchor["href"]
             for anchor in results_soup.select('a[href^="CaseDetail"]')
         ]
         logger.info(f"{len(case_urls)} cases found")
-        for case_url in case_urls:
-            case_id = case_url.split("=")[1]
-            logger.info(f"{case_id} - scraping case")
-            # make request for the case
-            try:
-                case_html = request_page_with_retry(
-                    session=session,
-                    url=case_url,
-                    verification_text="Date Filed",
-                    logger=logger,
-                    ms_wait=ms_wait,
-                )
-            except:
-                logger.info(f"Issue with scraping this case: {case_id}. Moving to next one.")
-            # write html case data
-            logger.info(f"{len(case_html)} response string length")
-
-            with open(
-                os.path.join(case_html_path, f"{case_id}.html"), "w"
-            ) as file_handle:
-                file_handle.write(case_html)
+        return case_urls
+
+    def split_fetched_and_failed(self, case_urls, results):
+        # scrape_case returns whether each case was written, in the same order as case_urls
+        fetched = [case_url.split("=")[1] for case_url, ok in zip(case_urls, results) if ok]
+        failed = [case_url.split("=")[1] for case_url, ok in zip(case_urls, results) if not ok]
+        return fetched, failed
+
+    def scrape_case(self, case_url, case_html_path, logger, session, ms_wait, rate_limiter=None, retry_policy=None, circuit_breaker=None, case_index=None, case_store=None):
+        case_id = case_url.split("=")[1]
+        if case_index and case_index.is_fresh(case_id):
+            logger.info(f"{case_id} - fetched recently, skipping")
+            return True
+        logger.info(f"{case_id} - scraping case")
+        # make request for the case
+        try:
+            case_html = request_page_with_retry(
+                session=session,
+                url=case_url,
+                verification_text="Date Filed",
+                logger=logger,
+                ms_wait=ms_wait,
+                rate_limiter=rate_limiter,
+                retry_policy=retry_policy,
+                circuit_breaker=circuit_breaker,
+            )
+        except Exception:
+            logger.info(f"Issue with scraping this case: {case_id}. Moving to next one.")
+            return False
+        # write html case data
+        logger.info(f"{len(case_html)} response string length")
+
+        if case_store:
+            case_store.put(case_id, case_html)
+        else:
+            write_case_html(case_html_path, case_id, case_html)
+        if case_index:
+            case_index.record(case_id, case_html)
+        return True
+
+    def scraper_hays(self, base_url, results_soup, case_html_path, logger, session, ms_wait, max_workers=1, rate_limiter=None, retry_policy=None, circuit_breaker=None, case_index=None, case_store=None):
+        """Scrapes every case on a results page and returns the IDs of the cases fetched and of those that failed."""
+        case_urls = self.get_case_urls(base_url, results_soup, logger)
+        if max_workers <= 1:
+            results = [
+                self.scrape_case(case_url, case_html_path, logger, session, ms_wait, rate_limiter, retry_policy, circuit_breaker, case_index, case_store)
+                for case_url in case_urls
+            ]
+            return self.split_fetched_and_failed(case_urls, results)
+
+        # All workers draw from the same rate limiter so that running them concurrently
+        # overlaps round trips without raising the request rate to the portal.
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(
+                lambda case_url: self.scrape_case(case_url, case_html_path, logger, session, ms_wait, rate_limiter, retry_policy, circuit_breaker, case_index, case_store),
+                case_urls,
+            ))
+        return self.split_fetched_and_failed(case_urls, results)
+
+    async def scrape_case_async(self, case_url, case_html_path, logger, session, ms_wait, rate_limiter=None, retry_policy=None, circuit_breaker=None, case_index=None, case_store=None):
+        case_id = case_url.split("=")[1]
+        if case_index and case_index.is_fresh(case_id):
+            logger.info(f"{case_id} - fetched recently, skipping")
+            return True
+        logger.info(f"{case_id} - scraping case")
+        try:
+            case_html = await request_page_with_retry_async(
+                session=session,
+                url=case_url,
+                verification_text="Date Filed",
+                logger=logger,
+                ms_wait=ms_wait,
+                rate_limiter=rate_limiter,
+                retry_policy=retry_policy,
+                circuit_breaker=circuit_breaker,
+            )
+        except Exception:
+            logger.info(f"Issue with scraping this case: {case_id}. Moving to next one.")
+            return False
+        logger.info(f"{len(case_html)} response string length")
+
+        if case_store:
+            case_store.put(case_id, case_html)
+        else:
+            write_case_html(case_html_path, case_id, case_html)
+        if case_index:
+            case_index.record(case_id, case_html)
+        return True
+
+    async def scraper_hays_async(self, base_url, results_soup, case_html_path, logger, session, ms_wait, rate_limiter=None, retry_policy=None, circuit_breaker=None, case_index=None, case_store=None):
+        case_urls = self.get_case_urls(base_url, results_soup, logger)
+        # the session's connector bounds how many of these are in flight, the rate limiter how often they start
+        results = await asyncio.gather(*(
+            self.scrape_case_async(case_url, case_html_path, logger, session, ms_wait, rate_limiter, retry_policy, circuit_breaker, case_index, case_store)
+            for case_url in case_urls
+        ))
+        return self.split_fetched_and_failed(case_urls, results)
@@ -1,13 +1,18 @@
 import os, sys
+import asyncio
+import threading
+import aiohttp
 import requests
-from time import sleep
-from datetime import date
+import random
+from time import sleep, monotonic
+from datetime import date, datetime, timezone
+from email.utils import parsedate_to_datetime
 from logging import Logger
-from typing import Dict, Optional, Tuple, Literal
+from typing import Dict, Optional, Literal
 from enum import Enum
+from urllib.parse import urlparse
 
-#This is called debug and quit.
-def write_debug_and_quit(
+def write_debug(
     page_text: str, logger: Logger, verification_text: Optional[str] = None
 ) -> None:
     logger.error(
@@ -16,12 +21,34 @@ def write_debug_and_quit(
             if verification_text
             else "Failed to load page."
         )
-        + f" Aborting. Writing /data/debug.html with response. May not be HTML."
+        + f" Writing /logging/debug.html with response. May not be HTML."
     )
-    with open(os.path.join(os.path.dirname(__file__), "..","..","logging", f"debug.html"), "w") as file_handle:
+    debug_path = os.path.join(os.path.dirname(__file__), "..", "..", "logging")
+    os.makedirs(debug_path, exist_ok=True)
+    with open(os.path.join(debug_path, "debug.html"), "w") as file_handle:
         file_handle.write(page_text)
+
+#This is called debug and quit.
+def write_debug_and_quit(
+    page_text: str, logger: Logger, verification_text: Optional[str] = None
+) -> None:
+    write_debug(page_text, logger, verification_text)
+    logger.error("Aborting.")
     sys.exit(1)
 
+def write_case_html(case_html_path: str, case_id: str, case_html: str) -> None:
+    """
+    Writes the html of a case to <case_html_path>/<case_id>.html.
+
+    The page is written to a temporary file first and then renamed over the target, so
+    processes scraping overlapping shards never leave a half-written case file behind.
+    """
+    file_path = os.path.join(case_html_path, f"{case_id}.html")
+    temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w") as file_handle:
+        file_handle.write(case_html)
+    os.replace(temp_path, file_path)
+
 # helper function to make form data
 def create_search_form_data(
     date: str, JO_id: str, hidden_values: Dict[str, str], odyssey_version: int
@@ -77,6 +104,238 @@ class HTTPMethod(Enum):
     GET: int = 2
 
 
+DEFAULT_REQUESTS_PER_SECOND = 5  # the same pace as the default 200 ms wait
+DEFAULT_BURST = 1
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill at `requests_per_second` up to `burst`. Callers reserve a token
+    and are told how long to wait for it; the balance may go negative, which
+    queues concurrent callers behind each other instead of letting them all wake
+    at once. A rate of 0 or less disables limiting.
+    """
+
+    def __init__(self, requests_per_second: float, burst: int = DEFAULT_BURST):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes a token and returns the number of seconds to wait before using it."""
+        if self.requests_per_second <= 0:
+            return 0
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.requests_per_second
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.requests_per_second
+
+    def acquire(self) -> None:
+        wait = self.reserve()
+        if wait:
+            sleep(wait)
+
+    async def acquire_async(self) -> None:
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class RateLimiter:
+    """
+    Per-host token buckets shared by every request the scraper makes.
+
+    Each Odyssey portal host gets its own bucket, so parallel workers, the sync and
+    async request paths, and different counties hosted on the same portal all draw
+    from one budget per host. Hosts without an explicit limit use the defaults.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+        burst: int = DEFAULT_BURST,
+    ):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def configure_host(self, url: str, requests_per_second: float, burst: int = DEFAULT_BURST) -> None:
+        """Sets the rate and burst for the host of `url`, replacing any existing bucket."""
+        with self._lock:
+            self._buckets[urlparse(url).netloc] = TokenBucket(requests_per_second, burst)
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+            return self._buckets[host]
+
+    def acquire(self, url: str) -> None:
+        self.bucket(url).acquire()
+
+    async def acquire_async(self, url: str) -> None:
+        await self.bucket(url).acquire_async()
+
+
+_shared_rate_limiter = RateLimiter()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Returns the process-wide rate limiter used when a caller doesn't provide one."""
+    return _shared_rate_limiter
+
+
+class RequestFailedError(Exception):
+    """Raised when a page could not be loaded and verified within the retry policy."""
+
+
+# Statuses that signal a temporary problem on the portal side and are worth retrying.
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    After `failure_threshold` consecutive transient failures (connection errors or
+    retryable statuses) the circuit for that host opens for `reset_timeout` seconds,
+    and requests to it wait out the cooldown instead of adding load to a struggling portal.
+    The first request after the cooldown is a trial: one more failure reopens the
+    circuit right away, a success closes it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait_time(self, host: str) -> float:
+        """Returns how many seconds requests to `host` must wait before the circuit lets them through."""
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return 0
+            remaining = opened_at + self.reset_timeout - monotonic()
+            if remaining > 0:
+                return remaining
+            # half open: let requests through, but reopen on the next failure
+            del self._opened_at[host]
+            self._failures[host] = self.failure_threshold - 1
+            return 0
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            self._failures.pop(host, None)
+
+    def reset(self) -> None:
+        """Closes the circuit of every host."""
+        with self._lock:
+            self._failures.clear()
+            self._opened_at.clear()
+
+    def record_failure(self, host: str) -> None:
+        with self._lock:
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if self._failures[host] >= self.failure_threshold and host not in self._opened_at:
+                self._opened_at[host] = monotonic()
+
+
+_shared_circuit_breaker = CircuitBreaker()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Returns the process-wide circuit breaker used when a retry policy doesn't provide one."""
+    return _shared_circuit_breaker
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed request is retried.
+
+    Transient failures (connection errors and `retryable_status_codes`) are retried up
+    to `max_retries` attempts in total, waiting an exponential backoff with full jitter,
+    or the server's `Retry-After` when that is longer. A page that loads but lacks the
+    verification text usually means the portal answered with a different page, so it
+    is only retried `verification_retries` times. Any other error status fails at once.
+    A request to a host whose circuit is open waits for the circuit's cooldown to end,
+    or fails at once if that takes longer than `max_circuit_wait` seconds, when given.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 5,
+        base_delay: float = 0.2,
+        max_delay: float = 60,
+        verification_retries: int = 1,
+        retryable_status_codes: frozenset = RETRYABLE_STATUS_CODES,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        max_circuit_wait: Optional[float] = None,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.verification_retries = verification_retries
+        self.retryable_status_codes = retryable_status_codes
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else get_circuit_breaker()
+        self.max_circuit_wait = max_circuit_wait
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: a random delay between 0 and the exponential backoff for this attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def retry_after(self, header: Optional[str]) -> Optional[float]:
+        """Parses a `Retry-After` header given either in seconds or as an HTTP date."""
+        if not header:
+            return None
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(header)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+    def delay(self, attempt: int, retry_after_header: Optional[str] = None) -> float:
+        retry_after = self.retry_after(retry_after_header)
+        backoff = self.backoff(attempt)
+        if retry_after is None:
+            return backoff
+        return max(backoff, min(retry_after, self.max_delay))
+
+
+def get_circuit_wait(circuit_breaker: CircuitBreaker, host: str, max_wait: Optional[float], logger: Logger) -> float:
+    """
+    Returns how many seconds to wait before a request to `host`, at most the circuit's `reset_timeout`.
+
+    :raises RequestFailedError: If `max_wait` is given and the circuit of `host` stays open longer.
+    """
+    circuit_wait = circuit_breaker.wait_time(host)
+    if not circuit_wait:
+        return 0
+    if max_wait is None:
+        logger.warning(f"Circuit open for {host}, waiting {round(circuit_wait, 1)} seconds for it to close")
+    elif circuit_wait > max_wait:
+        logger.warning(f"Circuit open for {host} for {round(circuit_wait, 1)} more seconds, failing fast")
+        raise RequestFailedError(f"Circuit open for {host}")
+    return circuit_wait
+
+
 def request_page_with_retry(
     session: requests.Session,
     url: str,
@@ -87,11 +346,32 @@ def request_page_with_retry(
     data: Optional[Dict[str, str]] = None,
     max_retries: int = 5,
     ms_wait: str = 200,
-) -> Tuple[str, bool]:
+    rate_limiter: Optional[RateLimiter] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
+) -> str:
+    """
+    Requests a page, retrying according to `retry_policy`, and returns its text.
+
+    Without a retry policy, `max_retries` attempts are made with a backoff based on `ms_wait`.
+    A circuit breaker, if given, is used instead of the retry policy's.
+
+    :raises RequestFailedError: If the page could not be loaded and verified, or the
+        circuit of its host is open. The last response is written to /logging/debug.html first.
+    """
+    rate_limiter = rate_limiter or get_rate_limiter()
+    retry_policy = retry_policy or RetryPolicy(max_retries=max_retries, base_delay=ms_wait / 1000)
+    circuit_breaker = circuit_breaker or retry_policy.circuit_breaker
+    host = urlparse(url).netloc
     response = None
-    for i in range(max_retries):
-        sleep(ms_wait / 1000 * (i + 1))
-        failed = False
+    verification_failures = 0
+    # At most one short wait for the circuit to close; an open circuit fails the request at once.
+    circuit_wait = get_circuit_wait(circuit_breaker, host, retry_policy.max_circuit_wait, logger)
+    if circuit_wait:
+        sleep(circuit_wait)
+    for i in range(retry_policy.max_retries):
+        rate_limiter.acquire(url)
+        retry_after_header = None
         try:
             if http_method == HTTPMethod.POST:
                 if not data:
@@ -103,24 +383,131 @@ def request_page_with_retry(
                     response = session.get(url, params=params)
                 else:
                     response = session.get(url, data=data, params=params)
-            response.raise_for_status()
-            if verification_text:
-                if verification_text not in response.text:
-                    failed = True
-                    logger.error(
-                        f"Verification text {verification_text} not in response"
-                    )
-        except requests.RequestException as e:
+        except requests.RequestException:
             logger.exception(f"Failed to get url {url}, try {i}")
-            failed = True
-        if failed:
-            if response == None:
-                response_text = 'No response from Odyssey.'
+            circuit_breaker.record_failure(host)
+        else:
+            if response.status_code in retry_policy.retryable_status_codes:
+                logger.error(f"Status {response.status_code} from {url}, try {i}")
+                circuit_breaker.record_failure(host)
+                retry_after_header = response.headers.get("Retry-After")
             else:
-                response_text = response.text
-            write_debug_and_quit(
-                verification_text=verification_text,
-                page_text=response_text,
-                logger=logger,
-            )
-    return response.text
+                circuit_breaker.record_success(host)
+                if response.status_code >= 400:
+                    logger.error(f"Status {response.status_code} from {url} is not retryable")
+                    break
+                if not verification_text or verification_text in response.text:
+                    return response.text
+                logger.error(
+                    f"Verification text {verification_text} not in response"
+                )
+                verification_failures += 1
+                if verification_failures > retry_policy.verification_retries:
+                    break
+        if i + 1 < retry_policy.max_retries:
+            if circuit_breaker.wait_time(host):
+                logger.warning(f"Circuit opened for {host}, not retrying {url}")
+                break
+            sleep(retry_policy.delay(i, retry_after_header))
+    write_debug(
+        verification_text=verification_text,
+        page_text=response.text if response is not None else 'No response from Odyssey.',
+        logger=logger,
+    )
+    raise RequestFailedError(f"Failed to load {url}")
+
+
+def create_async_session(
+    ssl: bool = True,
+    max_connections: int = 10,
+    cookies: Optional[Dict[str, str]] = None,
+    timeout: float = 60,
+) -> aiohttp.ClientSession:
+    """
+    Creates an `aiohttp` session backed by a pooled, keep-alive connector.
+
+    Must be called from inside a running event loop.
+
+    :param ssl: Whether to verify SSL certificates.
+    :param max_connections: Maximum number of connections open at once, which is also
+        the maximum number of requests in flight.
+    :param cookies: Cookies to start the session with, e.g. from a logged in `requests.Session`.
+    :param timeout: Seconds a request may take in total, so that a stalled connection fails
+        and is retried instead of hanging its worker.
+    :returns: Configured async session object.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=max_connections,
+        ssl=None if ssl else False,
+        keepalive_timeout=30,
+    )
+    return aiohttp.ClientSession(
+        connector=connector, cookies=cookies, timeout=aiohttp.ClientTimeout(total=timeout)
+    )
+
+
+async def request_page_with_retry_async(
+    session: aiohttp.ClientSession,
+    url: str,
+    logger: Logger,
+    verification_text: Optional[str] = None,
+    http_method: Literal[HTTPMethod.POST, HTTPMethod.GET] = HTTPMethod.POST,
+    params: Dict[str, str] = {},
+    data: Optional[Dict[str, str]] = None,
+    max_retries: int = 5,
+    ms_wait: str = 200,
+    rate_limiter: Optional[RateLimiter] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
+) -> str:
+    """Asyncio counterpart of `request_page_with_retry` with the same verification and retry semantics."""
+    rate_limiter = rate_limiter or get_rate_limiter()
+    retry_policy = retry_policy or RetryPolicy(max_retries=max_retries, base_delay=ms_wait / 1000)
+    circuit_breaker = circuit_breaker or retry_policy.circuit_breaker
+    host = urlparse(url).netloc
+    response_text = None
+    verification_failures = 0
+    circuit_wait = get_circuit_wait(circuit_breaker, host, retry_policy.max_circuit_wait, logger)
+    if circuit_wait:
+        await asyncio.sleep(circuit_wait)
+    for i in range(retry_policy.max_retries):
+        await rate_limiter.acquire_async(url)
+        retry_after_header = None
+        try:
+            method = "POST" if http_method == HTTPMethod.POST else "GET"
+            async with session.request(method, url, params=params, data=data) as response:
+                status = response.status
+                retry_after_header = response.headers.get("Retry-After")
+                response_text = await response.text(errors="ignore")
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            logger.exception(f"Failed to get url {url}, try {i}")
+            circuit_breaker.record_failure(host)
+        else:
+            if status in retry_policy.retryable_status_codes:
+                logger.error(f"Status {status} from {url}, try {i}")
+                circuit_breaker.record_failure(host)
+            else:
+                retry_after_header = None
+                circuit_breaker.record_success(host)
+                if status >= 400:
+                    logger.error(f"Status {status} from {url} is not retryable")
+                    break
+                if not verification_text or verification_text in response_text:
+                    return response_text
+                logger.error(
+                    f"Verification text {verification_text} not in response"
+                )
+                verification_failures += 1
+                if verification_failures > retry_policy.verification_retries:
+                    break
+        if i + 1 < retry_policy.max_retries:
+            if circuit_breaker.wait_time(host):
+                logger.warning(f"Circuit opened for {host}, not retrying {url}")
+                break
+            await asyncio.sleep(retry_policy.delay(i, retry_after_header))
+    write_debug(
+        verification_text=verification_text,
+        page_text=response_text or 'No response from Odyssey.',
+        logger=logger,
+    )
+    raise RequestFailedError(f"Failed to load {url}")
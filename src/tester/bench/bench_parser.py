@@ -0,0 +1,234 @@
+"""
+Throughput benchmark of the parser on a synthetic corpus of Hays case pages.
+
+The corpus is generated from the bundled test case, with its charge and events tables
+replaced by as many charges, dispositions and other events as asked for. Each case is
+then parsed either with ParserHays.parser_hays alone or end to end with Parser (reading
+the file, building the soup, hashing and writing the JSON), and the harness reports
+cases/sec, p50/p99 latency per case and the peak RSS. With -corpus test_case, the
+bundled test case is parsed -cases times instead.
+
+Run it from the repository root:
+
+    python src/tester/bench/bench_parser.py -cases 500 -charges 10 -events 200 -dispositions 20
+    python src/tester/bench/bench_parser.py -corpus test_case -mode parser_hays -cases 200
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+from html import escape
+from statistics import quantiles
+from time import perf_counter
+from typing import List
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+import parser
+from parser.hays import ParserHays
+
+TEST_CASE_HTML_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "..", "resources", "test_files", "test_123456.html"
+)
+CHARGE_ROWS_MARKER = "BENCH_CHARGE_ROWS"
+EVENT_ROWS_MARKER = "BENCH_EVENT_ROWS"
+
+CHARGES = [
+    ("AGGRAVATED ASSAULT WITH A DEADLY WEAPON", "22.02(a)(2)", "Second Degree Felony"),
+    ("POSS CS PG 1 <1G", "481.115(b)", "State Jail Felony"),
+    ("DRIVING WHILE INTOXICATED", "49.04", "Misdemeanor B"),
+    ("THEFT PROP >=$2,500<$30K", "31.03(e)(4)", "State Jail Felony"),
+    ("BURGLARY OF HABITATION", "30.02(c)(2)", "Second Degree Felony"),
+    ("ASSAULT CAUSES BODILY INJ FAMILY MEMBER", "22.01(a)(1)", "Misdemeanor A"),
+]
+OUTCOMES = ["Dismissed", "Guilty", "Deferred Adjudication", "Amend Probation"]
+EVENTS = [
+    ("Motion to Adjudicate", "Result: Reset"),
+    ("Pre Trial Motions (Non-Evidentiary)", "Result: Reset"),
+    ("Motion To Suppress", ""),
+    ("Application For Court Appointed Attorney/Order", "MARTIN CLAUDER"),
+    ("Capias Issued", "See Warrant Tab"),
+    ("Discovery Receipt Email from District Attorney", ""),
+]
+
+
+def load_template() -> str:
+    """Returns the test case page with the rows of its charge and events tables replaced by markers."""
+    with open(TEST_CASE_HTML_PATH, "r", encoding="utf-8", errors="ignore") as file_handle:
+        case_soup = BeautifulSoup(file_handle, "html.parser")
+    for table in case_soup.select("body>table"):
+        if "Charge Information" in table.text:
+            # Keep the header row of the charge table.
+            for tr in table.find_all("tr", recursive=False)[1:]:
+                tr.decompose()
+            table.append(CHARGE_ROWS_MARKER)
+        elif "Events & Orders of the Court" in table.text:
+            for tr in table.find_all("tr", recursive=False):
+                tr.decompose()
+            table.append(EVENT_ROWS_MARKER)
+    return str(case_soup)
+
+
+def random_date(rng: random.Random) -> str:
+    return f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(2015, 2024)}"
+
+
+def generate_case_html(
+    template: str, n_charges: int, n_events: int, n_dispositions: int, rng: random.Random
+) -> str:
+    charges = [rng.choice(CHARGES) for _ in range(n_charges)]
+    charge_rows = "".join(
+        f'<tr><td valign="top">{i}.\n             </td><td valign="top">{escape(name)}</td><td valign="top"></td>'
+        f'<td valign="top">{statute}</td><td nowrap="true" valign="top">{level}</td>'
+        f'<td nowrap="true" valign="top">{random_date(rng)}</td></tr>'
+        for i, (name, statute, level) in enumerate(charges, start=1)
+    ) + "<tr><td></td><td></td></tr>"
+
+    event_rows = [
+        '<tr><td>&nbsp;</td><td style="border-right: 1px solid black">&nbsp;</td><td>&nbsp;</td>'
+        '<th class="ssEventsAndOrdersSubTitle" id="CDisp">DISPOSITIONS</th></tr>'
+    ]
+    for i in range(1, n_dispositions + 1):
+        charge_number = rng.randint(1, max(n_charges, 1))
+        charge_name = charges[charge_number - 1][0] if charges else CHARGES[0][0]
+        event_rows.append(
+            f'<tr><th class="ssTableHeaderLabel" id="RCDCD{i}" valign="top">{random_date(rng)}</th>'
+            '<td style="border-right: 1px solid black">&nbsp;</td><td>&nbsp;</td>'
+            f'<td headers="CDisp RCDCD{i}" valign="top"><div style="padding-bottom: 10px"><b>Disposition</b> '
+            '(Judicial Officer: Boyer, Bruce)<br/><div><div style="padding-left: 10px">'
+            f'{charge_number}.&nbsp;{escape(charge_name)}<div style="padding-left: 40px">{rng.choice(OUTCOMES)}</div>'
+            '<div style="padding-left: 40px"></div></div></div></div></td></tr>'
+        )
+    event_rows.append(
+        '<tr><td>&nbsp;</td><td>&nbsp;</td><td>&nbsp;</td><td></td></tr>'
+        '<tr><td>&nbsp;</td><td style="border-right: 1px solid black">&nbsp;</td><td>&nbsp;</td>'
+        '<th class="ssEventsAndOrdersSubTitle" id="COtherEventsAndHearings">OTHER EVENTS AND HEARINGS</th></tr>'
+    )
+    for i in range(1, n_events + 1):
+        event, note = rng.choice(EVENTS)
+        note_html = f'<div style="padding-left: 10px"><i>{escape(note)}</i></div>' if note else ""
+        event_rows.append(
+            f'<tr><th class="ssTableHeaderLabel" id="RCDER{i}" valign="top">{random_date(rng)}</th>'
+            '<td style="border-right: 1px solid black">&nbsp;</td><td>&nbsp;</td>'
+            f'<td headers="COtherEventsAndHearings RCDER{i}"><b>{escape(event)}</b>{note_html}</td></tr>'
+        )
+
+    return template.replace(CHARGE_ROWS_MARKER, charge_rows).replace(EVENT_ROWS_MARKER, "".join(event_rows))
+
+
+def write_corpus(
+    case_html_path: str, n_cases: int, n_charges: int, n_events: int, n_dispositions: int, seed: int = 0
+) -> List[str]:
+    """Writes n_cases synthetic case pages to case_html_path and returns their paths."""
+    rng = random.Random(seed)
+    template = load_template()
+    case_html_file_paths = []
+    for case_number in range(1, n_cases + 1):
+        case_html_file_path = os.path.join(case_html_path, f"{case_number}.html")
+        with open(case_html_file_path, "w", encoding="utf-8") as file_handle:
+            file_handle.write(generate_case_html(template, n_charges, n_events, n_dispositions, rng))
+        case_html_file_paths.append(case_html_file_path)
+    return case_html_file_paths
+
+
+def bench(case_html_file_paths: List[str], mode: str, html_backend: str, workers: int) -> dict:
+    """Parses the corpus and returns cases/sec, p50/p99 latency per case in ms and peak RSS in MiB."""
+    logger = logging.getLogger("bench")
+    logger.disabled = True
+    parser_instance = parser.Parser()
+    case_json_path = tempfile.mkdtemp()
+    latencies = []
+    try:
+        # parser_hays prints the rows of the events table, which would swamp the timings.
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = perf_counter()
+            if workers > 1:
+                # Cases are spread over a process pool, so only the throughput is measured.
+                case_html_list = [
+                    (os.path.basename(path).split(".")[0], path) for path in case_html_file_paths
+                ]
+                parser_instance.parse_case_files(
+                    "hays", case_html_list, case_json_path, logger, workers=workers, html_backend=html_backend
+                )
+            else:
+                parser_hays = ParserHays()
+                for case_html_file_path in case_html_file_paths:
+                    case_number = os.path.basename(case_html_file_path).split(".")[0]
+                    if mode == "parser_hays":
+                        with open(case_html_file_path, "r", encoding="utf-8", errors="ignore") as file_handle:
+                            case_soup = parser_instance.make_case_soup(file_handle, html_backend)
+                        case_start = perf_counter()
+                        parser_hays.parser_hays("hays", case_number, logger, case_soup)
+                    else:
+                        case_start = perf_counter()
+                        parser_instance.parse_case_file(
+                            "hays", case_number, case_html_file_path, case_json_path, logger,
+                            html_backend=html_backend,
+                        )
+                    latencies.append(perf_counter() - case_start)
+            elapsed = perf_counter() - start
+    finally:
+        shutil.rmtree(case_json_path)
+
+    # ru_maxrss is in KiB on Linux. The pool's workers count as children.
+    peak_rss = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    results = {
+        "cases": len(case_html_file_paths),
+        "cases_per_second": len(case_html_file_paths) / elapsed,
+        "peak_rss_mib": peak_rss / 1024,
+    }
+    if len(latencies) >= 2:
+        percentiles = quantiles(latencies, n=100)
+        results["p50_ms"] = percentiles[49] * 1000
+        results["p99_ms"] = percentiles[98] * 1000
+    return results
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument("-cases", type=int, default=200, help="Number of synthetic cases.")
+    argparser.add_argument("-charges", type=int, default=3, help="Charges per case.")
+    argparser.add_argument("-events", type=int, default=60, help="Other events and hearings per case.")
+    argparser.add_argument("-dispositions", type=int, default=5, help="Dispositions per case.")
+    argparser.add_argument(
+        "-mode", choices=["parse", "parser_hays"], default="parse",
+        help="'parse' times Parser.parse_case_file end to end, 'parser_hays' only ParserHays.parser_hays.",
+    )
+    argparser.add_argument("-html_backend", choices=parser.HTML_BACKENDS, default="html.parser")
+    argparser.add_argument("-workers", type=int, default=1, help="Parse in a pool of this many processes.")
+    argparser.add_argument("-seed", type=int, default=0, help="Seed of the synthetic corpus.")
+    argparser.add_argument(
+        "-corpus", choices=["synthetic", "test_case"], default="synthetic",
+        help="Parse synthetic cases, or the bundled test case -cases times.",
+    )
+    argparser.description = "Benchmark the parser on a synthetic corpus of Hays case pages."
+    args = argparser.parse_args()
+
+    case_html_path = tempfile.mkdtemp()
+    try:
+        if args.corpus == "test_case":
+            case_html_file_paths = [TEST_CASE_HTML_PATH] * args.cases
+        else:
+            case_html_file_paths = write_corpus(
+                case_html_path, args.cases, args.charges, args.events, args.dispositions, args.seed
+            )
+        results = bench(case_html_file_paths, args.mode, args.html_backend, args.workers)
+    finally:
+        shutil.rmtree(case_html_path)
+
+    print(
+        f"{args.mode} ({args.corpus}, {args.html_backend}, {args.workers} workers): {results['cases']} cases, "
+        f"{results['cases_per_second']:.1f} cases/sec"
+        + (f", p50 {results['p50_ms']:.2f} ms, p99 {results['p99_ms']:.2f} ms" if "p50_ms" in results else "")
+        + f", peak RSS {results['peak_rss_mib']:.1f} MiB"
+    )
@@ -1,12 +1,23 @@
 from datetime import datetime, timedelta
 import unittest
+import asyncio
 import sys
 import os
 import json
 import logging
 from unittest.mock import patch, MagicMock, mock_open
 import tempfile
+import shutil
+import io
+import zipfile
+import multiprocessing
+import copy
+import re
+import requests
+import xxhash
+import time
 from bs4 import BeautifulSoup
+from aiohttp import web
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..','..')))
@@ -18,6 +29,7 @@ import scraper
 import parser
 import cleaner
 import updater
+from azure.cosmos import exceptions
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
@@ -37,6 +49,10 @@ def log(
 class ScraperTestCase(unittest.TestCase):
     # Defaults for each program are set at the function level.
 
+    def setUp(self):
+        # Failures in one test mustn't leave the process-wide circuit open for the next.
+        scraper.helpers.get_circuit_breaker().reset()
+
     def test_scrape_get_ody_link(self, county="hays"):
         scraper_instance = scraper.Scraper()
         logger = scraper_instance.configure_logger()
@@ -591,6 +607,390 @@ class ScraperTestCase(unittest.TestCase):
         )  # Note: This is already validated by "verification_text" within the request_page_with_retry function.
         # TODO: Add more validation here of what one should expect from the results page HTML.
 
+    def test_scraper_hays_concurrent(self, ms_wait=10, max_workers=3):
+        # Case detail requests are answered by a mocked session, so no portal is needed.
+        scraper_instance = scraper.Scraper()
+        logger = scraper_instance.configure_logger()
+        scraper_hays_instance, scraper_function = scraper_instance.get_class_and_method("hays", logger)
+        results_soup = BeautifulSoup(
+            "".join(f'<a href="CaseDetail.aspx?CaseID={case_id}">{case_id}</a>' for case_id in range(6)),
+            "html.parser",
+        )
+        session = MagicMock()
+        session.post.return_value.status_code = 200
+        session.post.return_value.text = "Date Filed"
+        case_html_path = tempfile.mkdtemp()
+
+        fetched_case_ids, failed_case_ids = scraper_function(
+            "http://public.co.hays.tx.us/", results_soup, case_html_path, logger, session, ms_wait,
+            max_workers=max_workers, rate_limiter=scraper.RateLimiter(requests_per_second=100),
+        )
+
+        self.assertEqual(session.post.call_count, 6)
+        self.assertEqual(
+            set(os.listdir(case_html_path)),
+            {f"{case_id}.html" for case_id in range(6)},
+            "Every case found on the results page should be written to case_html.",
+        )
+        self.assertEqual(fetched_case_ids, [str(case_id) for case_id in range(6)])
+        self.assertEqual(failed_case_ids, [])
+
+    def test_county_scraper_registry(self):
+        scraper_instance = scraper.Scraper()
+        logger = scraper_instance.configure_logger()
+        # The county class is resolved and instantiated once per process.
+        first_instance, first_function = scraper_instance.get_class_and_method("hays", logger)
+        second_instance, second_function = scraper.Scraper().get_class_and_method("Hays", logger)
+        self.assertIs(first_instance, second_instance)
+        self.assertEqual(first_function, second_function)
+        self.assertEqual(type(first_instance).__module__, "scraper.hays")
+
+        class ScraperTest:
+            def scraper_test(self, *args, **kwargs):
+                return [], []
+
+        with patch.dict(scraper.COUNTY_SCRAPERS):
+            scraper.register_county_scraper("test", ScraperTest)
+            instance, scraper_function = scraper_instance.get_class_and_method("test", logger)
+            self.assertIsInstance(instance, ScraperTest)
+            self.assertEqual(scraper_function(), ([], []))
+        with self.assertRaises(ImportError):
+            scraper_instance.get_class_and_method("nowhere", logger)
+
+    def test_token_bucket_spaces_requests(self, requests_per_second=50, burst=2):
+        bucket = scraper.helpers.TokenBucket(requests_per_second, burst)
+        start = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        # The burst is served immediately, the following four are spaced 1/rate apart.
+        self.assertGreaterEqual(time.monotonic() - start, 4 / requests_per_second)
+
+    def test_rate_limiter_buckets_per_host(self):
+        rate_limiter = scraper.RateLimiter(requests_per_second=1)
+        rate_limiter.configure_host("http://public.co.hays.tx.us/", requests_per_second=100, burst=3)
+        self.assertIs(
+            rate_limiter.bucket("http://public.co.hays.tx.us/Search.aspx?ID=900"),
+            rate_limiter.bucket("http://public.co.hays.tx.us/CaseDetail.aspx?CaseID=1"),
+        )
+        self.assertEqual(rate_limiter.bucket("http://public.co.hays.tx.us/").burst, 3)
+        self.assertEqual(rate_limiter.bucket("https://other.county.portal/").requests_per_second, 1)
+
+    def mock_response(self, status_code=200, text="Date Filed", headers=None):
+        response = MagicMock()
+        response.status_code = status_code
+        response.text = text
+        response.headers = headers or {}
+        return response
+
+    def test_request_page_with_retry_retries_transient_status(self):
+        session = MagicMock()
+        session.post.side_effect = [
+            self.mock_response(503, "Service Unavailable", {"Retry-After": "0"}),
+            self.mock_response(),
+        ]
+        retry_policy = scraper.RetryPolicy(base_delay=0, circuit_breaker=scraper.CircuitBreaker())
+        with patch.object(scraper.helpers, "write_debug"):
+            page_text = scraper.request_page_with_retry(
+                session=session,
+                url="http://public.co.hays.tx.us/CaseDetail.aspx?CaseID=1",
+                logger=logging.getLogger(__name__),
+                verification_text="Date Filed",
+                rate_limiter=scraper.RateLimiter(requests_per_second=0),
+                retry_policy=retry_policy,
+            )
+        self.assertEqual(page_text, "Date Filed")
+        self.assertEqual(session.post.call_count, 2)
+
+    def test_request_page_with_retry_gives_up(self):
+        retry_policy = scraper.RetryPolicy(base_delay=0, verification_retries=1, circuit_breaker=scraper.CircuitBreaker())
+        for response, expected_calls in (
+            (self.mock_response(404, "Not Found"), 1),  # not retryable
+            (self.mock_response(200, "Some other page"), 2),  # verification failures are retried once
+            (self.mock_response(502, "Bad Gateway"), 5),  # transient, retried up to max_retries
+        ):
+            session = MagicMock()
+            session.post.return_value = response
+            with patch.object(scraper.helpers, "write_debug"):
+                with self.assertRaises(scraper.RequestFailedError):
+                    scraper.request_page_with_retry(
+                        session=session,
+                        url="http://public.co.hays.tx.us/CaseDetail.aspx?CaseID=1",
+                        logger=logging.getLogger(__name__),
+                        verification_text="Date Filed",
+                        rate_limiter=scraper.RateLimiter(requests_per_second=0),
+                        retry_policy=retry_policy,
+                    )
+            self.assertEqual(session.post.call_count, expected_calls)
+
+    def test_retry_policy_delay(self):
+        retry_policy = scraper.RetryPolicy(base_delay=1, max_delay=30)
+        for attempt in range(8):
+            self.assertLessEqual(retry_policy.delay(attempt), min(30, 2 ** attempt))
+        # Retry-After is honored when it is longer than the backoff, up to max_delay.
+        self.assertEqual(retry_policy.delay(0, "10"), 10)
+        self.assertEqual(retry_policy.delay(0, "120"), 30)
+        self.assertIsNone(retry_policy.retry_after("not a date"))
+
+    def test_circuit_breaker(self):
+        circuit_breaker = scraper.CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        host = "public.co.hays.tx.us"
+        circuit_breaker.record_failure(host)
+        self.assertEqual(circuit_breaker.wait_time(host), 0)
+        circuit_breaker.record_failure(host)
+        self.assertGreater(circuit_breaker.wait_time(host), 0)
+        self.assertEqual(circuit_breaker.wait_time("other.portal"), 0)
+        circuit_breaker.reset()
+        self.assertEqual(circuit_breaker.wait_time(host), 0)
+
+    def test_request_page_with_retry_open_circuit(self):
+        circuit_breaker = scraper.CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        retry_policy = scraper.RetryPolicy(base_delay=0, max_circuit_wait=1)
+        session = MagicMock()
+        session.post.return_value = self.mock_response(503, "Service Unavailable")
+        request = lambda: scraper.request_page_with_retry(
+            session=session,
+            url="http://public.co.hays.tx.us/CaseDetail.aspx?CaseID=1",
+            logger=logging.getLogger(__name__),
+            verification_text="Date Filed",
+            rate_limiter=scraper.RateLimiter(requests_per_second=0),
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+        )
+        start = time.monotonic()
+        with patch.object(scraper.helpers, "write_debug"):
+            # Retries stop once the circuit opens, and later requests fail without being sent.
+            with self.assertRaises(scraper.RequestFailedError):
+                request()
+            self.assertEqual(session.post.call_count, 2)
+            with self.assertRaises(scraper.RequestFailedError):
+                request()
+        self.assertEqual(session.post.call_count, 2)
+        self.assertLess(time.monotonic() - start, 5)
+        # The breaker given to the request is used, not the process-wide one.
+        self.assertEqual(scraper.helpers.get_circuit_breaker().wait_time("public.co.hays.tx.us"), 0)
+
+    def test_request_page_with_retry_waits_for_circuit(self):
+        # By default, a request to a host whose circuit is open waits for the cooldown and is then sent.
+        circuit_breaker = scraper.CircuitBreaker(failure_threshold=1, reset_timeout=0.2)
+        circuit_breaker.record_failure("public.co.hays.tx.us")
+        session = MagicMock()
+        session.post.return_value = self.mock_response()
+        start = time.monotonic()
+        response = scraper.request_page_with_retry(
+            session=session,
+            url="http://public.co.hays.tx.us/CaseDetail.aspx?CaseID=1",
+            logger=logging.getLogger(__name__),
+            verification_text="Date Filed",
+            rate_limiter=scraper.RateLimiter(requests_per_second=0),
+            retry_policy=scraper.RetryPolicy(base_delay=0),
+            circuit_breaker=circuit_breaker,
+        )
+        self.assertEqual(response, "Date Filed")
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+        self.assertEqual(session.post.call_count, 1)
+
+    def test_scrape_multiple_cases_resume(self):
+        scraper_instance = scraper.Scraper()
+        logger = scraper_instance.configure_logger()
+        case_html_path = os.path.join(tempfile.mkdtemp(), "case_html")
+        judicial_officer_to_ID = {"Boyer, Bruce": "39607", "Henry, Bill": "39611"}
+        searched = []
+
+        def scraper_function(base_url, results_soup, case_html_path, logger, session, ms_wait, **kwargs):
+            # The first search of Henry, Bill on 07/02 has a failed case, every other search succeeds.
+            unit = searched[-1]
+            if unit == ("07/02/2024", "39611") and searched.count(unit) == 1:
+                return ["1"], ["2"]
+            return ["1", "2"], []
+
+        def scrape_results_page(odyssey_version, base_url, search_url, hidden_values, jo_id, date_string, *args):
+            searched.append((date_string, jo_id))
+            return "", None
+
+        def scrape_multiple_cases(resume):
+            with patch.object(scraper_instance, "scrape_results_page", side_effect=scrape_results_page), \
+                    patch.object(scraper_instance, "get_class_and_method", return_value=(None, scraper_function)):
+                scraper_instance.scrape_multiple_cases(
+                    "hays", 2003, "http://public.co.hays.tx.us/", "", {}, list(judicial_officer_to_ID),
+                    judicial_officer_to_ID, case_html_path, logger, None, 0, "2024-07-01", "2024-07-02", resume=resume,
+                )
+
+        scrape_multiple_cases(resume=False)
+        self.assertEqual(len(searched), 4)
+        # Resuming only searches the unit that had a failed case.
+        scrape_multiple_cases(resume=True)
+        self.assertEqual(searched[4:], [("07/02/2024", "39611")])
+        # Without resume, everything is searched again.
+        scrape_multiple_cases(resume=False)
+        self.assertEqual(len(searched), 9)
+
+    def test_scrape_multiple_cases_failed_results_page(self):
+        scraper_instance = scraper.Scraper()
+        logger = scraper_instance.configure_logger()
+        case_html_path = os.path.join(tempfile.mkdtemp(), "case_html")
+        judicial_officer_to_ID = {"Boyer, Bruce": "39607"}
+        searched = []
+
+        def scrape_results_page(odyssey_version, base_url, search_url, hidden_values, jo_id, date_string, *args):
+            # The results page of the first date fails the first time it is searched.
+            searched.append(date_string)
+            if searched == ["07/01/2024"]:
+                raise scraper.RequestFailedError("Circuit open for public.co.hays.tx.us")
+            return "", None
+
+        def scrape_multiple_cases(resume):
+            with patch.object(scraper_instance, "scrape_results_page", side_effect=scrape_results_page), \
+                    patch.object(scraper_instance, "get_class_and_method", return_value=(None, lambda *args, **kwargs: (["1"], []))):
+                scraper_instance.scrape_multiple_cases(
+                    "hays", 2003, "http://public.co.hays.tx.us/", "", {}, list(judicial_officer_to_ID),
+                    judicial_officer_to_ID, case_html_path, logger, None, 0, "2024-07-01", "2024-07-02", resume=resume,
+                )
+
+        with self.assertLogs(logger, level="ERROR") as logs:
+            scrape_multiple_cases(resume=False)
+        self.assertIn("Searching cases on 07/01/2024 for Boyer, Bruce failed", logs.output[0])
+        # The next date is still scraped, and resuming searches the failed date again.
+        self.assertEqual(searched, ["07/01/2024", "07/02/2024"])
+        scrape_multiple_cases(resume=True)
+        self.assertEqual(searched[2:], ["07/01/2024"])
+
+    def test_case_store(self):
+        scraper_instance = scraper.Scraper()
+        logger = scraper_instance.configure_logger()
+        case_html_path = os.path.join(tempfile.mkdtemp(), "case_html")
+        case_store = scraper_instance.get_case_store(case_html_path, logger, "store")
+        first_hash = case_store.put("1", "<html>Date Filed 1</html>")
+        # Storing the same page again is free, and other cases with the same page share its blob.
+        self.assertEqual(case_store.put("1", "<html>Date Filed 1</html>"), first_hash)
+        case_store.put("2", "<html>Date Filed 1</html>")
+        second_hash = case_store.put("1", "<html>Date Filed 2</html>")
+        self.assertEqual(len(os.listdir(os.path.join(case_store.path, "blobs", first_hash[:2]))), 1)
+
+        reloaded_store = scraper.CaseStore(case_store.path, logger)
+        self.assertEqual(
+            [version["content_hash"] for version in reloaded_store.versions("1")], [first_hash, second_hash]
+        )
+        self.assertEqual(reloaded_store.read("1"), "<html>Date Filed 2</html>")
+        self.assertEqual(reloaded_store.read("1", first_hash), "<html>Date Filed 1</html>")
+        self.assertEqual(reloaded_store.read("2"), "<html>Date Filed 1</html>")
+        self.assertIsNone(scraper_instance.get_case_store(case_html_path, logger, "html"))
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == "fork", "worker processes need the patches made here")
+    def test_scrape_multiple_cases_sharded(self, processes=2):
+        scraper_instance = scraper.Scraper()
+        logger = scraper_instance.configure_logger()
+        case_html_path = os.path.join(tempfile.mkdtemp(), "case_html")
+        os.makedirs(case_html_path)
+        judicial_officer_to_ID = {"Boyer, Bruce": "39607", "Henry, Bill": "39611"}
+        session = MagicMock()
+        session.post.return_value.status_code = 200
+        session.post.return_value.text = "Date Filed"
+
+        def scrape_results_page(odyssey_version, base_url, search_url, hidden_values, jo_id, date_string, *args):
+            # Both judicial officers have the same cases on a date, so shards write the same files.
+            day = date_string.split("/")[1]
+            results_soup = BeautifulSoup(
+                "".join(f'<a href="CaseDetail.aspx?CaseID={day}{case_id}">{case_id}</a>' for case_id in range(3)),
+                "html.parser",
+            )
+            return "", results_soup
+
+        with patch.object(scraper.Scraper, "create_session", return_value=session), \
+                patch.object(scraper.Scraper, "scrape_main_page", return_value=("", None)), \
+                patch.object(scraper.Scraper, "scrape_search_page", return_value=("", "", None)), \
+                patch.object(scraper.Scraper, "get_hidden_values", return_value={}), \
+                patch.object(scraper.Scraper, "scrape_results_page", side_effect=scrape_results_page):
+            scraper_instance.scrape_multiple_cases_sharded(
+                "hays", 2003, "http://public.co.hays.tx.us/", "", "Court Calendar", list(judicial_officer_to_ID),
+                judicial_officer_to_ID, case_html_path, logger, True, 0, "2024-07-01", "2024-07-02", processes,
+                refetch_after_days=None,
+            )
+
+        self.assertEqual(
+            sorted(os.listdir(case_html_path)),
+            [f"{day}{case_id}.html" for day in ("01", "02") for case_id in range(3)],
+        )
+        checkpoint = scraper_instance.get_checkpoint(case_html_path, logger, resume=True)
+        self.assertEqual(len(checkpoint.completed_units), 4)
+        self.assertEqual(len(checkpoint.fetched_case_ids), 6)
+
+    def test_scrape_modes(self):
+        from scraper import hays
+        page = '<html><a href="CaseDetail.aspx?CaseID=1">1</a> Record Count Date Filed</html>'
+        session = requests.Session()
+        response = self.mock_response(200, page)
+
+        async def request_page_with_retry_async(**kwargs):
+            return page
+
+        modes = [
+            {"case_number": "2024-001"},
+            {},
+            {"max_workers": 2},
+            {"use_async": True},
+            {"resume": True},
+            {"storage": "store"},
+        ]
+        if multiprocessing.get_start_method() == "fork":
+            modes.append({"processes": 2})
+        for mode in modes:
+            with self.subTest(**mode):
+                case_html_path = os.path.join(tempfile.mkdtemp(), "case_html")
+                scraper_instance = scraper.Scraper(rate_limiter=scraper.RateLimiter())
+                with patch.object(session, "post", return_value=response), \
+                        patch.object(scraper.Scraper, "create_session", return_value=session), \
+                        patch.object(scraper.Scraper, "scrape_main_page", return_value=("", None)), \
+                        patch.object(scraper.Scraper, "scrape_search_page", return_value=("", "", None)), \
+                        patch.object(scraper.Scraper, "get_hidden_values", return_value={}), \
+                        patch.object(scraper.Scraper, "scrape_jo_list", return_value=(["Boyer, Bruce"], {"Boyer, Bruce": "39607"})), \
+                        patch.object(scraper, "request_page_with_retry_async", side_effect=request_page_with_retry_async), \
+                        patch.object(hays, "request_page_with_retry_async", side_effect=request_page_with_retry_async):
+                    scraper_instance.scrape(
+                        "hays", [], 0, "2024-07-01", "2024-07-01", None, mode.get("case_number"), case_html_path,
+                        **{key: value for key, value in mode.items() if key != "case_number"},
+                    )
+                logger = scraper_instance.configure_logger()
+                if mode.get("storage") == "store":
+                    self.assertEqual(scraper_instance.get_case_store(case_html_path, logger, "store").read("1"), page)
+                else:
+                    self.assertEqual(os.listdir(case_html_path), ["1.html"])
+
+    def test_case_index_skips_recent_cases(self, ms_wait=10):
+        scraper_instance = scraper.Scraper()
+        logger = scraper_instance.configure_logger()
+        scraper_hays_instance, scraper_function = scraper_instance.get_class_and_method("hays", logger)
+        case_html_path = os.path.join(tempfile.mkdtemp(), "case_html")
+        os.makedirs(case_html_path)
+        case_index = scraper_instance.get_case_index(case_html_path, logger, refetch_after_days=1)
+        results_soup = BeautifulSoup(
+            "".join(f'<a href="CaseDetail.aspx?CaseID={case_id}">{case_id}</a>' for case_id in range(3)),
+            "html.parser",
+        )
+        session = MagicMock()
+        session.post.return_value.status_code = 200
+        session.post.return_value.text = "Date Filed"
+
+        def scrape_results_page():
+            return scraper_function(
+                "http://public.co.hays.tx.us/", results_soup, case_html_path, logger, session, ms_wait,
+                rate_limiter=scraper.RateLimiter(requests_per_second=100), case_index=case_index,
+            )
+
+        scrape_results_page()
+        self.assertEqual(session.post.call_count, 3)
+        # The same cases on another hearing date are not requested again.
+        fetched_case_ids, failed_case_ids = scrape_results_page()
+        self.assertEqual(session.post.call_count, 3)
+        self.assertEqual(fetched_case_ids, ["0", "1", "2"])
+        # A case is requested again once its entry is stale or its html file is gone.
+        os.remove(os.path.join(case_html_path, "1.html"))
+        scrape_results_page()
+        self.assertEqual(session.post.call_count, 4)
+        reloaded_index = scraper.CaseIndex(case_index.path, case_html_path, logger)
+        self.assertTrue(reloaded_index.is_fresh("0"))
+        self.assertFalse(reloaded_index.is_fresh("0", now=datetime.now() + timedelta(days=2)))
+        self.assertFalse(reloaded_index.is_fresh("3"))
+
     # This unit test for scrape_cases also covers unit testing for scrape_case_data_pre2017 and scrape_case_data_post2017. Only one or the other is used, and scrape_cases is mostly the pre or post2017 code.
     # In the future unit tests could be written for:
     # def scrape_case_data_pre2017()
@@ -785,6 +1185,115 @@ class ScraperTestCase(unittest.TestCase):
         # self.logger.info(f"Scraper test sucessful for cause number CR-16-0002-A.")"""
 
 
+class AsyncScraperTestCase(unittest.IsolatedAsyncioTestCase):
+    # A local aiohttp server stands in for the Odyssey portal.
+    async def asyncSetUp(self):
+        scraper.helpers.get_circuit_breaker().reset()
+
+        async def case_detail(request):
+            return web.Response(text=f"<html>Date Filed {request.method} {request.query.get('CaseID')}</html>")
+
+        self.slow_requests = 0
+
+        async def slow_case_detail(request):
+            # The first request stalls, like a connection the portal stops answering.
+            self.slow_requests += 1
+            if self.slow_requests == 1:
+                await asyncio.sleep(1)
+            return web.Response(text="<html>Date Filed</html>")
+
+        app = web.Application()
+        app.router.add_route("*", "/CaseDetail.aspx", case_detail)
+        app.router.add_route("*", "/SlowCaseDetail.aspx", slow_case_detail)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.base_url = f"http://127.0.0.1:{port}/"
+        self.logger = logging.getLogger(__name__)
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+
+    async def test_request_page_with_retry_async(self):
+        async with scraper.create_async_session(max_connections=2) as session:
+            get_html = await scraper.request_page_with_retry_async(
+                session=session,
+                url=self.base_url + "CaseDetail.aspx",
+                logger=self.logger,
+                verification_text="Date Filed",
+                http_method=scraper.HTTPMethod.GET,
+                params={"CaseID": "1"},
+                ms_wait=0,
+            )
+            post_html = await scraper.request_page_with_retry_async(
+                session=session,
+                url=self.base_url + "CaseDetail.aspx",
+                logger=self.logger,
+                verification_text="Date Filed",
+                params={"CaseID": "2"},
+                ms_wait=0,
+            )
+        self.assertIn("GET 1", get_html)
+        self.assertIn("POST 2", post_html)
+
+    async def test_request_page_with_retry_async_timeout(self):
+        circuit_breaker = scraper.CircuitBreaker()
+        circuit_breaker.record_failure = MagicMock(wraps=circuit_breaker.record_failure)
+        async with scraper.create_async_session(timeout=0.2) as session:
+            html = await scraper.request_page_with_retry_async(
+                session=session,
+                url=self.base_url + "SlowCaseDetail.aspx",
+                logger=self.logger,
+                verification_text="Date Filed",
+                ms_wait=0,
+                circuit_breaker=circuit_breaker,
+            )
+        # The stalled request times out, counts as a failure and is retried.
+        self.assertIn("Date Filed", html)
+        self.assertEqual(self.slow_requests, 2)
+        circuit_breaker.record_failure.assert_called_once_with(self.runner.addresses[0][0] + f":{self.runner.addresses[0][1]}")
+
+    async def test_request_page_with_retry_async_verification_failure(self):
+        async with scraper.create_async_session() as session:
+            with patch.object(scraper.helpers, "write_debug"):
+                with self.assertRaises(scraper.RequestFailedError):
+                    await scraper.request_page_with_retry_async(
+                        session=session,
+                        url=self.base_url + "CaseDetail.aspx",
+                        logger=self.logger,
+                        verification_text="Not On The Page",
+                        ms_wait=0,
+                    )
+
+    async def test_scrape_multiple_cases_async_failed_unit(self):
+        scraper_instance = scraper.Scraper()
+        case_html_path = os.path.join(tempfile.mkdtemp(), "case_html")
+        judicial_officer_to_ID = {"Boyer, Bruce": "39607", "Henry, Bill": "39611"}
+
+        class CountyScraper:
+            async def scraper_hays_async(self, base_url, results_soup, case_html_path, logger, session, ms_wait, **kwargs):
+                return [results_soup], []
+
+        async def scrape_results_page_async(odyssey_version, base_url, search_url, hidden_values, jo_id, *args):
+            if jo_id == "39611":
+                raise scraper.RequestFailedError("Failed to load the results page")
+            return "", jo_id
+
+        with patch.object(scraper_instance, "scrape_results_page_async", side_effect=scrape_results_page_async), \
+                patch.object(scraper_instance, "get_class_and_method", return_value=(CountyScraper(), None)):
+            await scraper_instance.scrape_multiple_cases_async(
+                "hays", 2003, "http://public.co.hays.tx.us/", "", {}, list(judicial_officer_to_ID),
+                judicial_officer_to_ID, case_html_path, self.logger, requests.Session(), 0, "2024-07-01", "2024-07-01",
+            )
+        # The failed search doesn't cancel the other one, and is journaled to be searched again.
+        checkpoint = scraper_instance.get_checkpoint(case_html_path, self.logger, resume=True)
+        self.assertEqual(checkpoint.completed_units, {("07/01/2024", "Boyer, Bruce")})
+        self.assertEqual(checkpoint.fetched_case_ids, {"39607"})
+        self.assertIn("Failed to load the results page", checkpoint.failed_units[("07/01/2024", "Henry, Bill")])
+
+
 class ParseTestCase(unittest.TestCase):
     def setUp(self):
         self.test_dir = tempfile.mkdtemp()
@@ -894,6 +1403,23 @@ class ParseTestCase(unittest.TestCase):
 
         self.assertEqual(set(case_list), set(expected_list))
 
+    def test_parser_list_of_stored_html(self):
+        case_store_path = os.path.join(tempfile.mkdtemp(), "case_store")
+        case_store = scraper.CaseStore(case_store_path, self.mock_logger)
+        case_store.put("1", "<html>old</html>")
+        case_store.put("1", "<html>new</html>")
+        case_store.put("2", "<html>other</html>")
+
+        case_html_list = self.parser_instance.get_list_of_stored_html(case_store_path, None, self.mock_logger)
+
+        self.assertEqual([case_number for case_number, _ in case_html_list], ["1", "2"])
+        with self.parser_instance.open_case_html(case_html_list[0][1]) as file_handle:
+            self.assertEqual(file_handle.read(), "<html>new</html>")
+        self.assertEqual(
+            self.parser_instance.get_list_of_stored_html(case_store_path, "2", self.mock_logger),
+            [("2", case_store.blob_path(case_store.latest("2")["content_hash"]))],
+        )
+
     def test_parser_get_list_of_html_error_handling(self):
         invalid_path = "invalid/path"
         case_number = "12345"
@@ -946,6 +1472,210 @@ class ParseTestCase(unittest.TestCase):
 
         mock_open_func.assert_called_once_with(error_log_path, "w")
 
+    def test_parse_case_files_in_pool(self, workers=2):
+        case_html_path = tempfile.mkdtemp()
+        case_html_list = []
+        for case_number in ("1", "2", "3"):
+            case_html_file_path = os.path.join(case_html_path, f"{case_number}.html")
+            shutil.copy(os.path.join(self.case_html_path, "..", "test_123456.html"), case_html_file_path)
+            case_html_list.append((case_number, case_html_file_path))
+        case_html_list.append(("missing", os.path.join(case_html_path, "missing.html")))
+        serial_json_path = tempfile.mkdtemp()
+        pool_json_path = tempfile.mkdtemp()
+
+        with patch.object(self.parser_instance, "write_error_log") as mock_write_error_log:
+            serial_results = self.parser_instance.parse_case_files(
+                "hays", case_html_list, serial_json_path, self.mock_logger
+            )
+            pool_results = self.parser_instance.parse_case_files(
+                "hays", case_html_list, pool_json_path, self.mock_logger, workers=workers, chunksize=2
+            )
+
+        self.assertEqual(serial_results, (["1", "2", "3"], ["missing"]))
+        self.assertEqual(pool_results, serial_results)
+        mock_write_error_log.assert_called_with("hays", "missing")
+        for case_number in ("1", "2", "3"):
+            with open(os.path.join(serial_json_path, f"{case_number}.json")) as serial_file, \
+                    open(os.path.join(pool_json_path, f"{case_number}.json")) as pool_file:
+                self.assertEqual(json.load(serial_file), json.load(pool_file))
+
+    def test_parse_case_files_incremental(self):
+        case_html_path = tempfile.mkdtemp()
+        case_json_path = tempfile.mkdtemp()
+        case_html_list = []
+        for case_number in ("1", "2"):
+            case_html_file_path = os.path.join(case_html_path, f"{case_number}.html")
+            shutil.copy(os.path.join(self.case_html_path, "..", "test_123456.html"), case_html_file_path)
+            case_html_list.append((case_number, case_html_file_path))
+        manifest_path = os.path.join(tempfile.mkdtemp(), "parse_manifest.json")
+
+        def parse_case_files(parser_version=parser.PARSER_VERSION):
+            parse_manifest = parser.ParseManifest(manifest_path, parser_version, self.mock_logger)
+            return self.parser_instance.parse_case_files(
+                "hays", case_html_list, case_json_path, self.mock_logger, parse_manifest=parse_manifest
+            )
+
+        self.assertEqual(parse_case_files(), (["1", "2"], []))
+        # Nothing changed, so nothing is parsed.
+        self.assertEqual(parse_case_files(), ([], []))
+        # A re-scraped page, a deleted JSON and a new parser version each cause a re-parse.
+        os.utime(case_html_list[0][1], ns=(0, 0))
+        self.assertEqual(parse_case_files(), (["1"], []))
+        os.remove(os.path.join(case_json_path, "2.json"))
+        self.assertEqual(parse_case_files(), (["2"], []))
+        self.assertEqual(parse_case_files(parser_version="test"), (["1", "2"], []))
+        with open(os.path.join(case_json_path, "1.json")) as file_handle:
+            self.assertEqual(
+                json.load(file_handle)["html_hash"],
+                parser.ParseManifest(manifest_path, "test", self.mock_logger).cases["1"]["html_hash"],
+            )
+
+    def test_parse_case_files_interrupted(self):
+        case_html_path = tempfile.mkdtemp()
+        case_html_list = []
+        for case_number in ("1", "2", "3"):
+            case_html_file_path = os.path.join(case_html_path, f"{case_number}.html")
+            shutil.copy(os.path.join(self.case_html_path, "..", "test_123456.html"), case_html_file_path)
+            case_html_list.append((case_number, case_html_file_path))
+        parse_case_file = parser._parse_case_file
+
+        def parse_case_file_until_3(task, *args):
+            if task[1] == "3":
+                raise KeyboardInterrupt
+            return parse_case_file(task, *args)
+
+        # The cases parsed before parsing stopped are saved in the manifest, except those
+        # whose NDJSON lines weren't written yet.
+        for output_format, parsed_case_numbers in (("pretty", ["1", "2"]), ("ndjson", [])):
+            manifest_path = os.path.join(tempfile.mkdtemp(), "parse_manifest.json")
+            parse_manifest = parser.ParseManifest(manifest_path, parser.PARSER_VERSION, self.mock_logger)
+            with patch("parser._parse_case_file", side_effect=parse_case_file_until_3), \
+                    self.assertRaises(KeyboardInterrupt):
+                self.parser_instance.parse_case_files(
+                    "hays", case_html_list, tempfile.mkdtemp(), self.mock_logger,
+                    chunksize=16, parse_manifest=parse_manifest, output_format=output_format,
+                )
+            with open(manifest_path) as file_handle:
+                self.assertEqual(sorted(json.load(file_handle)), parsed_case_numbers)
+
+    def test_parse_case_files_output_formats(self):
+        case_html_path = tempfile.mkdtemp()
+        case_html_list = []
+        for case_number in ("1", "2", "3"):
+            case_html_file_path = os.path.join(case_html_path, f"{case_number}.html")
+            shutil.copy(os.path.join(self.case_html_path, "..", "test_123456.html"), case_html_file_path)
+            case_html_list.append((case_number, case_html_file_path))
+        pretty_json_path = tempfile.mkdtemp()
+        self.parser_instance.parse_case_files("hays", case_html_list, pretty_json_path, self.mock_logger)
+        with open(os.path.join(pretty_json_path, "1.json")) as file_handle:
+            case_data = json.load(file_handle)
+
+        compact_json_path = tempfile.mkdtemp()
+        self.parser_instance.parse_case_files(
+            "hays", case_html_list, compact_json_path, self.mock_logger, output_format="compact"
+        )
+        with open(os.path.join(compact_json_path, "1.json")) as file_handle:
+            self.assertEqual(json.load(file_handle), case_data)
+        self.assertLess(
+            os.path.getsize(os.path.join(compact_json_path, "1.json")),
+            os.path.getsize(os.path.join(pretty_json_path, "1.json")),
+        )
+
+        for output_format, workers in (("ndjson", 1), ("ndjson.gz", 2)):
+            case_json_path = tempfile.mkdtemp()
+            manifest_path = os.path.join(tempfile.mkdtemp(), "parse_manifest.json")
+            for _ in range(2):
+                parse_manifest = parser.ParseManifest(manifest_path, parser.PARSER_VERSION, self.mock_logger)
+                self.parser_instance.parse_case_files(
+                    "hays", case_html_list, case_json_path, self.mock_logger, workers=workers,
+                    chunksize=2, parse_manifest=parse_manifest, output_format=output_format,
+                )
+            # One file for the day, with each case once, as the second run skips them all.
+            self.assertEqual(len(os.listdir(case_json_path)), 1)
+            ndjson_path = parser.get_ndjson_path(case_json_path, output_format)
+            cases = list(parser.case_output.read_ndjson(ndjson_path))
+            self.assertEqual(sorted(case["Case Metadata"]["odyssey id"] for case in cases), ["1", "2", "3"])
+            self.assertEqual(cases[0]["html_hash"], case_data["html_hash"])
+
+        with self.assertRaises(ValueError):
+            self.parser_instance.parse_case_files(
+                "hays", case_html_list, compact_json_path, self.mock_logger, output_format="yaml"
+            )
+
+    def test_html_backends_give_identical_json(self):
+        # Every case page in resources/test_files is parsed with each backend.
+        test_files_path = os.path.join(self.case_html_path, "..")
+        case_html_list = [
+            (file_name.split(".")[0], os.path.join(test_files_path, file_name))
+            for file_name in os.listdir(test_files_path)
+            if file_name.startswith("test_") and file_name.endswith(".html")
+        ]
+        case_json = {}
+        for html_backend in parser.HTML_BACKENDS:
+            case_json_path = tempfile.mkdtemp()
+            for case_number, case_html_file_path in case_html_list:
+                self.parser_instance.parse_case_file(
+                    "hays", case_number, case_html_file_path, case_json_path, self.mock_logger,
+                    html_backend=html_backend,
+                )
+            case_json[html_backend] = {
+                file_name: json.load(open(os.path.join(case_json_path, file_name)))
+                for file_name in os.listdir(case_json_path)
+            }
+
+        self.assertEqual(len(case_json["html.parser"]), len(case_html_list))
+        self.assertEqual(case_json["lxml"], case_json["html.parser"])
+        # The golden JSON of the test case was produced with html.parser.
+        with open(os.path.join(test_files_path, "test_123456.json")) as file_handle:
+            self.assertEqual(case_json["lxml"]["test_123456.json"], json.load(file_handle))
+        with self.assertRaises(ValueError):
+            self.parser_instance.make_case_soup("<html></html>", "html5lib")
+
+    def test_parser_hays_classify_table(self):
+        from parser.hays import ParserHays
+        parser_hays = ParserHays()
+        self.assertEqual(parser_hays.classify_table("Case Type: Adult Felony Date Filed: 01/05/2016"), "case details")
+        # A table is classified by the first section it matches, as in the original if/elif chain.
+        self.assertEqual(parser_hays.classify_table("Party Information Charge Information"), "party information")
+        self.assertEqual(parser_hays.classify_table("Events & Orders of the Court"), "events and orders")
+        self.assertIsNone(parser_hays.classify_table("Case Type: Adult Felony"))
+
+    def test_html_fingerprint(self):
+        fingerprint = parser.HtmlFingerprint(
+            {
+                "skip_last_table_containing": ["Balance Due"],
+                "skip_elements": [{"tag": "input", "attrs": {"type": "hidden"}}],
+                "volatile_text_patterns": [r"Printed \d\d:\d\d"],
+            }
+        )
+        page = (
+            '<html><body><table><tr><td>Case 1</td></tr></table>{}'
+            '<p>Printed {}</p><table><tr><td>Balance Due as of {}: ${}</td></tr></table></body></html>'
+        )
+        case_soup = BeautifulSoup(page.format('<input type="hidden" value="a1"/>', "09:00", "01/01/2024", 100), "html.parser")
+        html_before = str(case_soup)
+        case_hash = fingerprint.fingerprint(case_soup)
+        # The soup is left as it was.
+        self.assertEqual(str(case_soup), html_before)
+        # The balance, the session token and the time don't change the fingerprint.
+        same_case_soup = BeautifulSoup(page.format('<input type="hidden" value="b2"/>', "17:45", "02/01/2024", 50), "html.parser")
+        self.assertEqual(fingerprint.fingerprint(same_case_soup), case_hash)
+        changed_case_soup = BeautifulSoup(page.replace("Case 1", "Case 2").format("", "09:00", "01/01/2024", 100), "html.parser")
+        self.assertNotEqual(fingerprint.fingerprint(changed_case_soup), case_hash)
+        # The rules of a county fall back to the default rules.
+        self.assertEqual(parser.fingerprint.load_fingerprint_rules("hays")["skip_last_table_containing"], ["Balance Due"])
+
+    def test_legacy_html_hash(self):
+        # The hash of the test case from before fingerprints, kept so that stored cases are still recognized.
+        with self.parser_instance.open_case_html(os.path.join(project_root, "resources", "test_files", "test_123456.html")) as file:
+            case_soup = BeautifulSoup(file, "html.parser")
+        html_before = str(case_soup)
+        legacy_rules = dict(parser.fingerprint.load_fingerprint_rules("hays"), legacy_html_hash=True)
+        self.assertEqual(parser.HtmlFingerprint(legacy_rules).legacy_hash(case_soup), "8d4a80173c700b37")
+        self.assertEqual(str(case_soup), html_before)
+        # It is only computed when the rule is on, which it isn't by default.
+        self.assertIsNone(parser.HtmlFingerprint.for_county("hays").legacy_hash(case_soup))
+
     def test_parser_end_to_end(self, county="hays", case_number='123456'):
 
         self.parser_instance.parse(county=county, 
@@ -1010,41 +1740,73 @@ class CleanTestCase(unittest.TestCase):
             with self.assertRaises(FileNotFoundError):
                 self.cleaner.load_and_map_charge_names("nonexistent.json")
 
+    def test_get_charge_mapping(self):
+        charge_mapping_path = os.path.join(tempfile.mkdtemp(), "umich.json")
+        with open(charge_mapping_path, "w") as f:
+            json.dump([{"charge_name": "Charge1", "uccs_code": "1"}], f)
+        pickle_path = os.path.join(tempfile.mkdtemp(), "umich.pickle")
+        expected_mapping = {"Charge1": {"charge_name": "Charge1", "uccs_code": "1"}}
+
+        # The mapping is loaded once, however many Cleaners ask for it.
+        with patch.object(cleaner.Cleaner, "load_and_map_charge_names", wraps=self.cleaner.load_and_map_charge_names) as mock_load:
+            first_mapping = cleaner.Cleaner(charge_mapping_pickle_path=pickle_path).get_charge_mapping(charge_mapping_path)
+            second_mapping = cleaner.Cleaner().get_charge_mapping(charge_mapping_path)
+        self.assertEqual(mock_load.call_count, 1)
+        self.assertIs(first_mapping, second_mapping)
+        self.assertEqual(first_mapping, expected_mapping)
+
+        # A new process loads it from the pickle, unless the JSON changed since.
+        cleaner._charge_mappings.clear()
+        self.assertEqual(self.cleaner.load_pickled_charge_mapping(charge_mapping_path, pickle_path), expected_mapping)
+        with open(charge_mapping_path, "w") as f:
+            json.dump([{"charge_name": "Charge2", "uccs_code": "2"}], f)
+        self.assertIsNone(self.cleaner.load_pickled_charge_mapping(charge_mapping_path, pickle_path))
+        self.assertIsNone(self.cleaner.load_pickled_charge_mapping(charge_mapping_path, pickle_path + ".missing"))
+        self.assertEqual(
+            list(cleaner.Cleaner(charge_mapping_pickle_path=pickle_path).get_charge_mapping(charge_mapping_path)),
+            ["Charge2"],
+        )
+
     def test_hash_defense_attorney(self):
+        def hash_defense_attorney(input_dict):
+            redacted = self.cleaner.get_redactor().redact(input_dict, {})
+            return redacted["Defendant Information"]["defense_attorney"]
+
         input_data = {
-            "party information": {
+            "Case Metadata": {"code": "123-ABC-456"},
+            "Defendent Information": {
                 "defense attorney": "John Doe",
                 "defense attorney phone number": "555-1234"
             }
         }
-        result = self.cleaner.hash_defense_attorney(input_data)
+        result = hash_defense_attorney(input_data)
         self.assertIsInstance(result, str)
+        self.assertEqual(len(result), 16)
         self.assertNotEqual(result, "John Doe:555-1234")
 
         # Test consistency
-        result2 = self.cleaner.hash_defense_attorney(input_data)
+        result2 = hash_defense_attorney(copy.deepcopy(input_data))
         self.assertEqual(result, result2)
 
         # Test different input
-        input_data2 = {
-            "party information": {
-                "defense attorney": "Jane Doe",
-                "defense attorney phone number": "555-5678"
-            }
-        }
-        result3 = self.cleaner.hash_defense_attorney(input_data2)
-        self.assertEqual(result, result3)
+        input_data2 = copy.deepcopy(input_data)
+        input_data2["Defendent Information"]["defense attorney"] = "Jane Doe"
+        result3 = hash_defense_attorney(input_data2)
+        self.assertNotEqual(result, result3)
 
         # Test missing data
-        input_data3 = {"party information": {}}
-        result4 = self.cleaner.hash_defense_attorney(input_data3)
+        input_data3 = {"Case Metadata": {"code": "123-ABC-456"}, "Defendent Information": {}}
+        result4 = hash_defense_attorney(input_data3)
         self.assertEqual(result4, "")
 
     def test_redact_cause_number(self):
+        def redact_cause_number(input_dict):
+            return self.cleaner.get_redactor().redact(input_dict, {})["cause_number_redacted"]
+
         # Test case 1: Normal input and consistency
         input_dict = {"Case Metadata":{"code": "123-ABC-456"}}
-        result1 = self.cleaner.redact_cause_number(input_dict)
-        result2 = self.cleaner.redact_cause_number(input_dict)
+        result1 = redact_cause_number(input_dict)
+        result2 = redact_cause_number(input_dict)
     
         self.assertIsInstance(result1, str)
         self.assertEqual(len(result1), 16)  # xxHash produces a 16-character hexadecimal string
@@ -1052,15 +1814,15 @@ class CleanTestCase(unittest.TestCase):
     
         # Test case 2: Different input produces different hash
         input_dict2 = {"Case Metadata":{"code": "789-XYZ-012"}}
-        result3 = self.cleaner.redact_cause_number(input_dict2)
+        result3 = redact_cause_number(input_dict2)
         self.assertNotEqual(result1, result3)
     
         # Test case 3: Empty input
-        self.assertNotEqual(self.cleaner.redact_cause_number({"Case Metadata":{"code": ""}}), result1)
+        self.assertNotEqual(redact_cause_number({"Case Metadata":{"code": ""}}), result1)
     
         # Test case 4: Missing 'code' key
         with self.assertRaises(KeyError):
-            self.cleaner.redact_cause_number({})
+            redact_cause_number({})
 
     def test_process_charges(self):
         charges = [
@@ -1084,12 +1846,57 @@ class CleanTestCase(unittest.TestCase):
         processed_charges, earliest_date = self.cleaner.process_charges(charges_invalid_date, charge_mapping)
         self.assertEqual(len(processed_charges), 0)
         self.assertEqual(earliest_date, "")
+
+    def test_charge_matcher(self):
+        from cleaner.charge_matcher import ChargeMatcher, normalize_charge_name
+        self.assertEqual(
+            normalize_charge_name("Poss CS PG 1 <1G"), "POSSESSION CONTROLLED SUBSTANCE PENALTY GROUP 1 <1G"
+        )
+        charge_matcher = ChargeMatcher(
+            ["POSS CS PG 1 <1G", "FAIL TO ID/GIVE INFO", "ASSAULT CAUSES BI FAMILY MEMBER", "BURGLARY OF HABITATION"]
+        )
+        self.assertEqual(charge_matcher.match("BURGLARY OF HABITATION"), ("BURGLARY OF HABITATION", 1.0))
+        # Case, punctuation and abbreviations don't matter.
+        self.assertEqual(charge_matcher.match("Fail to I.D./Give Information"), ("FAIL TO ID/GIVE INFO", 1.0))
+        # Close names match with a lower score.
+        charge_name, score = charge_matcher.match("ASSAULT CAUSES BODILY INJ FAMILY MEMBER")
+        self.assertEqual(charge_name, "ASSAULT CAUSES BI FAMILY MEMBER")
+        self.assertTrue(charge_matcher.min_score <= score < 1)
+        self.assertIsNone(charge_matcher.match("CRIMINAL MISCHIEF"))
+        self.assertIsNone(charge_matcher.match("..."))
+        # A misspelled name matches, but an enhanced offense isn't matched to its base charge.
+        self.assertEqual(charge_matcher.match("POSESSION CS PG 1 <1G")[0], "POSS CS PG 1 <1G")
+        self.assertIsNone(charge_matcher.match("POSS CS PG 1 <1G DFZ"))
+        self.assertIsNone(charge_matcher.match("POSS CS PG 1 <1G SUB"))
+        self.assertIsNone(charge_matcher.match("POSS CS PG 1 <1G BY DEALER"))
+        # Nor is a plain charge matched to an enhanced or repeat offender one of the UMich list.
+        umich_matcher = self.cleaner.get_charge_matcher()
+        self.assertIsNone(umich_matcher.match("AGGRAVATED ASSAULT CAUSES BODILY INJ FAMILY VIOLENCE"))
+        self.assertIsNone(umich_matcher.match("ASSAULT BY STRANGULATION - FAMILY VIOLENCE - OFFENDER"))
+        charge_name, _ = umich_matcher.match("ASSLT CAUSES BODILY INJURY FAMILY MEMBER")
+        self.assertNotIn("ENH", charge_name.split())
+
+        charges = [
+            {"level": "Felony", "charges": "POSSESSION OF CS PG 1 <1G", "statute": "481.115", "date": "12/01/2023"},
+            {"level": "Felony", "charges": "CRIMINAL MISCHIEF", "statute": "28.03", "date": "12/01/2023"},
+        ]
+        charge_mapping = {"POSS CS PG 1 <1G": {"uccs_code": "3090"}}
+        processed_charges, _ = self.cleaner.process_charges(charges, charge_mapping)
+        self.assertEqual(processed_charges, [])
+        processed_charges, _ = self.cleaner.process_charges(
+            charges, charge_mapping, ChargeMatcher(list(charge_mapping))
+        )
+        self.assertEqual(len(processed_charges), 1)
+        self.assertEqual(processed_charges[0]["uccs_code"], "3090")
+        self.assertEqual(processed_charges[0]["charge_match_score"], 1.0)
     
     def test_contains_good_motion(self):
-        self.assertTrue(self.cleaner.contains_good_motion("Motion To Suppress", "Event: Motion To Suppress"))
-        self.assertTrue(self.cleaner.contains_good_motion("Motion To Suppress", ["Other", "Motion To Suppress"]))
-        self.assertFalse(self.cleaner.contains_good_motion("Motion To Suppress", "Other Motion"))
-        self.assertFalse(self.cleaner.contains_good_motion("Motion To Suppress", ["Other1", "Other2"]))
+        from cleaner.motion_matcher import MotionMatcher
+        motion_matcher = MotionMatcher(["Motion To Suppress"])
+        self.assertEqual(motion_matcher.find("Event: motion to suppress"), ["Motion To Suppress"])
+        self.assertEqual(motion_matcher.find(["Other", ["Motion To Suppress"]]), ["Motion To Suppress"])
+        self.assertEqual(motion_matcher.find("Other Motion"), [])
+        self.assertEqual(motion_matcher.find(["Other1", "Other2"]), [])
 
     def test_find_good_motions(self):
         events = [
@@ -1108,11 +1915,69 @@ class CleanTestCase(unittest.TestCase):
         result_no_match = self.cleaner.find_good_motions(events_no_match, cleaner.GOOD_MOTIONS)
         self.assertEqual(result_no_match, [])
 
+    def test_motion_matcher(self):
+        from cleaner.motion_matcher import MotionMatcher
+        with open(cleaner.GOOD_MOTIONS_PATH) as f:
+            self.assertEqual(cleaner.GOOD_MOTIONS, json.load(f))
+        motion_matcher = MotionMatcher(cleaner.GOOD_MOTIONS)
+        events = [
+            ["01/02/2024", "MOTION TO REDUCE BOND HEARING", ["(9:00 AM)", "motion in limine"]],
+            ["01/03/2024", "Motion for Production of Records"],
+        ]
+        # A motion inside a longer one is found too, and matches follow the motion list.
+        self.assertEqual(
+            motion_matcher.find(events),
+            ["Motion to Reduce Bond", "Motion to Reduce Bond Hearing", "Motion for Production", "Motion In Limine"],
+        )
+        # A motion isn't matched across two strings of the events.
+        self.assertEqual(motion_matcher.find(["Motion To", "Suppress"]), [])
+        self.assertEqual(MotionMatcher([]).find(events), [])
+        # Characters that re.IGNORECASE folds differently from str.lower don't match,
+        # rather than raising KeyError.
+        self.assertEqual(motion_matcher.find(["MOTION IN LİMINE", "motion to suppreſs"]), [])
+
+    def test_redactor(self):
+        from cleaner.redaction import Redactor
+        input_dict = {
+            "Case Metadata": {"code": "123-ABC-456"},
+            "Defendent Information": {"defense attorney": "John Doe", "defense attorney phone number": "555-1234"},
+        }
+        output_dict = {
+            "Defendant Information": {"defense_attorney": ""},
+            "Disposition_Information": [
+                {"date": "01/30/2021", "judicial officer": "Judge A", "details": [{"judicial officer": "Judge B"}]},
+                {"date": "not a date"},
+            ],
+        }
+        # The default rules hash the defense attorney with their phone number, and the cause number.
+        redacted = self.cleaner.get_redactor().redact(input_dict, copy.deepcopy(output_dict))
+        self.assertEqual(redacted["Defendant Information"]["defense_attorney"], xxhash.xxh64("John Doe:555-1234").hexdigest())
+        self.assertEqual(redacted["cause_number_redacted"], xxhash.xxh64("123-ABC-456").hexdigest())
+        # Only the judicial officer at the path in the rules is dropped.
+        self.assertNotIn("judicial officer", redacted["Disposition_Information"][0])
+        self.assertEqual(redacted["Disposition_Information"][0]["details"], [{"judicial officer": "Judge B"}])
+        self.assertIs(self.cleaner.get_redactor(), self.cleaner.get_redactor())
+
+        redactor = Redactor({
+            "hash": [{"path": "Defendant Information.defense_attorney", "from": ["Defendent Information.missing"]}],
+            "generalize": [{"path": "Disposition_Information[*].date", "to": "year"}],
+        })
+        redacted = redactor.redact(input_dict, copy.deepcopy(output_dict))
+        self.assertEqual(redacted["Defendant Information"]["defense_attorney"], "")
+        self.assertEqual([d["date"] for d in redacted["Disposition_Information"]], ["2021", ""])
+        with self.assertRaises(KeyError):
+            Redactor({"hash": [{"path": "id", "from": ["missing"], "required": True}]}).redact({}, {})
+        with self.assertRaises(ValueError):
+            Redactor({"mask": []})
+        with self.assertRaises(ValueError):
+            Redactor({"drop": ["Disposition_Information[*]"]})
+
     def test_process_single_case(self):
         county = "hays"
         input_folder_path = os.path.join(os.path.dirname(__file__), "..", "..", "resources", "test_files")
         case_file = "test_123456.json"
-        output_folder_path = os.path.join(os.path.dirname(__file__), "..", "..", "resources", "test_files", "cleaned_test_json")
+        output_folder_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_folder_path)
 
         self.cleaner.process_single_case(input_folder_path, case_file, output_folder_path)
 
@@ -1128,6 +1993,112 @@ class CleanTestCase(unittest.TestCase):
             self.assertTrue("html_hash" in output_data)
             self.assertTrue("Good Motions" in output_data)
             self.assertTrue("cause_number_redacted" in output_data)
+        # Apart from the date it was cleaned, the case matches the cleaned test case.
+        with open(os.path.join(input_folder_path, "cleaned_test_json", case_file), 'r') as f:
+            expected_data = json.load(f)
+        expected_data["parsing_date"] = output_data["parsing_date"]
+        self.assertEqual(output_data, expected_data)
+
+    def test_output_formats(self):
+        input_folder_path = os.path.join(os.path.dirname(__file__), "..", "..", "resources", "test_files")
+        with open(os.path.join(input_folder_path, "test_123456.json")) as f:
+            input_dict = json.load(f)
+        expected_output = self.cleaner.clean_case(input_dict)
+
+        compact_folder_path = tempfile.mkdtemp()
+        cleaner.Cleaner(output_format="compact").process_single_case(
+            input_folder_path, "test_123456.json", compact_folder_path
+        )
+        with open(os.path.join(compact_folder_path, "test_123456.json")) as f:
+            self.assertEqual(json.load(f), expected_output)
+
+        # A parser NDJSON file of two cases is cleaned into a gzipped NDJSON file of the day.
+        case_json_folder_path = tempfile.mkdtemp()
+        with open(os.path.join(case_json_folder_path, "2024-01-31.ndjson"), "w") as f:
+            f.write(json.dumps(input_dict) + "\n" + json.dumps(input_dict) + "\n")
+        cleaned_folder_path = tempfile.mkdtemp()
+        ndjson_cleaner = cleaner.Cleaner(output_format="ndjson.gz")
+        ndjson_cleaner.process_ndjson_file(case_json_folder_path, "2024-01-31.ndjson", cleaned_folder_path)
+        cleaned_cases = ndjson_cleaner.load_ndjson_file(ndjson_cleaner.get_ndjson_path(cleaned_folder_path))
+        self.assertEqual(cleaned_cases, [expected_output, expected_output])
+
+        with self.assertRaises(ValueError):
+            cleaner.Cleaner(output_format="yaml")
+
+    def test_process_json_files_in_pool(self):
+        input_folder_path = os.path.join(os.path.dirname(__file__), "..", "..", "resources", "test_files")
+        case_json_folder_path = tempfile.mkdtemp()
+        for case_number in range(5):
+            shutil.copy(
+                os.path.join(input_folder_path, "test_123456.json"),
+                os.path.join(case_json_folder_path, f"{case_number}.json"),
+            )
+        for broken_file in ("broken1.json", "broken2.json"):
+            with open(os.path.join(case_json_folder_path, broken_file), "w") as f:
+                f.write("{}")
+
+        cleaned = {}
+        for workers in (1, 2):
+            cleaned_folder_path = tempfile.mkdtemp()
+            pool_cleaner = cleaner.Cleaner(workers=workers, batch_size=4)
+            with patch.object(pool_cleaner, "get_or_create_folder_path", return_value=cleaned_folder_path), \
+                    self.assertLogs(level="ERROR") as log:
+                pool_cleaner.process_json_files("hays", case_json_folder_path)
+            # Both broken files are in the same batch, and are reported together.
+            self.assertEqual(len(log.output), 1)
+            self.assertIn("broken1.json", log.output[0])
+            self.assertIn("broken2.json", log.output[0])
+            cleaned[workers] = {
+                file_name: self.cleaner.load_json_file(os.path.join(cleaned_folder_path, file_name))
+                for file_name in os.listdir(cleaned_folder_path)
+            }
+        self.assertEqual(sorted(cleaned[1]), [f"{case_number}.json" for case_number in range(5)])
+        self.assertEqual(cleaned[2], cleaned[1])
+
+    def test_process_json_files_incremental(self):
+        input_folder_path = os.path.join(os.path.dirname(__file__), "..", "..", "resources", "test_files")
+        with open(os.path.join(input_folder_path, "test_123456.json")) as f:
+            input_dict = json.load(f)
+        case_json_folder_path = tempfile.mkdtemp()
+        for case_number in range(3):
+            with open(os.path.join(case_json_folder_path, f"{case_number}.json"), "w") as f:
+                json.dump(input_dict, f)
+        cleaned_folder_path = os.path.join(tempfile.mkdtemp(), "case_json_cleaned")
+        os.makedirs(cleaned_folder_path)
+        incremental_cleaner = cleaner.Cleaner(incremental=True)
+
+        def cleaned_cases():
+            with patch.object(incremental_cleaner, "get_or_create_folder_path", return_value=cleaned_folder_path), \
+                    patch.object(incremental_cleaner, "clean_case", wraps=incremental_cleaner.clean_case) as mock_clean_case:
+                incremental_cleaner.process_json_files("hays", case_json_folder_path)
+            return mock_clean_case.call_count
+
+        self.assertEqual(cleaned_cases(), 3)
+        # Nothing changed, so nothing is cleaned.
+        self.assertEqual(cleaned_cases(), 0)
+        # A file rewritten with the same html_hash is read but not cleaned again.
+        os.utime(os.path.join(case_json_folder_path, "0.json"), ns=(0, 0))
+        self.assertEqual(cleaned_cases(), 0)
+        # A new html_hash, a deleted cleaned file and a new cleaner version each cause a re-clean.
+        with open(os.path.join(case_json_folder_path, "1.json"), "w") as f:
+            json.dump(dict(input_dict, html_hash="0123456789abcdef"), f)
+        self.assertEqual(cleaned_cases(), 1)
+        os.remove(os.path.join(cleaned_folder_path, "2.json"))
+        self.assertEqual(cleaned_cases(), 1)
+        with patch.object(cleaner, "CLEANER_VERSION", "test"):
+            self.assertEqual(cleaned_cases(), 3)
+        with open(os.path.join(cleaned_folder_path, "1.json")) as f:
+            self.assertEqual(json.load(f)["html_hash"], "0123456789abcdef")
+        # Editing the redaction rules, motion list or charge mapping cleans every case again.
+        rule_folder_path = tempfile.mkdtemp()
+        for path_name in ("REDACTION_RULES_PATH", "GOOD_MOTIONS_PATH", "CHARGE_MAPPING_PATH"):
+            with open(getattr(cleaner, path_name), "rb") as f:
+                edited_path = os.path.join(rule_folder_path, f"{path_name}.json")
+                with open(edited_path, "wb") as edited:
+                    edited.write(f.read() + b"\n")
+            with patch.object(cleaner, path_name, edited_path):
+                self.assertEqual(cleaned_cases(), 3)
+                self.assertEqual(cleaned_cases(), 0)
 
     # Will need 
     """@patch("os.listdir", return_value=["case1.json", "case2.json"])
@@ -1164,4 +2135,324 @@ class CleanTestCase(unittest.TestCase):
         mock_process_json_files.side_effect = Exception("Test error")
         with self.assertLogs(level='ERROR') as log:
             self.cleaner.clean(county)
-        self.assertIn(f"ERROR:root:Error during cleaning process for county: {county}. Error: Test error", log.output)
\ No newline at end of file
+        self.assertIn(f"ERROR:root:Error during cleaning process for county: {county}. Error: Test error", log.output)
+
+class FakeCosmosContainer:
+    """In-memory stand-in for the cases-cleaned container client, counting its round trips."""
+
+    def __init__(self, partition_key_field):
+        # A nested field is written with slashes, e.g. "defendant/id".
+        self.partition_key_field = partition_key_field
+        self.items = {}
+        self.queries = 0
+        self.batches = 0
+
+    def read(self):
+        return {"partitionKey": {"paths": [f"/{self.partition_key_field}"]}}
+
+    def query_items(self, query, parameters, enable_cross_partition_query):
+        self.queries += 1
+        select, field = re.match(r"SELECT (.*) FROM c WHERE ARRAY_CONTAINS\(@values, c\.(\w+)\)", query).groups()
+        select_fields = [select_field.strip()[len("c."):] for select_field in select.split(",")]
+        values = parameters[0]["value"]
+        return [
+            {select_field: item[select_field] for select_field in select_fields}
+            for item in self.items.values() if item[field] in values
+        ]
+
+    def execute_item_batch(self, batch_operations, partition_key):
+        self.batches += 1
+        items = [operation[1][0] for operation in batch_operations]
+        if len(items) > updater.MAX_BATCH_OPERATIONS or any(
+            item["id"] in self.items or self.get_partition_key(item) != partition_key for item in items
+        ):
+            raise exceptions.CosmosBatchOperationError(headers={}, status_code=409, message="Conflict")
+        for item in items:
+            self.items[item["id"]] = dict(item)
+        return items
+
+    def get_partition_key(self, item):
+        for key in self.partition_key_field.split("/"):
+            item = item[key]
+        return item
+
+
+class UpdaterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.case_json_cleaned_folder_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.case_json_cleaned_folder_path)
+
+    def write_case(self, case_number, county, html_hash, **fields):
+        with open(os.path.join(self.case_json_cleaned_folder_path, f"{case_number}_{html_hash}.json"), "w") as f:
+            json.dump({"case_number": case_number, "county": county, "html_hash": html_hash, **fields}, f)
+
+    def make_updater(self, container, **kwargs):
+        case_updater = updater.Updater(county="hays", bulk=True, container=container, **kwargs)
+        case_updater.case_json_cleaned_folder_path = case_updater.processed_path = self.case_json_cleaned_folder_path
+        return case_updater
+
+    def test_update_bulk(self):
+        container = FakeCosmosContainer("county")
+        container.items["1:hays:old"] = {"id": "1:hays:old", "case_number": "1", "county": "hays", "html_hash": "old", "version": 2}
+        for i in range(120):
+            self.write_case(str(i % 60), "hays" if i % 2 else "travis", f"hash{i:03}")
+        self.write_case("1", "hays", "old")
+
+        case_updater = updater.Updater(county="hays", bulk=True, batch_size=50, container=container)
+        case_updater.case_json_cleaned_folder_path = case_updater.processed_path = self.case_json_cleaned_folder_path
+        case_updater.update()
+
+        # Two queries per batch of files, and one transactional batch per county in each.
+        self.assertEqual(container.queries, 2 * 3)
+        self.assertEqual(container.batches, 2 * 3)
+        self.assertEqual(len(container.items), 121)
+        # Versions of a case number follow the one in the database, then each other.
+        versions = sorted(item["version"] for item in container.items.values() if item["case_number"] == "1")
+        self.assertEqual(versions, [2, 3, 4])
+
+        # Cases already inserted are skipped without writing anything.
+        case_updater.update()
+        self.assertEqual(container.batches, 2 * 3)
+        self.assertEqual(len(container.items), 121)
+
+    def test_update_legacy_html_hash(self):
+        # A case stored with the html_hash from before fingerprints isn't inserted again.
+        container = FakeCosmosContainer("case_number")
+        container.items["1:hays:old"] = {"id": "1:hays:old", "case_number": "1", "county": "hays", "html_hash": "legacy", "version": 1}
+        with open(os.path.join(self.case_json_cleaned_folder_path, "1.json"), "w") as f:
+            json.dump({"case_number": "1", "county": "hays", "html_hash": "new", "legacy_html_hash": "legacy"}, f)
+
+        case_updater = updater.Updater(county="hays", bulk=True, container=container)
+        case_updater.case_json_cleaned_folder_path = case_updater.processed_path = self.case_json_cleaned_folder_path
+        case_updater.update()
+        self.assertEqual(container.batches, 0)
+        self.assertEqual(len(container.items), 1)
+
+    def test_update_bulk_failed_batch(self):
+        container = FakeCosmosContainer("case_number")
+        for i in range(3):
+            self.write_case("1", "hays", f"hash{i}")
+        self.write_case("2", "hays", "hash2")
+        container.execute_item_batch = MagicMock(side_effect=exceptions.CosmosBatchOperationError(headers={}, status_code=409, message="Conflict"))
+
+        case_updater = updater.Updater(county="hays", bulk=True, container=container)
+        case_updater.case_json_cleaned_folder_path = case_updater.processed_path = self.case_json_cleaned_folder_path
+        with self.assertLogs(case_updater.logger, level="ERROR") as logs:
+            case_updater.update()
+        # A file with the same hash as another of its batch isn't inserted twice.
+        self.assertEqual(
+            [call.kwargs["partition_key"] for call in container.execute_item_batch.call_args_list], ["1"]
+        )
+        self.assertEqual(len(container.execute_item_batch.call_args.kwargs["batch_operations"]), 3)
+        self.assertIn("Error inserting 3 cases", logs.output[0])
+
+    def test_update_bulk_version_after_failed_batch(self):
+        # The first transactional batch of case 1 fails, so the next one takes its versions.
+        container = FakeCosmosContainer("county")
+        execute_item_batch = container.execute_item_batch
+
+        def fail_first_batch(**kwargs):
+            if container.batches == 0:
+                container.batches += 1
+                raise exceptions.CosmosBatchOperationError(headers={}, status_code=409, message="Conflict")
+            return execute_item_batch(**kwargs)
+
+        container.execute_item_batch = fail_first_batch
+        for i in range(3):
+            self.write_case("1", "hays", f"hash{i}")
+
+        with patch.object(updater, "MAX_BATCH_OPERATIONS", 2), self.assertLogs(level="ERROR"):
+            self.make_updater(container).update()
+        self.assertEqual([item["version"] for item in container.items.values()], [1])
+        # The cases of the failed batch are inserted by the next update.
+        self.make_updater(container).update()
+        self.assertEqual(sorted(item["version"] for item in container.items.values()), [1, 2, 3])
+
+    def test_update_ndjson(self):
+        # Cases the cleaner wrote to NDJSON files are inserted, and the files are left in place.
+        parser.append_ndjson(
+            os.path.join(self.case_json_cleaned_folder_path, "2024-01-31.ndjson.gz"),
+            [json.dumps({"case_number": str(i), "county": "hays", "html_hash": f"hash{i}"}).encode() for i in (1, 2)],
+        )
+        self.write_case("3", "hays", "hash3")
+        container = FakeCosmosContainer("case_number")
+        self.make_updater(container).update()
+        self.assertEqual(sorted(item["case_number"] for item in container.items.values()), ["1", "2", "3"])
+        self.assertIn("2024-01-31.ndjson.gz", os.listdir(self.case_json_cleaned_folder_path))
+
+        container = MagicMock()
+        container.query_items.return_value = []
+        case_updater = self.make_updater(container)
+        case_updater.bulk = False
+        case_updater.update()
+        self.assertEqual(
+            sorted(call.kwargs["body"]["case_number"] for call in container.create_item.call_args_list), ["1", "2", "3"]
+        )
+
+    def test_update_bulk_bad_files(self):
+        # Files that aren't the JSON of a case are logged and skipped, and the others inserted.
+        container = FakeCosmosContainer("case_number")
+        self.write_case("1", "hays", "hash1")
+        with open(os.path.join(self.case_json_cleaned_folder_path, "broken.json"), "w") as f:
+            f.write('{"case_number": ')
+        with open(os.path.join(self.case_json_cleaned_folder_path, "2024-01-31.ndjson"), "w") as f:
+            f.write('{"case_number": "2"}\n{"case_number": "3"}\n')
+        with open(os.path.join(self.case_json_cleaned_folder_path, "2024-01-31.ndjson.gz"), "wb") as f:
+            f.write(b"\x1f\x8b\x08\x00\xff")
+        with open(os.path.join(self.case_json_cleaned_folder_path, "list.json"), "w") as f:
+            json.dump([], f)
+
+        case_updater = self.make_updater(container)
+        with self.assertLogs(case_updater.logger, level="ERROR") as logs:
+            case_updater.update()
+        self.assertEqual(len(logs.output), 4)
+        self.assertEqual([item["case_number"] for item in container.items.values()], ["1"])
+
+    def test_update_bulk_nested_partition_key(self):
+        container = FakeCosmosContainer("defendant/id")
+        self.write_case("1", "hays", "hash1", defendant={"id": "a"})
+        self.write_case("2", "hays", "hash2", defendant={"id": "b"})
+        self.write_case("3", "hays", "hash3")
+
+        case_updater = self.make_updater(container)
+        self.assertEqual(case_updater.get_partition_key_path(), ["defendant", "id"])
+        with self.assertLogs(case_updater.logger, level="ERROR") as logs:
+            case_updater.update()
+        self.assertIn("3_hash3.json has no partition key at /defendant/id", logs.output[0])
+        self.assertEqual(sorted(item["case_number"] for item in container.items.values()), ["1", "2"])
+        self.assertEqual(container.batches, 2)
+
+
+class FakeS3Client:
+    """In-memory stand-in for the multipart upload calls of a boto3 S3 client."""
+
+    def __init__(self):
+        self.uploads = {}
+        self.objects = {}
+        self.aborted = []
+
+    def create_multipart_upload(self, Bucket, Key):
+        upload_id = str(len(self.uploads) + 1)
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, PartNumber, UploadId, Body):
+        self.uploads[UploadId][PartNumber] = Body
+        return {"ETag": f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.objects[(Bucket, Key)] = b"".join(parts[part["PartNumber"]] for part in MultipartUpload["Parts"])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId)
+        self.aborted.append(UploadId)
+
+
+class ZipFolderTestCase(unittest.TestCase):
+    def setUp(self):
+        from tools import zip_folder
+        self.zip_folder = zip_folder
+        self.folderpath = tempfile.mkdtemp()
+        self.files = {f"{case_id}.html": os.urandom(3000) for case_id in range(10)}
+        for file_name, content in self.files.items():
+            with open(os.path.join(self.folderpath, file_name), "wb") as file_handle:
+                file_handle.write(content)
+
+    def test_zip_folder_to_s3(self, part_size=4096):
+        client = FakeS3Client()
+        uploaded_parts = []
+        upload_part = client.upload_part
+
+        def record_upload_part(**kwargs):
+            uploaded_parts.append(len(kwargs["Body"]))
+            return upload_part(**kwargs)
+
+        client.upload_part = record_upload_part
+        with patch.object(self.zip_folder, "MIN_PART_SIZE", part_size):
+            self.zip_folder.zip_folder_to_s3(self.folderpath, client, "bucket", "case_html.zip", part_size)
+
+        # The archive goes up in parts of part_size, so no more than a part is ever held in memory.
+        self.assertGreater(len(uploaded_parts), 1)
+        self.assertTrue(all(size == part_size for size in uploaded_parts[:-1]))
+        with zipfile.ZipFile(io.BytesIO(client.objects[("bucket", "case_html.zip")])) as zf:
+            self.assertEqual({name: zf.read(name) for name in zf.namelist()}, self.files)
+
+    def test_zip_folder_to_s3_aborts_on_error(self, part_size=4096):
+        client = FakeS3Client()
+        with patch.object(self.zip_folder, "MIN_PART_SIZE", part_size), \
+                patch.object(zipfile.ZipFile, "write", side_effect=OSError("disk error")):
+            with self.assertRaises(OSError):
+                self.zip_folder.zip_folder_to_s3(self.folderpath, client, "bucket", "case_html.zip", part_size)
+        self.assertEqual(client.aborted, ["1"])
+        self.assertEqual(client.objects, {})
+
+    def test_part_size_minimum(self):
+        with self.assertRaises(ValueError):
+            self.zip_folder.S3MultipartWriter(FakeS3Client(), "bucket", "case_html.zip", part_size=1024)
+
+class ExportParquetTestCase(unittest.TestCase):
+    def setUp(self):
+        from tools import export_parquet
+        self.export_parquet = export_parquet
+        self.test_files_path = os.path.join(os.path.dirname(__file__), "..", "..", "resources", "test_files")
+        self.output_path = os.path.join(tempfile.mkdtemp(), "parquet")
+
+    def read_table(self, table_name):
+        import pyarrow.dataset as ds
+        return ds.dataset(
+            os.path.join(self.output_path, table_name), format="parquet", partitioning="hive"
+        ).to_table()
+
+    def test_export_parsed_cases(self):
+        case_json_path = tempfile.mkdtemp()
+        with open(os.path.join(self.test_files_path, "test_123456.json")) as file_handle:
+            case_data = json.load(file_handle)
+        with open(os.path.join(case_json_path, "1.json"), "w") as file_handle:
+            json.dump(case_data, file_handle)
+        with open(os.path.join(case_json_path, "2024-01-31.ndjson"), "w") as file_handle:
+            case_data["Case Metadata"]["odyssey id"] = "2"
+            file_handle.write(json.dumps(case_data) + "\n")
+
+        case_count = self.export_parquet.export_parquet(case_json_path, self.output_path, "hays", batch_size=1)
+
+        self.assertEqual(case_count, 2)
+        cases = self.read_table("cases").to_pylist()
+        self.assertEqual(sorted(case["case_id"] for case in cases), ["1", "2"])
+        self.assertEqual(cases[0]["date_filed"], datetime(2016, 1, 5).date())
+        self.assertEqual(cases[0]["year"], 2016)
+        self.assertTrue(os.path.isdir(os.path.join(self.output_path, "cases", "county=hays", "year=2016")))
+        self.assertEqual(self.read_table("charges").num_rows, 2 * len(case_data["Charge Information"]))
+        self.assertEqual(self.read_table("events").num_rows, 2 * len(case_data["Other Events and Hearings"]))
+        # A column is read without the others.
+        outcomes = self.read_table("dispositions").column("outcome").to_pylist()
+        self.assertIn("Deferred Adjudication", outcomes)
+
+    def test_export_reparsed_case(self):
+        case_json_path = tempfile.mkdtemp()
+        with open(os.path.join(self.test_files_path, "test_123456.json")) as file_handle:
+            case_data = json.load(file_handle)
+        case_data["Case Metadata"]["odyssey id"] = "1"
+        for day, html_hash in [("2024-01-31", "old"), ("2024-02-01", "new")]:
+            case_data["html_hash"] = html_hash
+            with open(os.path.join(case_json_path, f"{day}.ndjson"), "w") as file_handle:
+                file_handle.write(json.dumps(case_data) + "\n")
+
+        case_count = self.export_parquet.export_parquet(case_json_path, self.output_path, "hays")
+
+        # Only the record of the later day is exported.
+        self.assertEqual(case_count, 1)
+        self.assertEqual(self.read_table("cases").column("html_hash").to_pylist(), ["new"])
+        self.assertEqual(self.read_table("charges").num_rows, len(case_data["Charge Information"]))
+
+    def test_export_cleaned_cases(self):
+        case_json_path = os.path.join(self.test_files_path, "cleaned_test_json")
+        self.export_parquet.export_parquet(case_json_path, self.output_path, "hays", "case_json_cleaned")
+        charges = self.read_table("charges").to_pylist()
+        self.assertEqual(charges[0]["uccs_code"], "1200")
+        self.assertEqual(charges[0]["charge_date"], datetime(2015, 10, 25).date())
+        self.assertFalse(os.path.exists(os.path.join(self.output_path, "events")))
+        with self.assertRaises(ValueError):
+            self.export_parquet.export_parquet(case_json_path, self.output_path, "hays", "case_html")
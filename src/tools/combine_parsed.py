@@ -1,8 +1,13 @@
 import os
+import sys
 import json
 import argparse
+from itertools import islice
 import boto3
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from parser.case_output import is_ndjson_file, read_case_files
+
 argparser = argparse.ArgumentParser()
 argparser.add_argument(
     "-county",
@@ -18,14 +23,13 @@ case_json_path = os.path.join(
     os.path.dirname(__file__), "..", "..", "data", args.county, "case_json"
 )
 
-file_list = os.listdir(case_json_path)
-
-# read case ids (first 1000 for now)
+# read case ids (first 1000 for now), from per-case .json files or .ndjson(.gz) files
 all_case_data = {}
-for case_filename in file_list[:1000]:
-    case_id = os.path.splitext(os.path.basename(case_filename))[0]
-    with open(os.path.join(case_json_path, case_filename), "r") as f:
-        case_data = json.load(f)
+for case_filename, case_data in islice(read_case_files(case_json_path), 1000):
+    if is_ndjson_file(case_filename):
+        case_id = case_data["Case Metadata"]["odyssey id"]
+    else:
+        case_id = os.path.splitext(os.path.basename(case_filename))[0]
     all_case_data[case_id] = case_data
 
 # export to s3 bucket
@@ -0,0 +1,330 @@
+"""
+Export the case JSON of a county to partitioned Parquet tables.
+
+Each case is split into rows of four tables, written under data/<county>/parquet/<source>/:
+
+- cases: one row per case.
+- charges: one row per charge of a case.
+- dispositions: one row per charge of each disposition of a case.
+- events: one row per other event or hearing of a case (parsed JSON only).
+
+Rows of every table carry the case_id, county and year of the case, and the tables are
+hive-partitioned by county and year, so a query reads only the columns and partitions it
+needs instead of every JSON file. Both per-case .json files and .ndjson(.gz) files are read.
+"""
+import argparse
+import os
+import shutil
+import sys
+from datetime import date, datetime
+from typing import Iterator, Optional
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from parser.case_output import is_ndjson_file, read_case_files
+
+# Cases buffered before their rows are written out as one file per table and partition.
+DEFAULT_BATCH_SIZE = 10000
+PARTITION_COLUMNS = ["county", "year"]
+KEY_FIELDS = [
+    pa.field("case_id", pa.string()),
+    pa.field("county", pa.string()),
+    pa.field("year", pa.int16()),
+]
+DISPOSITION_FIELDS = [
+    pa.field("disposition_index", pa.int32()),
+    pa.field("date", pa.date32()),
+    pa.field("event", pa.string()),
+    pa.field("charge", pa.string()),
+    pa.field("outcome", pa.string()),
+]
+
+SCHEMAS = {
+    "case_json": {
+        "cases": pa.schema(KEY_FIELDS + [
+            pa.field("code", pa.string()),
+            pa.field("case_type", pa.string()),
+            pa.field("date_filed", pa.date32()),
+            pa.field("location", pa.string()),
+            pa.field("sex", pa.string()),
+            pa.field("race", pa.string()),
+            pa.field("defense_attorney", pa.string()),
+            pa.field("appointed_or_retained", pa.string()),
+            pa.field("top_charge_name", pa.string()),
+            pa.field("top_charge_level", pa.string()),
+            pa.field("dismissed_charges_count", pa.int32()),
+            pa.field("html_hash", pa.string()),
+        ]),
+        "charges": pa.schema(KEY_FIELDS + [
+            pa.field("charge_index", pa.int32()),
+            pa.field("charge", pa.string()),
+            pa.field("statute", pa.string()),
+            pa.field("level", pa.string()),
+            pa.field("date", pa.date32()),
+        ]),
+        "dispositions": pa.schema(KEY_FIELDS + DISPOSITION_FIELDS + [
+            pa.field("judicial_officer", pa.string()),
+        ]),
+        "events": pa.schema(KEY_FIELDS + [
+            pa.field("event_index", pa.int32()),
+            pa.field("date", pa.date32()),
+            pa.field("event", pa.string()),
+            pa.field("details", pa.list_(pa.string())),
+        ]),
+    },
+    "case_json_cleaned": {
+        "cases": pa.schema(KEY_FIELDS + [
+            pa.field("parsing_date", pa.date32()),
+            pa.field("earliest_charge_date", pa.date32()),
+            pa.field("appointed_or_retained", pa.string()),
+            pa.field("defense_attorney", pa.string()),
+            pa.field("has_evidence_of_representation", pa.bool_()),
+            pa.field("good_motions", pa.list_(pa.string())),
+            pa.field("html_hash", pa.string()),
+        ]),
+        "charges": pa.schema(KEY_FIELDS + [
+            pa.field("charge_id", pa.int32()),
+            pa.field("charge_level", pa.string()),
+            pa.field("orignal_charge", pa.string()),
+            pa.field("statute", pa.string()),
+            pa.field("is_primary_charge", pa.bool_()),
+            pa.field("charge_date", pa.date32()),
+            pa.field("charge_name", pa.string()),
+            pa.field("uccs_code", pa.string()),
+            pa.field("charge_desc", pa.string()),
+            pa.field("offense_category_desc", pa.string()),
+            pa.field("offense_type_desc", pa.string()),
+            pa.field("charge_match_score", pa.float64()),
+        ]),
+        "dispositions": pa.schema(KEY_FIELDS + DISPOSITION_FIELDS),
+    },
+}
+
+
+def parse_date(date_str: Optional[str]) -> Optional[date]:
+    """Returns the date of e.g. '01/30/2021' or '2021-01-30', or None if it isn't one."""
+    for date_format in ("%m/%d/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(date_str, date_format).date()
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def read_all_cases(case_json_path: str) -> Iterator[tuple]:
+    """Yields (case_id, case_data) for every .json file and every line of the .ndjson(.gz) files."""
+    for file_name, case_data in read_case_files(case_json_path):
+        if is_ndjson_file(file_name):
+            case_id = case_data.get("Case Metadata", {}).get("odyssey id") or case_data.get("cause_number_redacted")
+        else:
+            case_id = file_name[: -len(".json")]
+        yield case_id, case_data
+
+
+def read_cases(case_json_path: str) -> Iterator[tuple]:
+    """
+    Yields (case_id, case_data) for the latest record of every case. A case parsed again on
+    a later day is in the NDJSON file of each day, and files are read in the order of their
+    dates, so only its last record is kept. The cases are read twice, first to find the last
+    record of each case, so that they don't all have to be held in memory.
+    """
+    last_records = {}
+    for i, (case_id, _) in enumerate(read_all_cases(case_json_path)):
+        last_records[case_id] = i
+    for i, (case_id, case_data) in enumerate(read_all_cases(case_json_path)):
+        if case_id is None or last_records[case_id] == i:
+            yield case_id, case_data
+
+
+def disposition_rows(dispositions: list, keys: dict, with_judicial_officer: bool) -> Iterator[dict]:
+    for i, disposition in enumerate(dispositions):
+        for detail in disposition.get("details") or [{}]:
+            row = dict(
+                keys,
+                disposition_index=i,
+                date=parse_date(disposition.get("date")),
+                event=disposition.get("event"),
+                charge=detail.get("charge"),
+                outcome=detail.get("outcome"),
+            )
+            if with_judicial_officer:
+                row["judicial_officer"] = disposition.get("judicial officer")
+            yield row
+
+
+def case_rows(case_id: str, case_data: dict, county: str) -> dict:
+    """Splits a parsed case into its rows of the cases, charges, dispositions and events tables."""
+    case_details = case_data.get("Case Details", {})
+    defendant = case_data.get("Defendent Information", {})
+    top_charge = case_data.get("Top Charge") or {}
+    date_filed = parse_date(case_details.get("date filed"))
+    keys = {"case_id": case_id, "county": county, "year": date_filed.year if date_filed else None}
+    events = []
+    for i, event in enumerate(case_data.get("Other Events and Hearings", [])):
+        event = event if isinstance(event, list) else [event]
+        events.append(
+            dict(
+                keys,
+                event_index=i,
+                date=parse_date(event[0]) if event else None,
+                event=event[1] if len(event) > 1 else None,
+                details=event[2:],
+            )
+        )
+    return {
+        "cases": [
+            dict(
+                keys,
+                code=case_data.get("Case Metadata", {}).get("code"),
+                case_type=case_details.get("case type"),
+                date_filed=date_filed,
+                location=case_details.get("location"),
+                sex=defendant.get("sex"),
+                race=defendant.get("race"),
+                defense_attorney=defendant.get("defense attorney"),
+                appointed_or_retained=defendant.get("appointed or retained"),
+                top_charge_name=top_charge.get("charge name"),
+                top_charge_level=top_charge.get("charge level"),
+                dismissed_charges_count=case_data.get("Dismissed Charges Count"),
+                html_hash=case_data.get("html_hash"),
+            )
+        ],
+        "charges": [
+            dict(
+                keys,
+                charge_index=i,
+                charge=charge.get("charges"),
+                statute=charge.get("statute"),
+                level=charge.get("level"),
+                date=parse_date(charge.get("date")),
+            )
+            for i, charge in enumerate(case_data.get("Charge Information", []))
+        ],
+        "dispositions": list(
+            disposition_rows(case_data.get("Disposition Information", []), keys, with_judicial_officer=True)
+        ),
+        "events": events,
+    }
+
+
+def cleaned_case_rows(case_id: str, case_data: dict, county: str) -> dict:
+    """Splits a cleaned case into its rows of the cases, charges and dispositions tables."""
+    case_details = case_data.get("Case Details", {})
+    defendant = case_data.get("Defendant Information", {})
+    earliest_charge_date = parse_date(case_details.get("earliest_charge_date"))
+    keys = {
+        "case_id": case_data.get("cause_number_redacted") or case_id,
+        "county": county,
+        "year": earliest_charge_date.year if earliest_charge_date else None,
+    }
+    charge_fields = SCHEMAS["case_json_cleaned"]["charges"].names[len(KEY_FIELDS):]
+    return {
+        "cases": [
+            dict(
+                keys,
+                parsing_date=parse_date(case_data.get("parsing_date")),
+                earliest_charge_date=earliest_charge_date,
+                appointed_or_retained=defendant.get("appointed_or_retained"),
+                defense_attorney=defendant.get("defense_attorney"),
+                has_evidence_of_representation=case_details.get("has_evidence_of_representation"),
+                good_motions=case_data.get("Good Motions", []),
+                html_hash=case_data.get("html_hash"),
+            )
+        ],
+        "charges": [
+            dict(
+                keys,
+                **{
+                    field: parse_date(charge.get(field)) if field == "charge_date" else charge.get(field)
+                    for field in charge_fields
+                },
+            )
+            for charge in case_data.get("Charge Information", [])
+        ],
+        "dispositions": list(
+            disposition_rows(case_data.get("Disposition_Information", []), keys, with_judicial_officer=False)
+        ),
+    }
+
+
+def write_batch(rows: dict, schemas: dict, output_path: str, batch_number: int) -> None:
+    for table_name, schema in schemas.items():
+        if not rows[table_name]:
+            continue
+        ds.write_dataset(
+            pa.Table.from_pylist(rows[table_name], schema=schema),
+            os.path.join(output_path, table_name),
+            format="parquet",
+            partitioning=PARTITION_COLUMNS,
+            partitioning_flavor="hive",
+            basename_template=f"part-{batch_number}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+
+
+def export_parquet(
+    case_json_path: str, output_path: str, county: str, source: str = "case_json", batch_size: int = DEFAULT_BATCH_SIZE
+) -> int:
+    """
+    Exports the cases in case_json_path to Parquet tables under output_path, replacing what
+    was there, `batch_size` cases at a time. `source` tells if the cases are parsed
+    ('case_json') or cleaned ('case_json_cleaned') JSON. Returns the number of cases.
+    """
+    if source not in SCHEMAS:
+        raise ValueError(f"Unknown source '{source}', expected one of {list(SCHEMAS)}")
+    schemas = SCHEMAS[source]
+    to_rows = case_rows if source == "case_json" else cleaned_case_rows
+    if os.path.exists(output_path):
+        shutil.rmtree(output_path)
+
+    rows = {table_name: [] for table_name in schemas}
+    case_count = 0
+    batch_number = 0
+    for case_id, case_data in read_cases(case_json_path):
+        for table_name, table_rows in to_rows(case_id, case_data, county).items():
+            rows[table_name].extend(table_rows)
+        case_count += 1
+        if case_count % batch_size == 0:
+            write_batch(rows, schemas, output_path, batch_number)
+            rows = {table_name: [] for table_name in schemas}
+            batch_number += 1
+    write_batch(rows, schemas, output_path, batch_number)
+    return case_count
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument(
+        "-county",
+        "-c",
+        type=str,
+        default="hays",
+        help="The name of the county.",
+    )
+    argparser.add_argument(
+        "-source",
+        type=str,
+        choices=list(SCHEMAS),
+        default="case_json",
+        help="Export the parsed or the cleaned case JSON.",
+    )
+    argparser.add_argument(
+        "-batch_size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Number of cases written at a time.",
+    )
+    argparser.description = "Export the case JSON of the specified county to Parquet tables."
+    args = argparser.parse_args()
+
+    county_path = os.path.join(os.path.dirname(__file__), "..", "..", "data", args.county)
+    case_count = export_parquet(
+        os.path.join(county_path, args.source),
+        os.path.join(county_path, "parquet", args.source),
+        args.county,
+        args.source,
+        args.batch_size,
+    )
+    print(f"Exported {case_count} cases to {os.path.join(county_path, 'parquet', args.source)}")
@@ -1,10 +1,13 @@
 import os
-import json
+import sys
 import argparse
 
 from time import time
 from statistics import mean, median, mode
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from parser.case_output import read_case_files
+
 N_LONGEST = 5
 START_TIME = time()
 
@@ -24,9 +27,9 @@ args = argparser.parse_args()
 case_json_path = os.path.join(
     os.path.dirname(__file__), "..", "..", "data", args.county, "case_json"
 )
-for case_file in os.scandir(case_json_path):
-    with open(case_file.path, "r") as file_handle:
-        case_data_list.append(json.loads(file_handle.read()))
+# Per-case .json files and the cases of .ndjson(.gz) files alike.
+for _, case_data in read_case_files(case_json_path):
+    case_data_list.append(case_data)
 
 
 def print_top_cases_by_lambda(sort_function, description):
@@ -1,34 +1,131 @@
 import zipfile
 import os
+import io
 import argparse
-from io import BytesIO
 import boto3
 
-argparser = argparse.ArgumentParser()
-argparser.add_argument(
-    "-county",
-    "-c",
-    type=str,
-    default="hays",
-    help="The name of the county.",
-)
-argparser.description = "Print stats for the specified county."
-args = argparser.parse_args()
-
-folderpath = os.path.join(
-    os.path.dirname(__file__), "..", "..", "data", args.county, "case_html"
-)
-memory_file = BytesIO()
-with zipfile.ZipFile(memory_file, "w") as zf:
-    for root, dirs, files in os.walk(folderpath):
-        for file in files:
-            filepath = os.path.join(root, file)
-            zf.write(filepath, arcname=file)
-memory_file.seek(0)
-
-cli = boto3.client("s3")
-cli.put_object(
-    Body=memory_file,
-    Bucket="indigent-defense",
-    Key="case_html.zip",
-)
+# S3 rejects multipart uploads whose parts, other than the last, are smaller than 5 MiB.
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """
+    Write-only stream that uploads what is written to it as an S3 multipart upload.
+
+    At most one part is held in memory: whenever `part_size` bytes are buffered they are
+    sent with `upload_part`. Closing the stream uploads the rest and completes the upload,
+    while `abort` discards it. The stream isn't seekable, so `zipfile` writes to it in
+    streaming mode, with each file's sizes in a data descriptor after its contents.
+    """
+
+    def __init__(self, client, bucket: str, key: str, part_size: int = DEFAULT_PART_SIZE):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.buffer = bytearray()
+        self.parts = []
+        self.upload_id = client.create_multipart_upload(Bucket=bucket, Key=key)["UploadId"]
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.buffer += data
+        while len(self.buffer) >= self.part_size:
+            self.upload_part(bytes(self.buffer[: self.part_size]))
+            del self.buffer[: self.part_size]
+        return len(data)
+
+    def upload_part(self, body: bytes) -> None:
+        part_number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            PartNumber=part_number,
+            UploadId=self.upload_id,
+            Body=body,
+        )
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            # An upload needs at least one part, even if nothing was written.
+            if self.buffer or not self.parts:
+                self.upload_part(bytes(self.buffer))
+                self.buffer.clear()
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={"Parts": self.parts},
+            )
+        finally:
+            super().close()
+
+    def abort(self) -> None:
+        """Discards the upload and the parts already sent."""
+        if self.closed:
+            return
+        self.buffer.clear()
+        try:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id
+            )
+        finally:
+            super().close()
+
+
+def zip_folder_to_s3(
+    folderpath: str, client, bucket: str, key: str, part_size: int = DEFAULT_PART_SIZE
+) -> None:
+    """
+    Zips every file under `folderpath` straight into an S3 object, with memory bounded by
+    `part_size` however large the folder is. If anything fails, the upload is aborted.
+    """
+    writer = S3MultipartWriter(client, bucket, key, part_size)
+    try:
+        with zipfile.ZipFile(writer, "w") as zf:
+            for root, dirs, files in os.walk(folderpath):
+                for file in files:
+                    filepath = os.path.join(root, file)
+                    zf.write(filepath, arcname=file)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument(
+        "-county",
+        "-c",
+        type=str,
+        default="hays",
+        help="The name of the county.",
+    )
+    argparser.add_argument(
+        "-part_size_mb",
+        type=int,
+        default=DEFAULT_PART_SIZE // (1024 * 1024),
+        help="Size of each uploaded part in MiB, at least 5.",
+    )
+    argparser.description = "Zip the case HTML of the specified county and upload it to S3."
+    args = argparser.parse_args()
+
+    folderpath = os.path.join(
+        os.path.dirname(__file__), "..", "..", "data", args.county, "case_html"
+    )
+    zip_folder_to_s3(
+        folderpath,
+        boto3.client("s3"),
+        bucket="indigent-defense",
+        key="case_html.zip",
+        part_size=args.part_size_mb * 1024 * 1024,
+    )
@@ -4,9 +4,21 @@ from dotenv import load_dotenv
 from datetime import datetime as dt
 import logging
 
+# Cleaned cases can be written to NDJSON files, which are read with the parser's helpers.
+try:
+    from ..parser.case_output import is_ndjson_file, read_ndjson
+except ImportError:
+    from parser.case_output import is_ndjson_file, read_ndjson
+
+# Most operations Cosmos DB accepts in one transactional batch.
+MAX_BATCH_OPERATIONS = 100
+
 class Updater():
-    def __init__(self, county = "hays"):
+    def __init__(self, county = "hays", bulk = False, batch_size = 100, container = None):
         self.county = county.lower()
+        # In bulk mode, cases are looked up and inserted batch_size at a time, see update_bulk.
+        self.bulk = bulk
+        self.batch_size = batch_size
         self.case_json_cleaned_folder_path = os.path.join(
             os.path.dirname(__file__), "..", "..", "data", self.county, "case_json_cleaned"
         )
@@ -18,7 +30,8 @@ class Updater():
             not os.path.exists(self.processed_path): 
             os.makedirs(self.processed_path)
         self.logger = self.configure_logger()
-        self.COSMOSDB_CONTAINER_CASES_CLEANED = self.get_database_container()
+        # A container client can be given instead, e.g. an in-memory one for tests.
+        self.COSMOSDB_CONTAINER_CASES_CLEANED = container if container is not None else self.get_database_container()
 
     def configure_logger(self):
         logger = logging.getLogger(name="pid: " + str(os.getpid()))
@@ -66,12 +79,17 @@ class Updater():
         
         return COSMOSDB_CONTAINER_CASES_CLEANED
         
-    def update(self):
+    def can_update(self):
+        """Returns True if there is a folder of cleaned cases and a container to insert them into."""
         if not os.path.exists(self.case_json_cleaned_folder_path):
             self.logger.error(f'The following path doesn\'t exits: \n{self.case_json_cleaned_folder_path}')
-            return
-        
-        if not self.COSMOSDB_CONTAINER_CASES_CLEANED:
+            return False
+        return bool(self.COSMOSDB_CONTAINER_CASES_CLEANED)
+
+    def update(self):
+        if self.bulk:
+            return self.update_bulk()
+        if not self.can_update():
             return
 
         list_case_json_files = os.listdir(self.case_json_cleaned_folder_path)
@@ -84,49 +102,274 @@ class Updater():
             else:
                 continue
 
+            if is_ndjson_file(case_json):
+                self.update_ndjson_file(case_json, in_file)
+                continue
             with open(in_file, "r") as f:
                 input_dict = json.load(f)
-            self.logger.info(f"[Case Filename: {case_json}, Case Number: {input_dict.get('case_number', None)}, HTML Hash: {input_dict.get('html_hash', None)}]")
+            if self.update_case(case_json, input_dict):
+                # Move the file to the processed folder.
+                os.rename(in_file, dest_file)
+
+    def update_ndjson_file(self, case_json, in_file):
+        """
+        Inserts the cases of an NDJSON file written by the cleaner, one after another. The file
+        stays where it is, as the cleaner appends the cases it cleans later that day to it.
+        """
+        try:
+            for input_dict in read_ndjson(in_file):
+                self.update_case(case_json, input_dict)
+        except (OSError, EOFError, json.JSONDecodeError) as e:
+            self.logger.error(f"Error reading {case_json}, not updating the rest of its cases: {e}")
+
+    def update_case(self, case_json, input_dict):
+        """Inserts a case unless its hash is already in the database, and returns whether it is there now."""
+        self.logger.info(f"[Case Filename: {case_json}, Case Number: {input_dict.get('case_number', None)}, HTML Hash: {input_dict.get('html_hash', None)}]")
+
+        # Querying case databse to fetch all items that match the hash, or the hash from before fingerprints.
+        case_hashes = ", ".join(f"'{html_hash}'" for html_hash in self.get_case_hashes(input_dict))
+        hash_query = (
+            "SELECT * FROM COSMOSDB_CONTAINER_CASES_CLEANED "
+            f"WHERE COSMOSDB_CONTAINER_CASES_CLEANED['html_hash'] IN ({case_hashes})"
+        )
+        try:
+            # Execute the query
+            cases = list(self.COSMOSDB_CONTAINER_CASES_CLEANED.query_items(query=hash_query,enable_cross_partition_query=True))
+        except Exception as e:
+            self.logger.error(f"Error querying cases-cleaned database for an existing hash: {e.status_code} - {e.message}")
+            return False
+
+        if len(cases) > 0:
+            # There already exists one with the same hash, so skip this entirely.
+            self.logger.info(f"The case's HTML hash already exists in the databse: {case_json}. Not updating the database.")
+            return True
+
+        # Querying case databse to fetch all items that match the cause number.
+        case_query = f"SELECT * FROM COSMOSDB_CONTAINER_CASES_CLEANED WHERE COSMOSDB_CONTAINER_CASES_CLEANED['case_number'] = '{input_dict['case_number']}'"
+        try:
+            # Execute the query
+            cases = list(self.COSMOSDB_CONTAINER_CASES_CLEANED.query_items(query=case_query,enable_cross_partition_query=True))
+        except Exception as e:
+            self.logger.error(f"Error querying cases-cleaned database for an existing cases: {e.status_code} - {e.message}")
+            return False
+
+        #If there are no cases that match the cause number, then create the case ID, add a version number of 1 to the JSON and push the JSON to the database.
+        today = dt.today()
+        input_dict['id'] = input_dict['case_number'] + ":" + input_dict['county'] + ":" + today.strftime('%m-%d-%Y') + input_dict['html_hash']
+        input_dict['version'] = max(int(case['version']) for case in cases) + 1 if len(cases) > 0 else 1
+        try:
+            self.COSMOSDB_CONTAINER_CASES_CLEANED.create_item(body=input_dict)
+        except Exception as e:
+            self.logger.error(f"Error inserting this case to cases-cleaned database: {e.status_code} - {e.message}")
+            return False
+
+        # This case is inserted successfully.
+        self.logger.info(f"Insertion successfully done with id: {input_dict['id']}, version: { input_dict['version']}")
+        return True
+
+    def get_case_hashes(self, input_dict):
+        """
+        Returns the html_hash of a case, and its legacy_html_hash if it has one. Cases stored
+        before html_hash became a fingerprint of the page have the legacy hash instead.
+        """
+        case_hashes = [input_dict['html_hash']]
+        if input_dict.get('legacy_html_hash'):
+            case_hashes.append(input_dict['legacy_html_hash'])
+        return case_hashes
+
+    def get_partition_key_path(self):
+        """
+        Returns the keys of the path that the container is partitioned by, e.g. ['case_number']
+        for '/case_number', or ['defendant', 'id'] for the nested '/defendant/id'.
+        """
+        properties = self.COSMOSDB_CONTAINER_CASES_CLEANED.read()
+        return properties["partitionKey"]["paths"][0].strip("/").split("/")
 
-            # Querying case databse to fetch all items that match the hash.
-            hash_query = f"SELECT * FROM COSMOSDB_CONTAINER_CASES_CLEANED WHERE COSMOSDB_CONTAINER_CASES_CLEANED['html_hash'] = '{input_dict['html_hash']}'"
+    def get_partition_key(self, input_dict, partition_key_path):
+        """Returns the value of a case at the partition key path, raising KeyError if it has none."""
+        value = input_dict
+        for key in partition_key_path:
+            value = value[key]
+        return value
+
+    def query_cases(self, field, values, select_fields):
+        """Returns select_fields of every case in the database whose field is one of values, with one query."""
+        select = ", ".join(f"c.{select_field}" for select_field in select_fields)
+        query = f"SELECT {select} FROM c WHERE ARRAY_CONTAINS(@values, c.{field})"
+        return list(self.COSMOSDB_CONTAINER_CASES_CLEANED.query_items(
+            query=query,
+            parameters=[{"name": "@values", "value": values}],
+            enable_cross_partition_query=True,
+        ))
+
+    def update_bulk(self):
+        """
+        Inserts the new cases like update does, but batch_size cases at a time: the hashes and
+        versions already in the database are fetched with one query each per batch, and the
+        new cases are created with one transactional batch per partition key value, instead
+        of two queries and a create per case.
+        """
+        if not self.can_update():
+            return
+
+        try:
+            partition_key_path = self.get_partition_key_path()
+        except exceptions.HttpResponseError as e:
+            self.logger.error(f"Error reading the cases-cleaned container: {e.status_code} - {e.message}")
+            return
+
+        list_case_json_files = [
+            case_json for case_json in sorted(os.listdir(self.case_json_cleaned_folder_path))
+            if os.path.isfile(os.path.join(self.case_json_cleaned_folder_path, case_json))
+        ]
+        for start in range(0, len(list_case_json_files), self.batch_size):
+            self.update_cases(list_case_json_files[start:start + self.batch_size], partition_key_path)
+
+    def update_cases(self, list_case_json_files, partition_key_path):
+        """Inserts the cases of a batch of files that aren't in the database yet."""
+        cases = self.load_cases(list_case_json_files)
+        if not cases:
+            return
+        case_hashes = [html_hash for _, input_dict in cases for html_hash in self.get_case_hashes(input_dict)]
+        case_numbers = list({input_dict['case_number'] for _, input_dict in cases})
+        try:
+            existing_hashes = {case['html_hash'] for case in self.query_cases("html_hash", case_hashes, ["html_hash"])}
+            existing_cases = self.query_cases("case_number", case_numbers, ["case_number", "version"])
+        except exceptions.HttpResponseError as e:
+            self.logger.error(f"Error querying cases-cleaned database for existing cases: {e.status_code} - {e.message}")
+            return
+        versions = {}
+        for case in existing_cases:
+            versions[case['case_number']] = max(versions.get(case['case_number'], 0), int(case['version']))
+
+        new_cases_by_partition_key = self.partition_new_cases(cases, existing_hashes, partition_key_path)
+        for partition_key, new_cases in new_cases_by_partition_key.items():
+            for start in range(0, len(new_cases), MAX_BATCH_OPERATIONS):
+                self.insert_cases(partition_key, new_cases[start:start + MAX_BATCH_OPERATIONS], versions)
+
+    def load_cases(self, list_case_json_files):
+        """
+        Returns the (file name, case) pairs of the files, with every case of an NDJSON file,
+        skipping and logging the files that aren't the JSON of cases, like update does with
+        files it can't insert.
+        """
+        cases = []
+        for case_json in list_case_json_files:
+            file_path = os.path.join(self.case_json_cleaned_folder_path, case_json)
             try:
-                # Execute the query
-                cases = list(self.COSMOSDB_CONTAINER_CASES_CLEANED.query_items(query=hash_query,enable_cross_partition_query=True))
-            except Exception as e:
-                self.logger.error(f"Error querying cases-cleaned database for an existing hash: {e.status_code} - {e.message}")
+                if is_ndjson_file(case_json):
+                    file_cases = list(read_ndjson(file_path))
+                else:
+                    with open(file_path, "r") as f:
+                        file_cases = [json.load(f)]
+            except (OSError, EOFError, UnicodeDecodeError, json.JSONDecodeError) as e:
+                self.logger.error(f"Error loading {case_json}, not updating the database: {e}")
                 continue
+            for input_dict in file_cases:
+                if not isinstance(input_dict, dict) or not {'case_number', 'county', 'html_hash'} <= input_dict.keys():
+                    self.logger.error(f"{case_json} isn't the JSON of cleaned cases, not updating the database.")
+                    break
+            else:
+                cases.extend((case_json, input_dict) for input_dict in file_cases)
+        return cases
 
-            if len(cases) > 0:
+    def move_to_processed(self, case_json):
+        """
+        Moves a file whose case is in the database to the processed folder, unless it is an
+        NDJSON file, which holds other cases too.
+        """
+        if is_ndjson_file(case_json):
+            return
+        os.rename(
+            os.path.join(self.case_json_cleaned_folder_path, case_json),
+            os.path.join(self.processed_path, case_json),
+        )
+
+    def partition_new_cases(self, cases, existing_hashes, partition_key_path):
+        """
+        Returns the cases that aren't in the database or earlier in the batch, by their
+        partition key value. Files of cases already in the database are moved to the
+        processed folder.
+        """
+        today = dt.today()
+        new_cases_by_partition_key = {}
+        batch_hashes = set()
+        for case_json, input_dict in cases:
+            if any(html_hash in existing_hashes for html_hash in self.get_case_hashes(input_dict)):
                 # There already exists one with the same hash, so skip this entirely.
-                # Move the file to the processed folder.
-                os.rename(in_file, dest_file)
-                self.logger.info(f"The case's HTML hash already exists in the databse: {case_json}. Not updating the database.")
+                self.move_to_processed(case_json)
+                self.logger.info(
+                    f"The case's HTML hash already exists in the databse: {case_json}. Not updating the database."
+                )
                 continue
-
-            # Querying case databse to fetch all items that match the cause number.
-            case_query = f"SELECT * FROM COSMOSDB_CONTAINER_CASES_CLEANED WHERE COSMOSDB_CONTAINER_CASES_CLEANED['case_number'] = '{input_dict['case_number']}'"
-            try:
-                # Execute the query
-                cases = list(self.COSMOSDB_CONTAINER_CASES_CLEANED.query_items(query=case_query,enable_cross_partition_query=True))
-            except Exception as e:
-                self.logger.error(f"Error querying cases-cleaned database for an existing cases: {e.status_code} - {e.message}")
+            if input_dict['html_hash'] in batch_hashes:
+                # Another file of this batch has the same hash, and is inserted instead.
+                self.logger.info(
+                    f"The case's HTML hash is in another file of this batch: {case_json}. Not updating the database."
+                )
                 continue
-
-            #If there are no cases that match the cause number, then create the case ID, add a version number of 1 to the JSON and push the JSON to the database.
-            today = dt.today()
-            input_dict['id'] = input_dict['case_number'] + ":" + input_dict['county'] + ":" + today.strftime('%m-%d-%Y') + input_dict['html_hash']
-            input_dict['version'] = max(int(case['version']) for case in cases) + 1 if len(cases) > 0 else 1
             try:
-                self.COSMOSDB_CONTAINER_CASES_CLEANED.create_item(body=input_dict)
-            except Exception as e:
-                self.logger.error(f"Error inserting this case to cases-cleaned database: {e.status_code} - {e.message}")
+                partition_key = self.get_partition_key(input_dict, partition_key_path)
+            except (KeyError, TypeError):
+                self.logger.error(
+                    f"{case_json} has no partition key at /{'/'.join(partition_key_path)}. Not updating the database."
+                )
                 continue
+            batch_hashes.add(input_dict['html_hash'])
+            input_dict['id'] = (
+                input_dict['case_number'] + ":" + input_dict['county'] + ":"
+                + today.strftime('%m-%d-%Y') + input_dict['html_hash']
+            )
+            new_cases_by_partition_key.setdefault(partition_key, []).append((case_json, input_dict))
+        return new_cases_by_partition_key
 
-            # This case is inserted successfully.
-            # Move the file to the processed folder.
-            os.rename(in_file, dest_file)
+    def insert_cases(self, partition_key, new_cases, versions):
+        """
+        Creates new cases of one partition key value with a transactional batch. Versions of
+        the same case number follow the highest one in versions, then each other, and
+        versions only takes them once the batch is committed, so a failed batch leaves no gap.
+        """
+        batch_versions = {}
+        for _, input_dict in new_cases:
+            case_number = input_dict['case_number']
+            version = batch_versions.get(case_number, versions.get(case_number, 0)) + 1
+            input_dict['version'] = batch_versions[case_number] = version
+        try:
+            self.COSMOSDB_CONTAINER_CASES_CLEANED.execute_item_batch(
+                batch_operations=[("create", (input_dict,)) for _, input_dict in new_cases],
+                partition_key=partition_key,
+            )
+        except exceptions.HttpResponseError as e:
+            self.logger.error(
+                f"Error inserting {len(new_cases)} cases to cases-cleaned database: {e.status_code} - {e.message}"
+            )
+            return
+        versions.update(batch_versions)
+        for case_json, input_dict in new_cases:
+            self.move_to_processed(case_json)
             self.logger.info(f"Insertion successfully done with id: {input_dict['id']}, version: { input_dict['version']}")
 
+
 if __name__ == '__main__':
-    Updater().update()
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument(
+        "-county",
+        "-c",
+        type=str,
+        default="hays",
+        help="The name of the county.",
+    )
+    argparser.add_argument(
+        "-bulk",
+        action="store_true",
+        help="Look up and insert the cases in batches.",
+    )
+    argparser.add_argument(
+        "-batch_size",
+        type=int,
+        default=100,
+        help="Number of cases looked up and inserted at a time in bulk mode.",
+    )
+    argparser.description = "Insert the cleaned cases of the specified county into the cases-cleaned database."
+    args = argparser.parse_args()
+    Updater(county=args.county, bulk=args.bulk, batch_size=args.batch_size).update()